@@ -1,3 +1,55 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections.abc import Callable
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+
+from app.crud import kardex
+from app.crud.fechas import hoy
+from app.db.replica import get_read_db
 from app.db.session import get_db
 
-__all__ = ["get_db"]
+
+def etag_kardex(ventana_segundos: float | None = None) -> Callable[..., None]:
+    """Dependencia que responde 304 si el kardex no cambio desde el ETag del cliente.
+
+    El ETag combina la URL, la marca de agua del kardex (`kardex.version`) y el
+    dia del negocio; se calcula antes del endpoint, asi que un 304 no ejecuta
+    ninguna agregacion. `ventana_segundos` agrega un tramo de reloj para los
+    reportes de "ultimos N dias", que cambian aunque no haya movimientos.
+    """
+
+    def dependency(request: Request, response: Response, db: Session = Depends(get_read_db)) -> None:
+        responder_etag(request, response, kardex.version(db), ventana_segundos)
+
+    return dependency
+
+
+def responder_etag(
+    request: Request,
+    response: Response,
+    version: kardex.Version,
+    ventana_segundos: float | None = None,
+) -> None:
+    """Calcula el ETag para `version` y corta con 304 si el cliente ya lo tiene."""
+    partes = [str(request.url.path), request.url.query, *map(str, version), hoy().isoformat()]
+    if ventana_segundos:
+        partes.append(str(int(time.time() // ventana_segundos)))
+    etag = '"' + hashlib.sha1("|".join(partes).encode()).hexdigest() + '"'
+
+    etags_cliente = _etags(request.headers.get("if-none-match"))
+    if etag in etags_cliente or "*" in etags_cliente:
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+
+def _etags(if_none_match: str | None) -> set[str]:
+    if not if_none_match:
+        return set()
+    return {valor.strip() for valor in if_none_match.split(",")}
+
+
+__all__ = ["etag_kardex", "get_db", "get_read_db", "responder_etag"]
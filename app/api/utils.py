@@ -1,7 +1,17 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import Any
 
+from fastapi import HTTPException, status
+from sqlalchemy.exc import DataError
+from sqlalchemy.orm import Session
+
+from app.crud.paginacion import Cursor, CursorInvalido, decode_cursor
+from app.crud.referencias import REFERENCIAS, faltantes
+from app.crud.stock import KARDEX_ARCHIVADO
+
 
 def error_detail(code: str, message: str, *, context: dict[str, Any] | None = None) -> dict[str, Any]:
     detail: dict[str, Any] = {"code": code, "message": message}
@@ -10,4 +20,40 @@ def error_detail(code: str, message: str, *, context: dict[str, Any] | None = No
     return detail
 
 
-__all__ = ["error_detail"]
+def parse_cursor(cursor: str | None) -> Cursor | None:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except CursorInvalido as exc:
+        detail = error_detail("cursor_invalido", "Cursor de paginacion invalido", context={"cursor": cursor})
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail) from exc
+
+
+def validar_referencias(db: Session, **valores: int | None) -> None:
+    """Comprueba todos los ids referenciados en una consulta; 404 con el primero que falte."""
+    pendientes = faltantes(db, valores)
+    if pendientes:
+        campo, valor = pendientes[0]
+        referencia = REFERENCIAS[campo]
+        detail = error_detail(referencia.code, referencia.message, context={referencia.context_key: valor})
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+
+@contextmanager
+def rechazar_kardex_archivado() -> Iterator[None]:
+    """Responde 410 cuando un saldo historico cae antes del horizonte de archivo (fn_saldos_antes_de)."""
+    try:
+        yield
+    except DataError as exc:
+        if getattr(exc.orig, "pgcode", None) != KARDEX_ARCHIVADO:
+            raise
+        detail = error_detail(
+            "kardex_archivado",
+            "Los movimientos de ese periodo estan archivados",
+            context={"motivo": exc.orig.diag.message_primary},
+        )
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=detail) from exc
+
+
+__all__ = ["error_detail", "parse_cursor", "rechazar_kardex_archivado", "validar_referencias"]
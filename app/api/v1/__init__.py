@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
-from app.api.v1 import dashboard, weekly_stock
+from app.api.v1 import dashboard, internal, weekly_stock
+from app.core.config import settings
 from app.api.v1.endpoints import (
     categorias,
     locaciones,
@@ -14,6 +15,11 @@ from app.api.v1.endpoints import (
 )
 
 api_router = APIRouter()
+if settings.async_db_enabled:
+    # Va primero: sus rutas de sondeo reemplazan a las sync equivalentes
+    from app.api.v1 import asincrono
+
+    api_router.include_router(asincrono.router)
 api_router.include_router(productos.router, prefix="/productos", tags=["productos"])
 api_router.include_router(marcas.router, prefix="/marcas", tags=["marcas"])
 api_router.include_router(categorias.router, prefix="/categorias", tags=["categorias"])
@@ -25,3 +31,4 @@ api_router.include_router(movimientos.router, prefix="/movimientos", tags=["movi
 api_router.include_router(stock.router, prefix="/stock", tags=["stock"])
 api_router.include_router(dashboard.router)
 api_router.include_router(weekly_stock.router)
+api_router.include_router(internal.router)
@@ -0,0 +1,165 @@
+"""Endpoints de sondeo servidos con el stack async (``settings.async_db_enabled``).
+
+Se registran antes que los routers sync en las mismas rutas, asi que al
+habilitar la opcion reemplazan a sus equivalentes sin cambiar la API: mismos
+parametros, modelos de respuesta y ETags. Como sus equivalentes sync, leen de
+la replica mientras este al dia (``get_async_read_db``). Los endpoints que
+escriben siguen en el stack sync.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import responder_etag
+from app.api.utils import parse_cursor
+from app.core.config import settings
+from app.db.async_session import get_async_read_db
+from app.models.movimiento import TipoMovimiento
+from app.schemas.dashboard import (
+    AdjustmentsMonitorResponse,
+    DashboardSummaryResponse,
+    RecentMovementsResponse,
+    StockByLocationResponse,
+    TopCategoriesResponse,
+    TopUsedProductsResponse,
+)
+from app.schemas.stock import InventarioLocacion, StockItem
+from app.services import asincrono as servicios
+
+router = APIRouter()
+
+
+def etag_kardex_async(ventana_segundos: float | None = None) -> Callable[..., Awaitable[None]]:
+    """Equivalente async de ``app.api.deps.etag_kardex``."""
+
+    async def dependency(
+        request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db)
+    ) -> None:
+        responder_etag(request, response, await servicios.version(db), ventana_segundos)
+
+    return dependency
+
+
+etag_dashboard = etag_kardex_async(settings.dashboard_cache_ttl_seconds)
+
+
+@router.get("/stock/", response_model=list[StockItem], tags=["stock"], dependencies=[Depends(etag_kardex_async())])
+async def read_stock(
+    *,
+    producto_id: int | None = Query(default=None, gt=0),
+    locacion_id: int | None = Query(default=None, gt=0),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> list[StockItem]:
+    if producto_id is None and locacion_id is None:
+        return await servicios.get_stock(db)
+    return await servicios.get_stock_filtered(db, producto_id=producto_id, locacion_id=locacion_id)
+
+
+@router.get(
+    "/stock/locaciones",
+    response_model=list[InventarioLocacion],
+    tags=["stock"],
+    dependencies=[Depends(etag_kardex_async())],
+)
+async def read_inventario_locaciones(
+    *,
+    include_zero: bool = Query(default=False, description="Incluir productos con stock cero"),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> list[InventarioLocacion]:
+    return await servicios.get_stock_grouped_by_locacion(db, include_zero=include_zero)
+
+
+@router.get(
+    "/dashboard/summary",
+    tags=["Dashboard"],
+    dependencies=[Depends(etag_dashboard)],
+    response_model=DashboardSummaryResponse,
+)
+async def dashboard_summary(db: AsyncSession = Depends(get_async_read_db)) -> DashboardSummaryResponse:
+    return await servicios.get_dashboard_summary(db)
+
+
+@router.get(
+    "/dashboard/recent-movements",
+    tags=["Dashboard"],
+    dependencies=[Depends(etag_dashboard)],
+    response_model=RecentMovementsResponse,
+)
+async def recent_movements(
+    *,
+    db: AsyncSession = Depends(get_async_read_db),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(default=None),
+    tipo: TipoMovimiento | None = Query(default=None),
+    locacion_id: int | None = Query(default=None, gt=0),
+    producto_id: int | None = Query(default=None, gt=0),
+) -> RecentMovementsResponse:
+    return await servicios.get_recent_movements(
+        db,
+        limit=limit,
+        offset=offset,
+        tipo=tipo,
+        locacion_id=locacion_id,
+        producto_id=producto_id,
+        cursor=parse_cursor(cursor),
+    )
+
+
+@router.get(
+    "/dashboard/stock-by-location",
+    tags=["Dashboard"],
+    dependencies=[Depends(etag_dashboard)],
+    response_model=StockByLocationResponse,
+)
+async def stock_by_location(db: AsyncSession = Depends(get_async_read_db)) -> StockByLocationResponse:
+    return await servicios.get_stock_by_location(db)
+
+
+@router.get(
+    "/dashboard/top-used-products",
+    tags=["Dashboard"],
+    dependencies=[Depends(etag_dashboard)],
+    response_model=TopUsedProductsResponse,
+)
+async def top_used_products(
+    *,
+    db: AsyncSession = Depends(get_async_read_db),
+    days: int = Query(30, ge=1, le=365),
+    limit: int = Query(10, ge=1, le=100),
+) -> TopUsedProductsResponse:
+    return await servicios.get_top_used_products(db, days=days, limit=limit)
+
+
+@router.get(
+    "/dashboard/top-categories",
+    tags=["Dashboard"],
+    dependencies=[Depends(etag_dashboard)],
+    response_model=TopCategoriesResponse,
+)
+async def top_categories(
+    *,
+    db: AsyncSession = Depends(get_async_read_db),
+    days: int = Query(30, ge=1, le=365),
+    limit: int = Query(10, ge=1, le=100),
+) -> TopCategoriesResponse:
+    return await servicios.get_top_categories(db, days=days, limit=limit)
+
+
+@router.get(
+    "/dashboard/adjustments-monitor",
+    tags=["Dashboard"],
+    dependencies=[Depends(etag_dashboard)],
+    response_model=AdjustmentsMonitorResponse,
+)
+async def adjustments_monitor(
+    *,
+    db: AsyncSession = Depends(get_async_read_db),
+    days: int = Query(30, ge=1, le=365),
+    top: int = Query(3, ge=1, le=20),
+) -> AdjustmentsMonitorResponse:
+    return await servicios.get_adjustments_monitor(db, days=days, top=top)
@@ -3,10 +3,15 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db
+from app.api.deps import etag_kardex, get_read_db
+from app.core.config import settings
+from app.db.replica import sesion_lectura
+from app.api.utils import parse_cursor
 from app.models.movimiento import TipoMovimiento
 from app.schemas.dashboard import (
     AdjustmentsMonitorResponse,
+    DashboardBundleResponse,
+    DashboardCacheStats,
     DashboardSummaryResponse,
     RecentMovementsResponse,
     StockByLocationResponse,
@@ -14,7 +19,9 @@ from app.schemas.dashboard import (
     TopUsedProductsResponse,
 )
 from app.services.dashboard_service import (
+    dashboard_cache,
     get_adjustments_monitor,
+    get_dashboard_bundle,
     get_dashboard_summary,
     get_recent_movements,
     get_stock_by_location,
@@ -24,28 +31,37 @@ from app.services.dashboard_service import (
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+# Los KPIs de "ultimos N dias" cambian con el reloj: el ETag vence junto con la cache
+etag_dashboard = etag_kardex(settings.dashboard_cache_ttl_seconds)
+
 
 @router.get(
     "/summary",
+    dependencies=[Depends(etag_dashboard)],
     response_model=DashboardSummaryResponse,
     summary="KPIs recientes del inventario",
     description="Devuelve métricas clave de los últimos 7 y 30 días para alimentar el dashboard.",
 )
-def dashboard_summary(db: Session = Depends(get_db)) -> DashboardSummaryResponse:
+def dashboard_summary(db: Session = Depends(get_read_db)) -> DashboardSummaryResponse:
     return get_dashboard_summary(db)
 
 
 @router.get(
     "/recent-movements",
+    dependencies=[Depends(etag_dashboard)],
     response_model=RecentMovementsResponse,
     summary="Últimos movimientos",
     description="Lista los movimientos más recientes con contexto listo para UI, ordenados de más nuevo a más antiguo.",
 )
 def recent_movements(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     limit: int = Query(50, ge=1, le=200, description="Cantidad de registros a devolver."),
     offset: int = Query(0, ge=0, description="Desplazamiento para paginar los registros."),
+    cursor: str | None = Query(
+        default=None,
+        description="Cursor opaco de la pagina siguiente (next_cursor). Si se envia, se ignora offset.",
+    ),
     tipo: TipoMovimiento | None = Query(
         default=None,
         description="Filtra por tipo de movimiento. Opcional y listo para ajustes posteriores.",
@@ -68,28 +84,31 @@ def recent_movements(
         tipo=tipo,
         locacion_id=locacion_id,
         producto_id=producto_id,
+        cursor=parse_cursor(cursor),
     )
 
 
 @router.get(
     "/stock-by-location",
+    dependencies=[Depends(etag_dashboard)],
     response_model=StockByLocationResponse,
     summary="Stock agregado por locación",
     description="Resume la vista de stock actual agrupando por locación para mostrar la distribución del inventario.",
 )
-def stock_by_location(db: Session = Depends(get_db)) -> StockByLocationResponse:
+def stock_by_location(db: Session = Depends(get_read_db)) -> StockByLocationResponse:
     return get_stock_by_location(db)
 
 
 @router.get(
     "/top-used-products",
+    dependencies=[Depends(etag_dashboard)],
     response_model=TopUsedProductsResponse,
     summary="Top productos consumidos",
     description="Entrega los productos con mayor uso en el rango de días indicado para identificar tendencias de consumo.",
 )
 def top_used_products(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     days: int = Query(30, ge=1, le=365, description="Rango de días hacia atrás a considerar."),
     limit: int = Query(10, ge=1, le=100, description="Cantidad máxima de productos en la respuesta."),
 ) -> TopUsedProductsResponse:
@@ -98,13 +117,14 @@ def top_used_products(
 
 @router.get(
     "/top-categories",
+    dependencies=[Depends(etag_dashboard)],
     response_model=TopCategoriesResponse,
     summary="Top categorias con mas movimiento",
     description="Agrupa movimientos por categoria de producto para detectar las que mueven mayor volumen en el rango indicado.",
 )
 def top_categories(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     days: int = Query(30, ge=1, le=365, description="Rango de dias hacia atras a considerar."),
     limit: int = Query(10, ge=1, le=100, description="Cantidad maxima de categorias en la respuesta."),
 ) -> TopCategoriesResponse:
@@ -113,14 +133,45 @@ def top_categories(
 
 @router.get(
     "/adjustments-monitor",
+    dependencies=[Depends(etag_dashboard)],
     response_model=AdjustmentsMonitorResponse,
     summary="Monitor de ajustes",
     description="Controla la actividad de ajustes recientes, incluyendo totales y los actores más frecuentes.",
 )
 def adjustments_monitor(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     days: int = Query(30, ge=1, le=365, description="Rango de días a analizar."),
     top: int = Query(3, ge=1, le=20, description="Cantidad de productos y locaciones destacados."),
 ) -> AdjustmentsMonitorResponse:
     return get_adjustments_monitor(db, days=days, top=top)
+
+
+@router.get(
+    "/bundle",
+    dependencies=[Depends(etag_dashboard)],
+    response_model=DashboardBundleResponse,
+    summary="Dashboard completo",
+    description=(
+        "Todos los widgets del dashboard en un solo request. Las consultas independientes se "
+        "ejecutan en paralelo, cada una en su propia conexion del pool."
+    ),
+)
+def dashboard_bundle(
+    *,
+    days: int = Query(30, ge=1, le=365, description="Rango de días para los tops y el monitor de ajustes."),
+    limit: int = Query(10, ge=1, le=100, description="Cantidad máxima de productos y categorías en los tops."),
+    recent_limit: int = Query(50, ge=1, le=200, description="Cantidad de movimientos recientes."),
+    top: int = Query(3, ge=1, le=20, description="Productos y locaciones destacados en el monitor de ajustes."),
+) -> DashboardBundleResponse:
+    return get_dashboard_bundle(sesion_lectura, days=days, limit=limit, recent_limit=recent_limit, top=top)
+
+
+@router.get(
+    "/cache-stats",
+    response_model=DashboardCacheStats,
+    summary="Estadisticas de la cache del dashboard",
+    description="Entradas vigentes y aciertos/fallos de la cache de respuestas de este nodo.",
+)
+def cache_stats() -> DashboardCacheStats:
+    return DashboardCacheStats(**dashboard_cache.stats())
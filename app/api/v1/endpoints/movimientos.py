@@ -2,24 +2,37 @@ from __future__ import annotations
 
 from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from app import crud
 from app.api.deps import get_db
-from app.api.utils import error_detail
+from app.api.utils import error_detail, parse_cursor, validar_referencias
+from app.crud.fechas import hoy
+from app.crud.paginacion import next_cursor
 from app.models.movimiento import TipoMovimiento
-from app.schemas.movimiento import MovimientoCreate, MovimientoOut
+from app.schemas.movimiento import MovimientoCreate, MovimientoLoteCreate, MovimientoOut
+from app.services.dashboard_service import dashboard_cache
 
 router = APIRouter()
 
+CURSOR_DESCRIPTION = "Cursor opaco de la pagina siguiente (cabecera X-Next-Cursor). Si se envia, se ignora skip."
+
+
+def _set_next_cursor(response: Response, movimientos: list, limit: int) -> None:
+    siguiente = next_cursor(movimientos, limit)
+    if siguiente is not None:
+        response.headers["X-Next-Cursor"] = siguiente
+
 
 @router.get("/", response_model=list[MovimientoOut])
 def read_movimientos(
     *,
+    response: Response,
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=100, ge=1, le=500),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
     producto_id: int | None = Query(default=None, gt=0),
     locacion_id: int | None = Query(default=None, gt=0),
     tipo: TipoMovimiento | None = Query(default=None),
@@ -27,46 +40,15 @@ def read_movimientos(
     proveedor_id: int | None = Query(default=None, gt=0),
     db: Session = Depends(get_db),
 ) -> list[MovimientoOut]:
-    if producto_id is not None:
-        producto = crud.productos.get(db, producto_id)
-        if not producto:
-            detail = error_detail(
-                "producto_not_found",
-                "Producto no encontrado",
-                context={"producto_id": producto_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-    if locacion_id is not None:
-        locacion = crud.locaciones.get(db, locacion_id)
-        if not locacion:
-            detail = error_detail(
-                "locacion_not_found",
-                "Locacion no encontrada",
-                context={"locacion_id": locacion_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-
-    if persona_id is not None:
-        persona = crud.personas.get(db, persona_id)
-        if not persona:
-            detail = error_detail(
-                "persona_not_found",
-                "Persona no encontrada",
-                context={"persona_id": persona_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-
-    if proveedor_id is not None:
-        proveedor = crud.proveedores.get(db, proveedor_id)
-        if not proveedor:
-            detail = error_detail(
-                "proveedor_not_found",
-                "Proveedor no encontrado",
-                context={"proveedor_id": proveedor_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+    validar_referencias(
+        db,
+        producto_id=producto_id,
+        locacion_id=locacion_id,
+        persona_id=persona_id,
+        proveedor_id=proveedor_id,
+    )
 
-    return crud.movimientos.get_multi(
+    movimientos = crud.movimientos.get_multi(
         db,
         skip=skip,
         limit=limit,
@@ -75,74 +57,70 @@ def read_movimientos(
         tipo=tipo,
         persona_id=persona_id,
         proveedor_id=proveedor_id,
+        cursor=parse_cursor(cursor),
     )
+    _set_next_cursor(response, movimientos, limit)
+    return movimientos
 
 
 @router.post("/", response_model=MovimientoOut, status_code=status.HTTP_201_CREATED)
 def create_movimiento(*, movimiento_in: MovimientoCreate, db: Session = Depends(get_db)) -> MovimientoOut:
-    producto = crud.productos.get(db, movimiento_in.producto_id)
-    if not producto:
+    validar_referencias(
+        db,
+        producto_id=movimiento_in.producto_id,
+        from_locacion_id=movimiento_in.from_locacion_id,
+        to_locacion_id=movimiento_in.to_locacion_id,
+        persona_id=movimiento_in.persona_id,
+        proveedor_id=movimiento_in.proveedor_id,
+    )
+
+    try:
+        movimiento = crud.movimientos.create(db, obj_in=movimiento_in)
+        dashboard_cache.invalidar()
+        return movimiento
+    except (IntegrityError, DataError) as exc:
+        db.rollback()
+        origin = getattr(exc, "orig", exc)
         detail = error_detail(
-            "producto_not_found",
-            "Producto no encontrado",
-            context={"producto_id": movimiento_in.producto_id},
+            "movimiento_invalido",
+            "La base de datos rechazo el movimiento",
+            context={"motivo": str(origin)},
         )
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-
-    if movimiento_in.from_locacion_id is not None:
-        locacion = crud.locaciones.get(db, movimiento_in.from_locacion_id)
-        if not locacion:
-            detail = error_detail(
-                "locacion_not_found",
-                "Locacion origen no encontrada",
-                context={"locacion_id": movimiento_in.from_locacion_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail) from exc
+    except SQLAlchemyError as exc:
+        db.rollback()
+        detail = error_detail("movimiento_error", "No se pudo crear el movimiento")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail) from exc
 
-    if movimiento_in.to_locacion_id is not None:
-        locacion = crud.locaciones.get(db, movimiento_in.to_locacion_id)
-        if not locacion:
-            detail = error_detail(
-                "locacion_not_found",
-                "Locacion destino no encontrada",
-                context={"locacion_id": movimiento_in.to_locacion_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
 
-    if movimiento_in.persona_id is not None:
-        persona = crud.personas.get(db, movimiento_in.persona_id)
-        if not persona:
-            detail = error_detail(
-                "persona_not_found",
-                "Persona no encontrada",
-                context={"persona_id": movimiento_in.persona_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-
-    if movimiento_in.proveedor_id is not None:
-        proveedor = crud.proveedores.get(db, movimiento_in.proveedor_id)
-        if not proveedor:
+@router.post("/bulk", response_model=list[MovimientoOut], status_code=status.HTTP_201_CREATED)
+def create_movimientos_lote(*, lote_in: MovimientoLoteCreate, db: Session = Depends(get_db)) -> list[MovimientoOut]:
+    """Registra un lote de movimientos de forma atomica: se insertan todos o ninguno."""
+    try:
+        errores = crud.movimientos.validar_lote(db, objs_in=lote_in.movimientos)
+        if errores:
+            db.rollback()
             detail = error_detail(
-                "proveedor_not_found",
-                "Proveedor no encontrado",
-                context={"proveedor_id": movimiento_in.proveedor_id},
+                "movimientos_invalidos",
+                "El lote contiene movimientos invalidos",
+                context={"errores": errores},
             )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-
-    try:
-        return crud.movimientos.create(db, obj_in=movimiento_in)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+        movimientos = crud.movimientos.create_lote(db, objs_in=lote_in.movimientos)
+        dashboard_cache.invalidar()
+        return movimientos
     except (IntegrityError, DataError) as exc:
         db.rollback()
         origin = getattr(exc, "orig", exc)
         detail = error_detail(
             "movimiento_invalido",
-            "La base de datos rechazo el movimiento",
+            "La base de datos rechazo el lote",
             context={"motivo": str(origin)},
         )
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail) from exc
     except SQLAlchemyError as exc:
         db.rollback()
-        detail = error_detail("movimiento_error", "No se pudo crear el movimiento")
+        detail = error_detail("movimiento_error", "No se pudo registrar el lote")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail) from exc
 
 
@@ -150,19 +128,22 @@ def create_movimiento(*, movimiento_in: MovimientoCreate, db: Session = Depends(
 def read_movimientos_por_producto(
     *,
     producto_id: int,
+    response: Response,
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=100, ge=1, le=500),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
 ) -> list[MovimientoOut]:
-    producto = crud.productos.get(db, producto_id)
-    if not producto:
-        detail = error_detail(
-            "producto_not_found",
-            "Producto no encontrado",
-            context={"producto_id": producto_id},
-        )
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-    return crud.movimientos.get_multi_by_producto(db, producto_id=producto_id, skip=skip, limit=limit)
+    validar_referencias(db, producto_id=producto_id)
+    movimientos = crud.movimientos.get_multi_by_producto(
+        db,
+        producto_id=producto_id,
+        skip=skip,
+        limit=limit,
+        cursor=parse_cursor(cursor),
+    )
+    _set_next_cursor(response, movimientos, limit)
+    return movimientos
 
 
 @router.get("/dia", response_model=list[MovimientoOut])
@@ -170,9 +151,9 @@ def read_movimientos_por_dia(
     *,
     fecha: date | None = Query(
         default=None,
-        description="Fecha (UTC) para filtrar los movimientos. Si se omite se usa el dia actual.",
+        description="Fecha (zona horaria del negocio) para filtrar los movimientos. Si se omite se usa el dia actual.",
     ),
     db: Session = Depends(get_db),
 ) -> list[MovimientoOut]:
-    target_date = fecha or date.today()
+    target_date = fecha or hoy()
     return crud.movimientos.get_por_dia(db, fecha=target_date)
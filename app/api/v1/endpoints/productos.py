@@ -5,8 +5,8 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from app import crud
-from app.api.deps import get_db
-from app.api.utils import error_detail
+from app.api.deps import get_db, get_read_db
+from app.api.utils import error_detail, validar_referencias
 from app.schemas.producto import ProductoCreate, ProductoOut, ProductoUpdate
 
 router = APIRouter()
@@ -16,7 +16,7 @@ router = APIRouter()
 def read_productos(
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=100, ge=1, le=500),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ) -> list[ProductoOut]:
     return crud.productos.get_multi(db, skip=skip, limit=limit)
 
@@ -32,33 +32,12 @@ def create_producto(*, producto_in: ProductoCreate, db: Session = Depends(get_db
                 context={"sku": producto_in.sku},
             )
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
-    uom = crud.uoms.get(db, producto_in.uom_id)
-    if not uom:
-        detail = error_detail(
-            "uom_not_found",
-            "Unidad de medida no encontrada",
-            context={"uom_id": producto_in.uom_id},
-        )
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-
-    if producto_in.marca_id is not None:
-        marca = crud.marcas.get(db, producto_in.marca_id)
-        if not marca:
-            detail = error_detail(
-                "marca_not_found",
-                "Marca no encontrada",
-                context={"marca_id": producto_in.marca_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-    if producto_in.categoria_id is not None:
-        categoria = crud.categorias.get(db, producto_in.categoria_id)
-        if not categoria:
-            detail = error_detail(
-                "categoria_not_found",
-                "Categoria no encontrada",
-                context={"categoria_id": producto_in.categoria_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+    validar_referencias(
+        db,
+        uom_id=producto_in.uom_id,
+        marca_id=producto_in.marca_id,
+        categoria_id=producto_in.categoria_id,
+    )
     try:
         return crud.productos.create(db, obj_in=producto_in)
     except IntegrityError as exc:
@@ -103,34 +82,12 @@ def update_producto(*, producto_id: int, producto_in: ProductoUpdate, db: Sessio
                 context={"sku": producto_in.sku},
             )
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
-    if producto_in.uom_id is not None:
-        uom = crud.uoms.get(db, producto_in.uom_id)
-        if not uom:
-            detail = error_detail(
-                "uom_not_found",
-                "Unidad de medida no encontrada",
-                context={"uom_id": producto_in.uom_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-
-    if producto_in.marca_id is not None:
-        marca = crud.marcas.get(db, producto_in.marca_id)
-        if not marca:
-            detail = error_detail(
-                "marca_not_found",
-                "Marca no encontrada",
-                context={"marca_id": producto_in.marca_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-    if producto_in.categoria_id is not None:
-        categoria = crud.categorias.get(db, producto_in.categoria_id)
-        if not categoria:
-            detail = error_detail(
-                "categoria_not_found",
-                "Categoria no encontrada",
-                context={"categoria_id": producto_in.categoria_id},
-            )
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+    validar_referencias(
+        db,
+        uom_id=producto_in.uom_id,
+        marca_id=producto_in.marca_id,
+        categoria_id=producto_in.categoria_id,
+    )
     try:
         return crud.productos.update(db, db_obj=producto, obj_in=producto_in)
     except IntegrityError as exc:
@@ -5,7 +5,7 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from app import crud
-from app.api.deps import get_db
+from app.api.deps import get_db, get_read_db
 from app.api.utils import error_detail
 from app.schemas.proveedor import ProveedorCreate, ProveedorOut, ProveedorUpdate
 
@@ -16,7 +16,7 @@ router = APIRouter()
 def read_proveedores(
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=100, ge=1, le=500),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ) -> list[ProveedorOut]:
     return crud.proveedores.get_multi(db, skip=skip, limit=limit)
 
@@ -2,14 +2,19 @@ from __future__ import annotations
 
 from datetime import date, datetime, timedelta
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from app import crud
-from app.api.deps import get_db
+from app.api.deps import etag_kardex, get_db, get_read_db
+from app.api.utils import error_detail, rechazar_kardex_archivado
+from app.crud.fechas import hoy, instante_local
 from decimal import Decimal
 
+from app.schemas.cierre import CierreCreate, CierreOut
 from app.schemas.stock import (
+    InventarioAlInstante,
     InventarioLocacion,
     InventarioTotalDia,
     StockItem,
@@ -23,23 +28,23 @@ from app.schemas.stock import (
 router = APIRouter()
 
 
-@router.get("/", response_model=list[StockItem])
+@router.get("/", response_model=list[StockItem], dependencies=[Depends(etag_kardex())])
 def read_stock(
     *,
     producto_id: int | None = Query(default=None, gt=0),
     locacion_id: int | None = Query(default=None, gt=0),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ) -> list[StockItem]:
     if producto_id is None and locacion_id is None:
         return crud.stock.get_all(db)
     return crud.stock.get_filtered(db, producto_id=producto_id, locacion_id=locacion_id)
 
 
-@router.get("/locaciones", response_model=list[InventarioLocacion])
+@router.get("/locaciones", response_model=list[InventarioLocacion], dependencies=[Depends(etag_kardex())])
 def read_inventario_locaciones(
     *,
     include_zero: bool = Query(default=False, description="Incluir productos con stock cero"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ) -> list[InventarioLocacion]:
     return crud.stock.get_grouped_by_locacion(db, include_zero=include_zero)
 
@@ -49,12 +54,13 @@ def read_inventario_total_por_dia(
     *,
     fecha: date | None = Query(
         default=None,
-        description="Fecha (UTC) para calcular el inventario acumulado. Si se omite se usa el dia actual.",
+        description="Fecha (zona horaria del negocio) para calcular el inventario acumulado. Si se omite se usa el dia actual.",
     ),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ) -> InventarioTotalDia:
-    target_date = fecha or date.today()
-    rows = crud.stock.get_total_por_dia(db, fecha=target_date)
+    target_date = fecha or hoy()
+    with rechazar_kardex_archivado():
+        rows = crud.stock.get_total_por_dia(db, fecha=target_date)
     total_stock = sum((item["total_stock"] for item in rows), Decimal("0"))
     return InventarioTotalDia(
         fecha=target_date,
@@ -64,7 +70,28 @@ def read_inventario_total_por_dia(
     )
 
 
-@router.get("/weekly", response_model=WeeklyInventoryResponse)
+@router.get("/as-of", response_model=InventarioAlInstante)
+def read_inventario_al_instante(
+    *,
+    ts: datetime = Query(
+        ...,
+        description=(
+            "Instante a reconstruir (ISO 8601). Incluye los movimientos registrados en ese instante. "
+            "Sin offset se interpreta en la zona horaria del negocio."
+        ),
+    ),
+    producto_id: int | None = Query(default=None, gt=0),
+    locacion_id: int | None = Query(default=None, gt=0),
+    db: Session = Depends(get_read_db),
+) -> InventarioAlInstante:
+    ts = instante_local(ts)
+    with rechazar_kardex_archivado():
+        rows = crud.stock.get_as_of(db, ts=ts, producto_id=producto_id, locacion_id=locacion_id)
+    total_stock = sum((item["stock"] for item in rows), Decimal("0"))
+    return InventarioAlInstante(ts=ts, total_stock=total_stock, items=rows)
+
+
+@router.get("/weekly", response_model=WeeklyInventoryResponse, dependencies=[Depends(etag_kardex())])
 def read_inventario_semanal(
     *,
     start_date: date | None = Query(
@@ -74,27 +101,28 @@ def read_inventario_semanal(
     weeks: int = Query(
         default=1,
         ge=1,
-        le=4,
-        description="Cantidad de semanas consecutivas a incluir en el cálculo.",
+        le=53,
+        description="Cantidad de semanas consecutivas a incluir en el cálculo (hasta un año).",
     ),
     categoria_ids: list[int] | None = Query(default=None, alias="categoria_id"),
     producto_ids: list[int] | None = Query(default=None, alias="producto_id"),
     include_zero: bool = Query(default=False, description="Incluir productos sin movimientos o stock."),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ) -> WeeklyInventoryResponse:
-    reference = start_date or date.today()
+    reference = start_date or hoy()
     normalized_start = reference - timedelta(days=reference.weekday())
     total_days = (weeks * 7) - 1
     normalized_end = normalized_start + timedelta(days=total_days)
 
-    dataset = crud.stock.get_weekly_inventory(
-        db,
-        start_date=normalized_start,
-        end_date=normalized_end,
-        categoria_ids=categoria_ids,
-        producto_ids=producto_ids,
-        include_zero=include_zero,
-    )
+    with rechazar_kardex_archivado():
+        dataset = crud.stock.get_weekly_inventory(
+            db,
+            start_date=normalized_start,
+            end_date=normalized_end,
+            categoria_ids=categoria_ids,
+            producto_ids=producto_ids,
+            include_zero=include_zero,
+        )
 
     filters = WeeklyInventoryFilters(
         categoria_ids=categoria_ids or [],
@@ -115,3 +143,32 @@ def read_inventario_semanal(
     items = [WeeklyInventoryItem(**item) for item in dataset["items"]]
 
     return WeeklyInventoryResponse(meta=meta, items=items)
+
+
+@router.get("/cierres", response_model=list[CierreOut])
+def read_cierres(
+    *,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+) -> list[CierreOut]:
+    return crud.cierres.get_multi(db, skip=skip, limit=limit)
+
+
+@router.post("/cierres", response_model=CierreOut, status_code=status.HTTP_201_CREATED)
+def create_cierre(*, cierre_in: CierreCreate, db: Session = Depends(get_db)) -> CierreOut:
+    try:
+        return crud.cierres.create(db, obj_in=cierre_in)
+    except (IntegrityError, DataError) as exc:
+        db.rollback()
+        origin = getattr(exc, "orig", exc)
+        detail = error_detail(
+            "cierre_invalido",
+            "La base de datos rechazo el cierre",
+            context={"motivo": str(origin)},
+        )
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail) from exc
+    except SQLAlchemyError as exc:
+        db.rollback()
+        detail = error_detail("cierre_error", "No se pudo registrar el cierre")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail) from exc
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db
+from app.api.utils import error_detail
+from app.crud import rollup
+from app.db.replica import estado_replica
+from app.db.session import engine, read_engine
+from app.schemas.pool import PoolStats, ReplicaStats
+from app.schemas.rollup import VerificacionRollup
+
+router = APIRouter(prefix="/_internal", tags=["internal"])
+
+
+@router.get(
+    "/pool",
+    response_model=PoolStats,
+    summary="Estado del pool de conexiones",
+    description=(
+        "Conexiones en uso, libres y en overflow de este nodo, mas histogramas de espera por una "
+        "conexion y de tiempo de retencion, timeouts y edad de las conexiones abiertas."
+    ),
+)
+def pool_stats(
+    base: Literal["primaria", "replica"] = Query("primaria", description="Pool de la primaria o de la replica de lectura."),
+) -> PoolStats:
+    if base == "replica":
+        if read_engine is None:
+            detail = error_detail("replica_no_configurada", "No hay replica de lectura configurada")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+        return PoolStats(**read_engine.pool.estado())
+    return PoolStats(**engine.pool.estado())
+
+
+@router.get(
+    "/replica",
+    response_model=ReplicaStats,
+    summary="Estado de la replica de lectura",
+    description="Indica si las lecturas van a la replica y su ultimo retraso de replicacion medido.",
+)
+def replica_stats() -> ReplicaStats:
+    estado_replica.usar_replica()
+    return ReplicaStats(**estado_replica.snapshot())
+
+
+@router.get(
+    "/rollup",
+    response_model=VerificacionRollup,
+    summary="Verificar los agregados diarios de movimientos",
+    description=(
+        "Compara mov_rollup_diario contra el kardex en el rango de dias indicado (sin limites: todo "
+        "el historial) y devuelve las primeras diferencias."
+    ),
+)
+def verificar_rollup(
+    *,
+    db: Session = Depends(get_db),
+    desde: date | None = Query(None, description="Primer dia a verificar (inclusive)."),
+    hasta: date | None = Query(None, description="Ultimo dia a verificar (inclusive)."),
+    limit: int = Query(100, ge=1, le=1000, description="Cantidad maxima de diferencias devueltas."),
+) -> VerificacionRollup:
+    total, diferencias = rollup.verificar(db, desde, hasta, limite=limit)
+    return VerificacionRollup(
+        desde=desde,
+        hasta=hasta,
+        consistente=total == 0,
+        diferencias_total=total,
+        diferencias=diferencias,
+    )
+
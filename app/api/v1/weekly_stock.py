@@ -1,25 +1,29 @@
 """
 Endpoints para vistas de stock semanal
 """
+from collections.abc import Iterator
 from datetime import date
-from fastapi import APIRouter, Depends, Query
+from itertools import chain
+from fastapi import APIRouter, Depends, Query, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import io
 import csv
 
-from app.api.deps import get_db
+from app.api.deps import etag_kardex, get_read_db
+from app.api.utils import rechazar_kardex_archivado
+from app.db.replica import sesion_lectura
 from app.schemas.weekly_stock import WeeklyStockResponse
-from app.services.weekly_stock_service import get_weekly_stock
+from app.services.weekly_stock_service import DAY_NAMES, get_weekly_stock, iter_weekly_stock_rows
 
 router = APIRouter(prefix="/weekly-stock", tags=["Weekly Stock"])
 
 
-@router.get("", response_model=WeeklyStockResponse)
+@router.get("", response_model=WeeklyStockResponse, dependencies=[Depends(etag_kardex())])
 def get_weekly_stock_view(
     week_start: date = Query(..., description="Fecha de inicio de semana (lunes) YYYY-MM-DD"),
     categories: str | None = Query(None, description="IDs de categorías separados por coma (ej: 1,2,3)"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Obtiene el reporte de stock semanal por categorías.
@@ -35,23 +39,28 @@ def get_weekly_stock_view(
         except ValueError:
             category_ids = None
     
-    result = get_weekly_stock(
-        db,
-        week_start=week_start,
-        category_ids=category_ids
-    )
+    with rechazar_kardex_archivado():
+        result = get_weekly_stock(
+            db,
+            week_start=week_start,
+            category_ids=category_ids
+        )
     
     return result
 
 
-@router.get("/csv")
+@router.get("/csv", dependencies=[Depends(etag_kardex())])
 def export_weekly_stock_csv(
+    response: Response,
     week_start: date = Query(..., description="Fecha de inicio de semana (lunes) YYYY-MM-DD"),
     categories: str | None = Query(None, description="IDs de categorías separados por coma"),
-    db: Session = Depends(get_db)
 ):
     """
     Exporta el reporte de stock semanal a CSV.
+
+    Las filas se leen con un cursor del servidor y se envían por bloques a medida que llegan,
+    de modo que la memoria no crece con el tamaño del reporte. El primer bloque se lee antes
+    de responder, así un error de la consulta (semana archivada) llega con su código HTTP.
     """
     # Parsear categorías
     category_ids = None
@@ -60,63 +69,78 @@ def export_weekly_stock_csv(
             category_ids = [int(x.strip()) for x in categories.split(",") if x.strip()]
         except ValueError:
             category_ids = None
-    
-    # Obtener datos
-    result = get_weekly_stock(
-        db,
-        week_start=week_start,
-        category_ids=category_ids
-    )
-    
-    # Crear CSV en memoria
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Encabezados
-    headers = [
-        "Categoría",
-        "Producto",
-        "Marca",
-        "Proveedor",
-        "Stock Inicial",
-        "Lunes",
-        "Martes",
-        "Miércoles",
-        "Jueves",
-        "Viernes",
-        "Sábado",
-        "Domingo",
-        "Stock Final"
-    ]
-    writer.writerow(headers)
-    
-    # Datos
-    for category in result.categories:
-        for product in category.products:
-            row = [
-                category.category_name,
-                product.name,
-                product.brand or "",
-                product.supplier or "",
-                product.initial_stock,
-                product.daily_movements.monday if product.daily_movements.monday is not None else "-",
-                product.daily_movements.tuesday if product.daily_movements.tuesday is not None else "-",
-                product.daily_movements.wednesday if product.daily_movements.wednesday is not None else "-",
-                product.daily_movements.thursday if product.daily_movements.thursday is not None else "-",
-                product.daily_movements.friday if product.daily_movements.friday is not None else "-",
-                product.daily_movements.saturday if product.daily_movements.saturday is not None else "-",
-                product.daily_movements.sunday if product.daily_movements.sunday is not None else "-",
-                product.final_stock_realtime
-            ]
-            writer.writerow(row)
-    
-    # Preparar respuesta
-    output.seek(0)
-    
+
+    # La sesión vive mientras dura la descarga, no solo mientras corre el endpoint
+    db = sesion_lectura()
+    try:
+        bloques = iter_weekly_stock_rows(db, week_start=week_start, category_ids=category_ids)
+        with rechazar_kardex_archivado():
+            primero = next(bloques, [])
+    except BaseException:
+        db.close()
+        raise
+
     return StreamingResponse(
-        iter([output.getvalue()]),
+        _weekly_stock_csv_chunks(db, chain([primero], bloques)),
         media_type="text/csv",
         headers={
-            "Content-Disposition": f"attachment; filename=stock_semanal_{week_start}.csv"
+            "Content-Disposition": f"attachment; filename=stock_semanal_{week_start}.csv",
+            # Una StreamingResponse no hereda las cabeceras fijadas por etag_kardex
+            "ETag": response.headers["etag"],
         }
     )
+
+
+def _weekly_stock_csv_chunks(db: Session, bloques: Iterator[list]) -> Iterator[str]:
+    try:
+        output = io.StringIO()
+        writer = csv.writer(output)
+
+        # Encabezados
+        writer.writerow(CSV_HEADERS)
+        yield _flush(output)
+
+        # Datos
+        for rows in bloques:
+            for row in rows:
+                writer.writerow(
+                    [
+                        row["category_name"],
+                        row["name"],
+                        row["brand"] or "",
+                        "",  # No existe relación proveedor en Producto
+                        float(row["initial_stock"]),
+                        *(
+                            float(row[day_name]) if row[day_name] is not None else "-"
+                            for day_name in DAY_NAMES
+                        ),
+                        float(row["final_stock_realtime"]),
+                    ]
+                )
+            yield _flush(output)
+    finally:
+        db.close()
+
+
+def _flush(output: io.StringIO) -> str:
+    chunk = output.getvalue()
+    output.seek(0)
+    output.truncate()
+    return chunk
+
+
+CSV_HEADERS = [
+    "Categoría",
+    "Producto",
+    "Marca",
+    "Proveedor",
+    "Stock Inicial",
+    "Lunes",
+    "Martes",
+    "Miércoles",
+    "Jueves",
+    "Viernes",
+    "Sábado",
+    "Domingo",
+    "Stock Final"
+]
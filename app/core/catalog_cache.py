@@ -0,0 +1,128 @@
+"""Cache en memoria de los catalogos pequenos (locaciones, uoms, categorias,
+marcas, personas y proveedores).
+
+Cada nodo guarda una copia completa junto con la version de
+``catalogo_version``, que los triggers de db/schema.sql incrementan en cada
+escritura. Las lecturas comparan esa version como maximo cada
+``settings.catalog_cache_check_seconds`` (una consulta de una fila) y recargan
+todo si cambio; las escrituras hechas por este nodo invalidan la copia de
+inmediato via ``catalog_cache.invalidar()``.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.base_class import Base
+from app.models import UOM, CatalogoVersion, Categoria, Locacion, Marca, Persona, Proveedor
+
+logger = logging.getLogger(__name__)
+
+
+class Catalogos(NamedTuple):
+    version: int
+    locaciones: dict[int, dict]
+    uoms: dict[int, dict]
+    categorias: dict[int, dict]
+    marcas: dict[int, dict]
+    personas: dict[int, dict]
+    proveedores: dict[int, dict]
+
+    def por_modelo(self, modelo: type[Base]) -> dict[int, dict] | None:
+        """Catalogo en cache para `modelo`, o None si el modelo no se cachea."""
+        campo = MODELOS.get(modelo)
+        return getattr(self, campo) if campo else None
+
+
+MODELOS: dict[type[Base], str] = {
+    Locacion: "locaciones",
+    UOM: "uoms",
+    Categoria: "categorias",
+    Marca: "marcas",
+    Persona: "personas",
+    Proveedor: "proveedores",
+}
+
+
+class CatalogCache:
+    def __init__(self, check_seconds: float) -> None:
+        self._check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._catalogos: Catalogos | None = None
+        self._verificado_en = 0.0
+        # Sube con cada invalidacion: una carga iniciada antes no se guarda
+        self._generacion = 0
+
+    def get(self, db: Session, *, forzar: bool = False) -> Catalogos:
+        """Copia vigente de los catalogos, recargandola si la version en la base cambio.
+
+        Con `forzar` la version se compara aunque no haya vencido el intervalo.
+        Las consultas se hacen sin tomar el lock, que solo protege el reemplazo
+        de la copia: con el stack async varias cargas corren sobre el mismo
+        hilo (``AsyncSession.run_sync``) y esperar el lock bloquearia el event
+        loop. Si dos requests recargan a la vez, ambos consultan y queda la copia
+        de version mas nueva.
+        """
+        catalogos = self._catalogos
+        if not forzar and catalogos is not None and time.monotonic() - self._verificado_en < self._check_seconds:
+            return catalogos
+
+        generacion = self._generacion
+        version = db.execute(select(CatalogoVersion.version)).scalar_one()
+        if catalogos is None or catalogos.version != version:
+            catalogos = self._cargar(db, version)
+
+        with self._lock:
+            if generacion == self._generacion:
+                actual = self._catalogos
+                if actual is None or actual.version <= catalogos.version:
+                    self._catalogos = catalogos
+                self._verificado_en = time.monotonic()
+        return catalogos
+
+    def get_con(self, db: Session, requeridos: dict[type[Base], set[int | None]]) -> Catalogos:
+        """Como get(), pero garantiza que los ids `requeridos` esten en la copia.
+
+        Un id desconocido (por ejemplo, creado en otro nodo dentro del intervalo)
+        fuerza la comparacion de version y, con ella, la recarga.
+        """
+        catalogos = self.get(db)
+        for modelo, ids in requeridos.items():
+            if not (ids - {None}) <= catalogos.por_modelo(modelo).keys():
+                return self.get(db, forzar=True)
+        return catalogos
+
+    def invalidar(self) -> None:
+        """Descarta la copia local; la siguiente lectura recarga desde la base."""
+        with self._lock:
+            self._catalogos = None
+            self._generacion += 1
+
+    def precargar(self, db: Session) -> None:
+        """Carga inicial al arrancar la API. Si la base no responde se cargara en la primera lectura."""
+        try:
+            self.get(db)
+        except SQLAlchemyError:
+            logger.warning("No se pudo precargar la cache de catalogos", exc_info=True)
+
+    @staticmethod
+    def _cargar(db: Session, version: int) -> Catalogos:
+        tablas = {}
+        for modelo, campo in MODELOS.items():
+            columnas = modelo.__table__.c
+            rows = db.execute(select(*columnas)).mappings()
+            tablas[campo] = {row["id"]: dict(row) for row in rows}
+        return Catalogos(version=version, **tablas)
+
+
+catalog_cache = CatalogCache(settings.catalog_cache_check_seconds)
+
+__all__ = ["CatalogCache", "Catalogos", "MODELOS", "catalog_cache"]
@@ -0,0 +1,261 @@
+"""Metricas por ruta: latencia y codigos HTTP, y tiempo de base por request.
+
+``MetricasMiddleware`` (ASGI puro) abre un ``EstadisticasRequest`` por request
+en una ContextVar; los hooks de SQLAlchemy, registrados sobre la clase
+``Engine`` (primaria, replica y el engine del stack async), le suman cada
+consulta, su duracion y las filas devueltas. Al terminar la respuesta,
+incluido el cuerpo de un StreamingResponse, todo se vuelca a los histogramas
+de ``registro`` con la plantilla de la ruta como etiqueta.
+
+Con un ``PresupuestoConsultas`` (modo desarrollo, ``QUERY_BUDGET_ENABLED``)
+ademas se agrupan las consultas por forma para detectar N+1, se avisa (o se
+falla, para los tests) cuando una ruta excede el presupuesto y cada respuesta
+lleva un header ``Server-Timing`` con el tiempo de base y de aplicacion.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections.abc import Iterator
+from contextvars import ContextVar
+from typing import Literal, NamedTuple
+
+from sqlalchemy import Engine, event
+
+from app.core.metrics import BUCKETS_CONTEOS, counter, gauge, registro
+
+
+logger = logging.getLogger(__name__)
+
+
+class PresupuestoConsultas(NamedTuple):
+    max_consultas: int
+    # Mas repeticiones de una misma forma de consulta que esto se reporta como N+1
+    max_repetidas: int
+    accion: Literal["warn", "raise"] = "warn"
+
+
+class PresupuestoConsultasExcedido(RuntimeError):
+    """Una ruta excedio el presupuesto de consultas con accion "raise"."""
+
+
+class EstadisticasRequest:
+    __slots__ = ("consultas", "segundos_db", "filas", "presupuesto", "formas")
+
+    def __init__(self, presupuesto: PresupuestoConsultas | None = None) -> None:
+        self.consultas = 0
+        self.segundos_db = 0.0
+        self.filas = 0
+        self.presupuesto = presupuesto
+        # forma normalizada de la consulta -> repeticiones; solo con presupuesto
+        self.formas: dict[str, int] | None = {} if presupuesto is not None else None
+
+    def excesos(self) -> list[str]:
+        """Descripcion de cada limite del presupuesto superado (vacia si no hay presupuesto)."""
+        if self.presupuesto is None:
+            return []
+        excesos = []
+        total = sum(self.formas.values())
+        if total > self.presupuesto.max_consultas:
+            excesos.append(f"{total} consultas (presupuesto {self.presupuesto.max_consultas})")
+        for forma, repeticiones in sorted(self.formas.items(), key=lambda item: -item[1]):
+            if repeticiones <= self.presupuesto.max_repetidas:
+                break
+            excesos.append(f"{repeticiones}x posible N+1: {forma[:200]}")
+        return excesos
+
+    def verificar(self) -> None:
+        """Con accion "raise", falla si ya se excedio el presupuesto."""
+        if self.presupuesto is not None and self.presupuesto.accion == "raise":
+            excesos = self.excesos()
+            if excesos:
+                raise PresupuestoConsultasExcedido("; ".join(excesos))
+
+    def parcial(self) -> EstadisticasRequest:
+        """Estadisticas vacias con el mismo presupuesto, para un hilo que trabaja para este request."""
+        return EstadisticasRequest(self.presupuesto)
+
+    def sumar(self, otra: EstadisticasRequest) -> None:
+        """Agrega las estadisticas de un hilo auxiliar (ver ``parcial``) una vez que termino."""
+        self.consultas += otra.consultas
+        self.segundos_db += otra.segundos_db
+        self.filas += otra.filas
+        if self.formas is not None and otra.formas is not None:
+            for forma, repeticiones in otra.formas.items():
+                self.formas[forma] = self.formas.get(forma, 0) + repeticiones
+
+
+# Listas de parametros (IN (...), VALUES (...)) de largo variable cuentan como una sola forma
+_LISTA_PARAMETROS = re.compile(r"\((?:\s*(?:%\(\w+\)s|\?|\$\d+)\s*,?)+\)")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def forma_consulta(statement: str) -> str:
+    return _ESPACIOS.sub(" ", _LISTA_PARAMETROS.sub("(?)", statement)).strip()
+
+
+request_actual: ContextVar[EstadisticasRequest | None] = ContextVar("request_actual", default=None)
+
+requests_total = registro.contador(
+    "http_requests_total", "Requests atendidos por ruta y codigo de estado.", ("method", "route", "status")
+)
+duracion_request = registro.histograma(
+    "http_request_duration_seconds", "Duracion de cada request, incluido el envio del cuerpo.", ("method", "route")
+)
+consultas_request = registro.histograma(
+    "http_request_db_queries", "Consultas SQL ejecutadas por request.", ("route",), BUCKETS_CONTEOS
+)
+segundos_db_request = registro.histograma(
+    "http_request_db_seconds", "Tiempo en la base de datos por request.", ("route",)
+)
+filas_request = registro.histograma(
+    "http_request_db_rows", "Filas devueltas por la base de datos por request.", ("route",), BUCKETS_CONTEOS
+)
+
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany) -> None:
+    estadisticas = request_actual.get()
+    if estadisticas is None:
+        return
+    if estadisticas.formas is not None:
+        forma = forma_consulta(statement)
+        estadisticas.formas[forma] = estadisticas.formas.get(forma, 0) + 1
+        estadisticas.verificar()
+    context._metricas_inicio = time.perf_counter()
+
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany) -> None:
+    estadisticas = request_actual.get()
+    inicio = getattr(context, "_metricas_inicio", None)
+    if estadisticas is None or inicio is None:
+        return
+    estadisticas.consultas += 1
+    estadisticas.segundos_db += time.perf_counter() - inicio
+    # Con cursores del servidor (yield_per) psycopg2 informa -1: esas filas no se cuentan
+    estadisticas.filas += max(cursor.rowcount, 0)
+
+
+def instrumentar_sqlalchemy() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _antes_de_consulta):
+        event.listen(Engine, "before_cursor_execute", _antes_de_consulta)
+        event.listen(Engine, "after_cursor_execute", _despues_de_consulta)
+
+
+class MetricasMiddleware:
+    def __init__(
+        self,
+        app,
+        excluir: tuple[str, ...] = ("/metrics",),
+        presupuesto: PresupuestoConsultas | None = None,
+    ) -> None:
+        self.app = app
+        self.excluir = excluir
+        self.presupuesto = presupuesto
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.excluir:
+            await self.app(scope, receive, send)
+            return
+
+        estadisticas = EstadisticasRequest(self.presupuesto)
+        token = request_actual.set(estadisticas)
+        inicio = time.perf_counter()
+        estado = 500
+        registrado = False
+
+        def registrar() -> None:
+            nonlocal registrado
+            if registrado:
+                return
+            registrado = True
+            ruta = plantilla_ruta(scope)
+            requests_total.inc((scope["method"], ruta, estado))
+            duracion_request.observar((scope["method"], ruta), time.perf_counter() - inicio)
+            consultas_request.observar((ruta,), estadisticas.consultas)
+            segundos_db_request.observar((ruta,), estadisticas.segundos_db)
+            filas_request.observar((ruta,), estadisticas.filas)
+            if estadisticas.presupuesto is not None and estadisticas.presupuesto.accion == "warn":
+                excesos = estadisticas.excesos()
+                if excesos:
+                    logger.warning("%s %s excedio el presupuesto de consultas: %s", scope["method"], ruta, "; ".join(excesos))
+
+        async def send_con_metricas(message) -> None:
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+                if self.presupuesto is not None:
+                    message["headers"] = [*message.get("headers", ()), (b"server-timing", _server_timing(estadisticas, inicio))]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                registrar()
+
+        try:
+            await self.app(scope, receive, send_con_metricas)
+        finally:
+            registrar()
+            request_actual.reset(token)
+
+
+def plantilla_ruta(scope) -> str:
+    """Plantilla completa de la ruta atendida (/api/v1/productos/{producto_id}), nunca la URL.
+
+    Acota la cardinalidad de las etiquetas. Con routers incluidos, FastAPI deja
+    en ``scope["route"]`` la ruta relativa a su router (``/{producto_id}``); la
+    plantilla con los prefijos queda en el contexto efectivo de la ruta. Las
+    versiones que copian las rutas al incluirlas ya tienen el path completo.
+    """
+    contexto = scope.get("fastapi", {}).get("effective_route_context")
+    ruta = getattr(contexto, "path", None) or getattr(scope.get("route"), "path", None)
+    return ruta or "sin_ruta"
+
+
+def _server_timing(estadisticas: EstadisticasRequest, inicio: float) -> bytes:
+    """Tiempos hasta el inicio de la respuesta; en descargas no incluye el envio del cuerpo."""
+    total_ms = (time.perf_counter() - inicio) * 1000
+    db_ms = estadisticas.segundos_db * 1000
+    return (
+        f'db;dur={db_ms:.1f};desc="{estadisticas.consultas} consultas", app;dur={max(total_ms - db_ms, 0):.1f}'
+    ).encode()
+
+
+@registro.colector
+def _metricas_pool() -> Iterator[str]:
+    from app.db.session import engine, read_engine
+
+    estados = [("primaria", engine.pool.estado())]
+    if read_engine is not None:
+        estados.append(("replica", read_engine.pool.estado()))
+    for nombre, ayuda, clave in (
+        ("db_pool_checked_out", "Conexiones en uso.", "en_uso"),
+        ("db_pool_idle", "Conexiones libres en el pool.", "libres"),
+        ("db_pool_overflow", "Conexiones abiertas por encima de pool_size.", "overflow"),
+        ("db_pool_connection_age_max_seconds", "Edad de la conexion abierta mas antigua.", "edad_maxima_segundos"),
+    ):
+        yield from gauge(nombre, ayuda, (({"base": base}, estado[clave]) for base, estado in estados))
+
+
+@registro.colector
+def _metricas_dashboard_cache() -> Iterator[str]:
+    from app.services.dashboard_service import dashboard_cache
+
+    stats = dashboard_cache.stats()
+    yield from gauge("dashboard_cache_entries", "Entradas vigentes en la cache del dashboard.", [({}, stats["entries"])])
+    yield from counter(
+        "dashboard_cache_requests_total",
+        "Aciertos y fallos acumulados de la cache del dashboard.",
+        [({"resultado": "hit"}, stats["hits"]), ({"resultado": "miss"}, stats["misses"])],
+    )
+
+
+__all__ = [
+    "EstadisticasRequest",
+    "MetricasMiddleware",
+    "PresupuestoConsultas",
+    "PresupuestoConsultasExcedido",
+    "forma_consulta",
+    "instrumentar_sqlalchemy",
+    "plantilla_ruta",
+    "request_actual",
+]
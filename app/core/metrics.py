@@ -0,0 +1,185 @@
+"""Metricas en formato de exposicion de texto de Prometheus.
+
+Registro propio y minimo: contadores e histogramas con etiquetas, guardados
+en diccionarios por tupla de valores, mas colectores que leen estado vivo (el
+pool, las caches) al momento del scrape. ``GET /metrics`` devuelve
+``registro.exponer()``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+# Limites superiores (segundos) de los buckets de latencia
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Limites para conteos por request (consultas, filas)
+BUCKETS_CONTEOS = (1, 2, 5, 10, 25, 50, 100, 250, 1000, 10000, 100000)
+
+
+class Histograma:
+    """Histograma acumulativo con buckets fijos (mismo formato que Prometheus)."""
+
+    __slots__ = ("buckets", "_conteos", "suma", "cantidad")
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS_SEGUNDOS) -> None:
+        self.buckets = buckets
+        self._conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor: float) -> None:
+        indice = bisect.bisect_left(self.buckets, valor)
+        if indice < len(self._conteos):
+            self._conteos[indice] += 1
+        self.suma += valor
+        self.cantidad += 1
+
+    def acumulados(self) -> Iterator[tuple[str, int]]:
+        acumulado = 0
+        for limite, conteo in zip(self.buckets, self._conteos):
+            acumulado += conteo
+            yield str(limite), acumulado
+        yield "+Inf", self.cantidad
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"buckets": dict(self.acumulados()), "suma": self.suma, "cantidad": self.cantidad}
+
+
+def _etiquetas(nombres: tuple[str, ...], valores: tuple, extra: str = "") -> str:
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(valor: Any) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple[str, ...] = ()) -> None:
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._lock = threading.Lock()
+        self._valores: dict[tuple, float] = {}
+
+    def inc(self, valores: tuple = (), n: float = 1) -> None:
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + n
+
+    def exponer(self) -> Iterator[str]:
+        yield f"# HELP {self.nombre} {self.ayuda}"
+        yield f"# TYPE {self.nombre} counter"
+        with self._lock:
+            valores = list(self._valores.items())
+        for clave, valor in valores:
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {valor}"
+
+
+class FamiliaHistogramas:
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = BUCKETS_SEGUNDOS,
+    ) -> None:
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histogramas: dict[tuple, Histograma] = {}
+
+    def observar(self, valores: tuple, valor: float) -> None:
+        with self._lock:
+            histograma = self._histogramas.get(valores)
+            if histograma is None:
+                histograma = self._histogramas[valores] = Histograma(self.buckets)
+            histograma.observar(valor)
+
+    def exponer(self) -> Iterator[str]:
+        yield f"# HELP {self.nombre} {self.ayuda}"
+        yield f"# TYPE {self.nombre} histogram"
+        with self._lock:
+            snapshots = [(clave, list(h.acumulados()), h.suma, h.cantidad) for clave, h in self._histogramas.items()]
+        for clave, acumulados, suma, cantidad in snapshots:
+            for limite, conteo in acumulados:
+                le = 'le="' + limite + '"'
+                yield f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {conteo}"
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {suma}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {cantidad}"
+
+
+def gauge(nombre: str, ayuda: str, muestras: Iterable[tuple[dict[str, Any], float]]) -> Iterator[str]:
+    """Lineas de un gauge calculado en el scrape; `muestras` son (etiquetas, valor)."""
+    return _calculada(nombre, ayuda, "gauge", muestras)
+
+
+def counter(nombre: str, ayuda: str, muestras: Iterable[tuple[dict[str, Any], float]]) -> Iterator[str]:
+    """Como gauge(), para totales acumulados que solo crecen (vuelven a 0 al reiniciar el proceso).
+
+    Con tipo counter, rate() e increase() toman la vuelta a 0 como un reinicio.
+    """
+    return _calculada(nombre, ayuda, "counter", muestras)
+
+
+def _calculada(nombre: str, ayuda: str, tipo: str, muestras: Iterable[tuple[dict[str, Any], float]]) -> Iterator[str]:
+    yield f"# HELP {nombre} {ayuda}"
+    yield f"# TYPE {nombre} {tipo}"
+    for etiquetas, valor in muestras:
+        yield f"{nombre}{_etiquetas(tuple(etiquetas), tuple(etiquetas.values()))} {valor}"
+
+
+class Registro:
+    def __init__(self) -> None:
+        self._metricas: list[Contador | FamiliaHistogramas] = []
+        self._colectores: list[Callable[[], Iterable[str]]] = []
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: tuple[str, ...] = ()) -> Contador:
+        metrica = Contador(nombre, ayuda, etiquetas)
+        self._metricas.append(metrica)
+        return metrica
+
+    def histograma(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = BUCKETS_SEGUNDOS,
+    ) -> FamiliaHistogramas:
+        metrica = FamiliaHistogramas(nombre, ayuda, etiquetas, buckets)
+        self._metricas.append(metrica)
+        return metrica
+
+    def colector(self, fn: Callable[[], Iterable[str]]) -> Callable[[], Iterable[str]]:
+        """Registra `fn`, que devuelve lineas ya formateadas (por ejemplo con gauge())."""
+        self._colectores.append(fn)
+        return fn
+
+    def exponer(self) -> str:
+        lineas: list[str] = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+        for colector in self._colectores:
+            lineas.extend(colector())
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+
+__all__ = [
+    "BUCKETS_CONTEOS",
+    "BUCKETS_SEGUNDOS",
+    "Contador",
+    "FamiliaHistogramas",
+    "Histograma",
+    "Registro",
+    "counter",
+    "gauge",
+    "registro",
+]
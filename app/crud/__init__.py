@@ -1,5 +1,6 @@
 from app.crud import (
     categorias,
+    cierres,
     locaciones,
     marcas,
     movimientos,
@@ -20,4 +21,5 @@ __all__ = [
     "categorias",
     "proveedores",
     "uoms",
+    "cierres",
 ]
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.cierre import Cierre, CierreSaldo
+from app.schemas.cierre import CierreCreate
+
+
+def _total_saldos(db: Session, cierre_ids: list[int]) -> dict[int, int]:
+    if not cierre_ids:
+        return {}
+    stmt = (
+        select(CierreSaldo.cierre_id, func.count())
+        .where(CierreSaldo.cierre_id.in_(cierre_ids))
+        .group_by(CierreSaldo.cierre_id)
+    )
+    return {cierre_id: int(total) for cierre_id, total in db.execute(stmt).all()}
+
+
+def _to_dict(cierre: Cierre, total_saldos: int) -> dict:
+    return {
+        "id": cierre.id,
+        "fecha": cierre.fecha,
+        "nota": cierre.nota,
+        "creado_en": cierre.creado_en,
+        "total_saldos": total_saldos,
+    }
+
+
+def get_multi(db: Session, *, skip: int = 0, limit: int = 100) -> list[dict]:
+    stmt = select(Cierre).order_by(Cierre.fecha.desc()).offset(skip).limit(limit)
+    cierres = db.execute(stmt).scalars().all()
+    totales = _total_saldos(db, [cierre.id for cierre in cierres])
+    return [_to_dict(cierre, totales.get(cierre.id, 0)) for cierre in cierres]
+
+
+def create(db: Session, *, obj_in: CierreCreate) -> dict:
+    fecha = obj_in.fecha if obj_in.fecha is not None else func.now()
+    cierre_id = db.execute(select(func.fn_crear_cierre(fecha, obj_in.nota))).scalar_one()
+    db.commit()
+    cierre = db.get(Cierre, cierre_id)
+    return _to_dict(cierre, _total_saldos(db, [cierre_id]).get(cierre_id, 0))
@@ -0,0 +1,48 @@
+"""Rangos de dias en la zona horaria del negocio para filtrar columnas TIMESTAMPTZ.
+
+Filtrar con ``func.date(columna) == dia`` obliga a calcular la funcion en cada
+fila y descarta los indices sobre ``fecha``. Estos helpers comparan la columna
+directamente contra los limites del dia (``dia AT TIME ZONE tz``), lo que deja
+la condicion indexable (``idx_movimientos_fecha``, ``idx_movimientos_producto_fecha``).
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import DateTime, and_, func, literal
+
+from app.core.config import settings
+
+
+def hoy() -> date:
+    """Fecha actual en la zona horaria del negocio."""
+    return datetime.now(ZoneInfo(settings.business_timezone)).date()
+
+
+def instante_local(ts: datetime) -> datetime:
+    """`ts` expresado en la zona del negocio; sin zona horaria se toma como hora local del negocio."""
+    zona = ZoneInfo(settings.business_timezone)
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=zona)
+    return ts.astimezone(zona)
+
+
+def inicio_dia(dia: date):
+    """Instante (TIMESTAMPTZ) en que comienza `dia` en la zona horaria del negocio."""
+    return func.timezone(settings.business_timezone, literal(datetime.combine(dia, time.min), DateTime()))
+
+
+def rango_dias(columna, desde: date, hasta: date | None = None):
+    """Condicion `desde 00:00 <= columna < (hasta + 1) 00:00` en la zona del negocio (`hasta` inclusive)."""
+    fin = (hasta or desde) + timedelta(days=1)
+    return and_(columna >= inicio_dia(desde), columna < inicio_dia(fin))
+
+
+def dia_local(columna):
+    """Dia calendario de `columna` en la zona del negocio; para agrupar, no para filtrar."""
+    return func.date(func.timezone(settings.business_timezone, columna))
+
+
+__all__ = ["dia_local", "hoy", "inicio_dia", "instante_local", "rango_dias"]
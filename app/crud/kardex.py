@@ -0,0 +1,32 @@
+"""Marca de agua del kardex para caches y ETags.
+
+``version(db)`` devuelve ``(kardex_version, catalogo_version)`` en una consulta
+de una fila. Ambos contadores los incrementan triggers por sentencia en la
+misma transaccion que la escritura, bloqueando su fila hasta el commit: crecen
+en orden de commit, asi que una version leida ya incluye todo lo confirmado
+antes. Cambia con cada escritura de movimientos y de catalogos o productos, que
+es todo lo que puede alterar el stock y los reportes derivados.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.catalogo_version import CatalogoVersion
+from app.models.kardex_version import KardexVersion
+
+Version = tuple[int, int]
+
+
+def version(db: Session) -> Version:
+    # Subconsultas escalares: ambas tablas tienen una sola fila
+    stmt = select(
+        select(KardexVersion.version).scalar_subquery(),
+        select(CatalogoVersion.version).scalar_subquery(),
+    )
+    movimientos, catalogo = db.execute(stmt).one()
+    return movimientos, catalogo
+
+
+__all__ = ["Version", "version"]
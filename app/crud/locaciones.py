@@ -3,6 +3,7 @@ from __future__ import annotations
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.catalog_cache import catalog_cache
 from app.models.locacion import Locacion
 from app.schemas.locacion import LocacionCreate, LocacionUpdate
 
@@ -21,6 +22,7 @@ def create(db: Session, *, obj_in: LocacionCreate) -> Locacion:
     db_obj = Locacion(**obj_in.model_dump())
     db.add(db_obj)
     db.commit()
+    catalog_cache.invalidar()
     db.refresh(db_obj)
     return db_obj
 
@@ -31,5 +33,6 @@ def update(db: Session, *, db_obj: Locacion, obj_in: LocacionUpdate) -> Locacion
         setattr(db_obj, field, value)
     db.add(db_obj)
     db.commit()
+    catalog_cache.invalidar()
     db.refresh(db_obj)
     return db_obj
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+from collections import defaultdict
 from datetime import date
+from decimal import Decimal
 
-from sqlalchemy import func, or_, select
+from sqlalchemy import insert, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
+from app.crud.fechas import rango_dias
+from app.crud.paginacion import Cursor, antes_de_cursor
+from app.crud.referencias import REFERENCIAS, ids_existentes
 from app.models.movimiento import Movimiento, TipoMovimiento
+from app.models.stock_saldo import StockSaldo
 from app.schemas.movimiento import MovimientoCreate
 
 
@@ -19,20 +26,125 @@ def create(db: Session, *, obj_in: MovimientoCreate) -> Movimiento:
     return db_obj
 
 
+def validar_lote(db: Session, *, objs_in: list[MovimientoCreate]) -> list[dict]:
+    """Valida un lote completo antes de insertarlo y devuelve los errores por linea (0-based).
+
+    Las referencias de todo el lote se resuelven en una sola consulta. Para el stock se
+    bloquean (FOR UPDATE) los saldos de todos los pares producto/locacion del
+    lote, en orden (producto_id, locacion_id), y se simula el lote en memoria
+    aplicando las mismas reglas que tg_actualizar_stock_saldos. Los pares sin fila
+    en stock_saldos se crean antes (saldo 0), en el mismo orden: si no, el trigger
+    los insertaria en el orden del lote y dos lotes con los mismos pares nuevos
+    en orden inverso podrian interbloquearse. Los bloqueos quedan tomados hasta el
+    commit de create_lote o el rollback del llamador.
+    """
+    errores: list[dict] = []
+
+    campos = ("producto_id", "from_locacion_id", "to_locacion_id", "persona_id", "proveedor_id")
+    ids_por_modelo: dict[type, set[int]] = {}
+    for obj in objs_in:
+        for campo in campos:
+            valor = getattr(obj, campo)
+            if valor is not None:
+                ids_por_modelo.setdefault(REFERENCIAS[campo].modelo, set()).add(valor)
+    existentes = ids_existentes(db, ids_por_modelo)
+    for linea, obj in enumerate(objs_in):
+        for campo in campos:
+            valor = getattr(obj, campo)
+            referencia = REFERENCIAS[campo]
+            if valor is not None and valor not in existentes[referencia.modelo]:
+                errores.append(
+                    {
+                        "linea": linea,
+                        "code": referencia.code,
+                        "message": referencia.message,
+                        "context": {referencia.context_key: valor},
+                    }
+                )
+    if errores:
+        return errores
+
+    pares = {
+        (obj.producto_id, locacion_id)
+        for obj in objs_in
+        for locacion_id in (obj.from_locacion_id, obj.to_locacion_id)
+        if locacion_id is not None
+    }
+    pares_ordenados = sorted(pares)
+    if pares_ordenados:
+        # Un solo INSERT multi-fila: las filas se insertan (y esperan a otros lotes) en este orden
+        nuevos = [{"producto_id": producto, "locacion_id": locacion} for producto, locacion in pares_ordenados]
+        db.execute(pg_insert(StockSaldo).values(nuevos).on_conflict_do_nothing())
+    saldos_stmt = (
+        select(StockSaldo.producto_id, StockSaldo.locacion_id, StockSaldo.stock)
+        .where(tuple_(StockSaldo.producto_id, StockSaldo.locacion_id).in_(pares_ordenados))
+        .order_by(StockSaldo.producto_id, StockSaldo.locacion_id)
+        .with_for_update()
+    )
+    saldos: dict[tuple[int, int], Decimal] = defaultdict(Decimal)
+    for producto_id, locacion_id, stock in db.execute(saldos_stmt):
+        saldos[(producto_id, locacion_id)] = stock
+
+    for linea, obj in enumerate(objs_in):
+        origen = (obj.producto_id, obj.from_locacion_id)
+        destino = (obj.producto_id, obj.to_locacion_id)
+        if obj.tipo in (TipoMovimiento.uso, TipoMovimiento.traspaso) and saldos[origen] < obj.cantidad:
+            errores.append(
+                {
+                    "linea": linea,
+                    "code": "stock_insuficiente",
+                    "message": "Stock insuficiente en locacion origen",
+                    "context": {
+                        "locacion_id": obj.from_locacion_id,
+                        "disponible": str(saldos[origen]),
+                        "intentado": str(obj.cantidad),
+                    },
+                }
+            )
+            continue
+        if obj.tipo is not TipoMovimiento.uso and obj.to_locacion_id is not None:
+            saldos[destino] += obj.cantidad
+        if obj.tipo is not TipoMovimiento.ingreso and obj.from_locacion_id not in (None, obj.to_locacion_id):
+            saldos[origen] -= obj.cantidad
+
+    return errores
+
+
+def create_lote(db: Session, *, objs_in: list[MovimientoCreate]) -> list[dict]:
+    """Inserta el lote en una sola transaccion (INSERT multi-fila con RETURNING).
+
+    Devuelve filas planas en el orden del lote: a diferencia de entidades ORM,
+    no se expiran con el commit ni requieren un refresh por movimiento.
+    """
+    rows = []
+    for obj_in in objs_in:
+        data = obj_in.model_dump()
+        data["tipo"] = obj_in.tipo.value
+        rows.append(data)
+    stmt = insert(Movimiento).returning(*Movimiento.__table__.c, sort_by_parameter_order=True)
+    movimientos = [dict(row) for row in db.execute(stmt, rows).mappings()]
+    db.commit()
+    return movimientos
+
+
 def get_multi_by_producto(
     db: Session,
     *,
     producto_id: int,
     skip: int = 0,
     limit: int = 100,
+    cursor: Cursor | None = None,
 ) -> list[Movimiento]:
     stmt = (
         select(Movimiento)
         .where(Movimiento.producto_id == producto_id)
-        .order_by(Movimiento.fecha.desc())
-        .offset(skip)
+        .order_by(Movimiento.fecha.desc(), Movimiento.id.desc())
         .limit(limit)
     )
+    if cursor is not None:
+        stmt = stmt.where(antes_de_cursor(cursor))
+    else:
+        stmt = stmt.offset(skip)
     return db.execute(stmt).scalars().all()
 
 
@@ -46,13 +158,17 @@ def get_multi(
     tipo: TipoMovimiento | None = None,
     persona_id: int | None = None,
     proveedor_id: int | None = None,
+    cursor: Cursor | None = None,
 ) -> list[Movimiento]:
     stmt = (
         select(Movimiento)
-        .order_by(Movimiento.fecha.desc())
-        .offset(skip)
+        .order_by(Movimiento.fecha.desc(), Movimiento.id.desc())
         .limit(limit)
     )
+    if cursor is not None:
+        stmt = stmt.where(antes_de_cursor(cursor))
+    else:
+        stmt = stmt.offset(skip)
     if producto_id is not None:
         stmt = stmt.where(Movimiento.producto_id == producto_id)
     if tipo is not None:
@@ -74,7 +190,7 @@ def get_multi(
 def get_por_dia(db: Session, *, fecha: date) -> list[Movimiento]:
     stmt = (
         select(Movimiento)
-        .where(func.date(Movimiento.fecha) == fecha)
+        .where(rango_dias(Movimiento.fecha, fecha))
         .order_by(Movimiento.fecha.desc())
     )
     return db.execute(stmt).scalars().all()
@@ -0,0 +1,61 @@
+"""Paginacion por cursor (keyset) sobre el kardex.
+
+El cursor es opaco para el cliente: codifica la clave `(fecha, id)` de la
+ultima fila entregada. La pagina siguiente filtra `(fecha, id) < cursor` en
+lugar de usar OFFSET, asi que cada pagina cuesta lo mismo sin importar su
+profundidad (``idx_movimientos_fecha``, ``idx_movimientos_producto_fecha``) y
+las filas insertadas mientras se pagina no desplazan los resultados.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from app.models.movimiento import Movimiento
+
+Cursor = tuple[datetime, int]
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no fue generado por la API."""
+
+
+def encode_cursor(fecha: datetime, movimiento_id: int) -> str:
+    raw = f"{fecha.isoformat()}|{movimiento_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        fecha, movimiento_id = raw.split("|")
+        return datetime.fromisoformat(fecha), int(movimiento_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise CursorInvalido(cursor) from exc
+
+
+def antes_de_cursor(cursor: Cursor):
+    """Condicion para las filas posteriores al cursor en orden `fecha DESC, id DESC`."""
+    return tuple_(Movimiento.fecha, Movimiento.id) < tuple_(*cursor)
+
+
+def next_cursor(filas, limit: int) -> str | None:
+    """Cursor de la pagina siguiente, o None si `filas` ya es la ultima pagina."""
+    if len(filas) < limit:
+        return None
+    ultima = filas[-1]
+    return encode_cursor(ultima.fecha, ultima.id)
+
+
+__all__ = [
+    "Cursor",
+    "CursorInvalido",
+    "antes_de_cursor",
+    "decode_cursor",
+    "encode_cursor",
+    "next_cursor",
+]
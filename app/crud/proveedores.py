@@ -3,6 +3,7 @@ from __future__ import annotations
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.catalog_cache import catalog_cache
 from app.models.proveedor import Proveedor
 from app.schemas.proveedor import ProveedorCreate, ProveedorUpdate
 
@@ -25,6 +26,7 @@ def create(db: Session, *, obj_in: ProveedorCreate) -> Proveedor:
     db_obj = Proveedor(**obj_in.model_dump())
     db.add(db_obj)
     db.commit()
+    catalog_cache.invalidar()
     db.refresh(db_obj)
     return db_obj
 
@@ -35,6 +37,7 @@ def update(db: Session, *, db_obj: Proveedor, obj_in: ProveedorUpdate) -> Provee
         setattr(db_obj, field, value)
     db.add(db_obj)
     db.commit()
+    catalog_cache.invalidar()
     db.refresh(db_obj)
     return db_obj
 
@@ -42,3 +45,4 @@ def update(db: Session, *, db_obj: Proveedor, obj_in: ProveedorUpdate) -> Provee
 def delete(db: Session, *, db_obj: Proveedor) -> None:
     db.delete(db_obj)
     db.commit()
+    catalog_cache.invalidar()
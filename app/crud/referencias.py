@@ -0,0 +1,96 @@
+"""Validacion de claves foraneas en una sola consulta.
+
+En lugar de un ``crud.<modelo>.get`` por cada id referenciado, los catalogos
+cacheados se resuelven en memoria y el resto se arma como un ``UNION ALL`` con
+un ``SELECT id`` por tabla, resolviendo todos los ids de una vez. Cada campo
+conoce el codigo y mensaje de error que la API ya usaba.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.catalog_cache import catalog_cache
+from app.db.base_class import Base
+from app.models.categoria import Categoria
+from app.models.locacion import Locacion
+from app.models.marca import Marca
+from app.models.persona import Persona
+from app.models.producto import Producto
+from app.models.proveedor import Proveedor
+from app.models.uom import UOM
+
+
+class Referencia(NamedTuple):
+    modelo: type[Base]
+    code: str
+    message: str
+    context_key: str
+
+
+REFERENCIAS: dict[str, Referencia] = {
+    "producto_id": Referencia(Producto, "producto_not_found", "Producto no encontrado", "producto_id"),
+    "locacion_id": Referencia(Locacion, "locacion_not_found", "Locacion no encontrada", "locacion_id"),
+    "from_locacion_id": Referencia(Locacion, "locacion_not_found", "Locacion origen no encontrada", "locacion_id"),
+    "to_locacion_id": Referencia(Locacion, "locacion_not_found", "Locacion destino no encontrada", "locacion_id"),
+    "persona_id": Referencia(Persona, "persona_not_found", "Persona no encontrada", "persona_id"),
+    "proveedor_id": Referencia(Proveedor, "proveedor_not_found", "Proveedor no encontrado", "proveedor_id"),
+    "uom_id": Referencia(UOM, "uom_not_found", "Unidad de medida no encontrada", "uom_id"),
+    "marca_id": Referencia(Marca, "marca_not_found", "Marca no encontrada", "marca_id"),
+    "categoria_id": Referencia(Categoria, "categoria_not_found", "Categoria no encontrada", "categoria_id"),
+}
+
+
+def ids_existentes(db: Session, ids_por_modelo: dict[type[Base], set[int]]) -> dict[type[Base], set[int]]:
+    """Devuelve, por modelo, cuales de los ids pedidos existen (como maximo una consulta).
+
+    Los catalogos en cache se resuelven en memoria; solo los ids que no estan en
+    la cache (productos, o catalogos recien creados en otro nodo) van a la base.
+    Sin ids pedidos no consulta nada, ni siquiera la version de la cache.
+    """
+    existentes: dict[type[Base], set[int]] = {modelo: set() for modelo in ids_por_modelo}
+    if not any(ids_por_modelo.values()):
+        return existentes
+
+    catalogos = catalog_cache.get(db)
+    pedidos: dict[type[Base], set[int]] = {}
+    for modelo, ids in ids_por_modelo.items():
+        en_cache = catalogos.por_modelo(modelo)
+        if en_cache is not None:
+            existentes[modelo] = ids & en_cache.keys()
+            ids = ids - existentes[modelo]
+        if ids:
+            pedidos[modelo] = ids
+    if not pedidos:
+        return existentes
+
+    modelos = list(pedidos)
+    selects = [
+        select(literal(indice).label("modelo"), modelo.id.label("id")).where(modelo.id.in_(ids))
+        for indice, (modelo, ids) in enumerate(pedidos.items())
+    ]
+    stmt = union_all(*selects) if len(selects) > 1 else selects[0]
+    for indice, id_ in db.execute(stmt):
+        existentes[modelos[indice]].add(id_)
+    return existentes
+
+
+def faltantes(db: Session, valores: dict[str, int | None]) -> list[tuple[str, int]]:
+    """Campos de `valores` (claves de REFERENCIAS) cuyo id no existe, en el orden recibido."""
+    ids_por_modelo: dict[type[Base], set[int]] = {}
+    for campo, valor in valores.items():
+        if valor is not None:
+            ids_por_modelo.setdefault(REFERENCIAS[campo].modelo, set()).add(valor)
+
+    existentes = ids_existentes(db, ids_por_modelo)
+    return [
+        (campo, valor)
+        for campo, valor in valores.items()
+        if valor is not None and valor not in existentes[REFERENCIAS[campo].modelo]
+    ]
+
+
+__all__ = ["REFERENCIAS", "Referencia", "faltantes", "ids_existentes"]
@@ -0,0 +1,89 @@
+"""Lectura de ventanas de movimientos sobre ``mov_rollup_diario``.
+
+Los reportes de "ultimos N dias" cortan la ventana en un instante
+(``ahora - N dias``), no en un limite de dia. ``movimientos_desde`` arma la
+ventana con los dias completos desde la tabla de agregados diarios (una fila
+por dia y combinacion de claves) y solo el tramo del primer dia, que queda
+parcial, desde el kardex. El costo depende de la cantidad de dias y claves
+distintas, no de la cantidad de movimientos.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Integer, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.fechas import inicio_dia
+from app.models.mov_rollup import MovRollupDiario
+from app.models.movimiento import Movimiento, TipoMovimiento
+
+CLAVES = ("tipo", "producto_id", "from_locacion_id", "to_locacion_id", "persona_id", "proveedor_id")
+
+
+def primer_dia_completo(desde: datetime) -> date:
+    """Primer dia (zona del negocio) que empieza en o despues de `desde`."""
+    local = desde.astimezone(ZoneInfo(settings.business_timezone))
+    if local.time() == time.min:
+        return local.date()
+    return local.date() + timedelta(days=1)
+
+
+def movimientos_desde(desde: datetime, *, tipo: TipoMovimiento | None = None):
+    """Subconsulta con los movimientos de `fecha >= desde`, agregados.
+
+    Columnas: las de ``CLAVES`` mas ``cantidad`` (suma) y ``movimientos``
+    (cantidad de movimientos). Una misma clave puede repetirse (una fila del
+    tramo parcial y otra por cada dia completo): los reportes vuelven a agrupar.
+    """
+    dia = primer_dia_completo(desde)
+
+    crudos = select(
+        *(getattr(Movimiento, clave).label(clave) for clave in CLAVES),
+        Movimiento.cantidad.label("cantidad"),
+        literal(1, Integer).label("movimientos"),
+    ).where(Movimiento.fecha >= desde, Movimiento.fecha < inicio_dia(dia))
+
+    agregados = select(
+        *(getattr(MovRollupDiario, clave).label(clave) for clave in CLAVES),
+        MovRollupDiario.cantidad_sum.label("cantidad"),
+        MovRollupDiario.count.label("movimientos"),
+    ).where(MovRollupDiario.dia >= dia)
+
+    if tipo is not None:
+        crudos = crudos.where(Movimiento.tipo == tipo)
+        agregados = agregados.where(MovRollupDiario.tipo == tipo)
+    return union_all(crudos, agregados).subquery("ventana")
+
+
+def verificar(db: Session, desde: date | None = None, hasta: date | None = None, *, limite: int = 100):
+    """Diferencias entre ``mov_rollup_diario`` y el kardex (``fn_verificar_mov_rollup``).
+
+    Devuelve la cantidad total de diferencias y las primeras `limite`.
+    """
+    diferencias = func.fn_verificar_mov_rollup(desde, hasta).table_valued(
+        "dia",
+        *CLAVES,
+        "cantidad_rollup",
+        "cantidad_kardex",
+        "count_rollup",
+        "count_kardex",
+    )
+    filas = db.execute(select(diferencias).limit(limite)).mappings().all()
+    if len(filas) < limite:
+        return len(filas), filas
+    total = db.execute(select(func.count()).select_from(diferencias)).scalar_one()
+    return total, filas
+
+
+def reconstruir(db: Session, desde: date | None = None) -> int:
+    """Regenera ``mov_rollup_diario`` desde `desde` (None = completa); devuelve las filas escritas."""
+    filas = db.execute(select(func.fn_reconstruir_mov_rollup(desde))).scalar_one()
+    db.commit()
+    return filas
+
+
+__all__ = ["CLAVES", "movimientos_desde", "primer_dia_completo", "reconstruir", "verificar"]
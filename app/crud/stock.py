@@ -1,17 +1,38 @@
 from __future__ import annotations
 
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
-
-from sqlalchemy import and_, case, func, select
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import (
+    Date,
+    Integer,
+    Numeric,
+    and_,
+    cast,
+    column,
+    func,
+    literal,
+    literal_column,
+    select,
+    true,
+    union_all,
+)
 from sqlalchemy.orm import Session
 
+from app.core.catalog_cache import catalog_cache
+from app.crud.fechas import dia_local, inicio_dia, instante_local, rango_dias
 from app.models.categoria import Categoria
 from app.models.locacion import Locacion
-from app.models.movimiento import Movimiento, TipoMovimiento
 from app.models.producto import Producto
+from app.models.stock_diario import StockDiario
+from app.models.stock_saldo import StockSaldo
 from app.models.uom import UOM
-from app.models.vista_stock import VistaStockActual
+from app.models.vista_stock import VistaMovimientoLocacion, VistaStockActual
+
+# SQLSTATE con que fn_saldos_antes_de rechaza instantes anteriores al horizonte de archivo
+KARDEX_ARCHIVADO = "22A01"
 
 
 def get_all(db: Session) -> list[VistaStockActual]:
@@ -33,27 +54,34 @@ def get_filtered(
 
 
 def get_grouped_by_locacion(db: Session, *, include_zero: bool = False) -> list[dict]:
+    # Sin ceros basta con las filas de stock_saldos; la vista solo hace falta para completar pares vacios
+    source = VistaStockActual if include_zero else StockSaldo
     stmt = (
         select(
-            VistaStockActual.locacion_id.label("locacion_id"),
-            Locacion.nombre.label("locacion_nombre"),
-            Locacion.activa.label("locacion_activa"),
-            VistaStockActual.producto_id.label("producto_id"),
+            source.locacion_id.label("locacion_id"),
+            source.producto_id.label("producto_id"),
             Producto.nombre.label("producto_nombre"),
             Producto.sku.label("producto_sku"),
             Producto.activo.label("producto_activo"),
-            UOM.id.label("uom_id"),
-            UOM.nombre.label("uom_nombre"),
-            UOM.abreviatura.label("uom_abreviatura"),
-            VistaStockActual.stock.label("stock"),
+            Producto.uom_id.label("uom_id"),
+            source.stock.label("stock"),
         )
-        .join(Locacion, VistaStockActual.locacion_id == Locacion.id)
-        .join(Producto, VistaStockActual.producto_id == Producto.id)
-        .join(UOM, Producto.uom_id == UOM.id)
-        .order_by(Locacion.nombre, Producto.nombre)
+        .join(Producto, source.producto_id == Producto.id)
+        .order_by(Producto.nombre)
     )
+    if not include_zero:
+        stmt = stmt.where(StockSaldo.stock > 0)
 
     rows = db.execute(stmt).mappings().all()
+
+    # Locaciones y unidades salen de la cache de catalogos en lugar de joins
+    catalogos = catalog_cache.get_con(
+        db,
+        {
+            Locacion: {row["locacion_id"] for row in rows},
+            UOM: {row["uom_id"] for row in rows},
+        },
+    )
     grouped: dict[int, dict] = {}
 
     for row in rows:
@@ -62,17 +90,18 @@ def get_grouped_by_locacion(db: Session, *, include_zero: bool = False) -> list[
             continue
 
         locacion_id = row["locacion_id"]
-        locacion = grouped.setdefault(
-            locacion_id,
-            {
+        locacion = grouped.get(locacion_id)
+        if locacion is None:
+            datos_locacion = catalogos.locaciones[locacion_id]
+            locacion = grouped[locacion_id] = {
                 "locacion_id": locacion_id,
-                "locacion_nombre": row["locacion_nombre"],
-                "activa": row["locacion_activa"],
+                "locacion_nombre": datos_locacion["nombre"],
+                "activa": datos_locacion["activa"],
                 "total_stock": Decimal("0"),
                 "items": [],
-            },
-        )
+            }
 
+        uom = catalogos.uoms[row["uom_id"]]
         locacion["items"].append(
             {
                 "producto_id": row["producto_id"],
@@ -80,8 +109,8 @@ def get_grouped_by_locacion(db: Session, *, include_zero: bool = False) -> list[
                 "sku": row["producto_sku"],
                 "activo": row["producto_activo"],
                 "uom_id": row["uom_id"],
-                "uom_nombre": row["uom_nombre"],
-                "uom_abreviatura": row["uom_abreviatura"],
+                "uom_nombre": uom["nombre"],
+                "uom_abreviatura": uom["abreviatura"],
                 "stock": stock,
             }
         )
@@ -90,54 +119,73 @@ def get_grouped_by_locacion(db: Session, *, include_zero: bool = False) -> list[
     return sorted(grouped.values(), key=lambda loc: loc["locacion_nombre"])
 
 
-def get_total_por_dia(db: Session, *, fecha: date) -> list[dict]:
-    entrada_tipos = (TipoMovimiento.ingreso, TipoMovimiento.traspaso, TipoMovimiento.ajuste)
-    salida_tipos = (TipoMovimiento.uso, TipoMovimiento.traspaso, TipoMovimiento.ajuste)
-
-    ingreso_expr = case(
-        (
-            and_(
-                Movimiento.to_locacion_id.isnot(None),
-                Movimiento.tipo.in_(entrada_tipos),
-            ),
-            Movimiento.cantidad,
-        ),
-        else_=0,
-    )
-    salida_expr = case(
-        (
-            and_(
-                Movimiento.from_locacion_id.isnot(None),
-                Movimiento.tipo.in_(salida_tipos),
-            ),
-            Movimiento.cantidad,
-        ),
-        else_=0,
+def rebuild_saldos(db: Session) -> int:
+    """Re-deriva stock_saldos desde el kardex y devuelve la cantidad de filas generadas."""
+    filas = db.execute(select(func.fn_reconstruir_stock_saldos())).scalar_one()
+    db.commit()
+    return int(filas or 0)
+
+
+def cerrar_stock_diario(db: Session, *, hasta: date) -> date:
+    """Cierra las fotos diarias pendientes hasta `hasta` (como maximo ayer) y devuelve el ultimo dia cerrado.
+
+    Escribe y confirma: lo usa el cierre programado (``app.db.cerrar_stock_diario``),
+    nunca los reportes, que leen con ``ultimo_dia_cerrado``.
+    """
+    cerrado = db.execute(select(func.fn_cerrar_stock_diario(hasta))).scalar_one()
+    db.commit()
+    return cerrado
+
+
+def ultimo_dia_cerrado(db: Session, *, hasta: date) -> date:
+    """Ultimo dia con foto en stock_diario, como maximo `hasta` (``date.min`` si no hay fotos).
+
+    Solo lee: los dias posteriores se calculan desde el kardex, igual en la
+    primaria que en la replica.
+    """
+    ultimo = db.execute(select(func.max(StockDiario.fecha))).scalar_one()
+    return min(ultimo, hasta) if ultimo is not None else date.min
+
+
+def saldos_antes_de(antes_de, *, producto_id: int | None = None, locacion_id: int | None = None):
+    """Saldos (producto_id, locacion_id, stock) de los movimientos con fecha anterior a `antes_de`.
+
+    fn_saldos_antes_de parte del cierre o la foto diaria mas cercana y solo suma los movimientos posteriores.
+    Antes del ultimo mes archivado falla con ``DataError`` (SQLSTATE ``KARDEX_ARCHIVADO``).
+    """
+    return func.fn_saldos_antes_de(antes_de, producto_id, locacion_id).table_valued(
+        column("producto_id", Integer),
+        column("locacion_id", Integer),
+        column("stock", Numeric(14, 3)),
+        name="saldos",
     )
-    saldo_expr = ingreso_expr - salida_expr
+
+
+def get_total_por_dia(db: Session, *, fecha: date) -> list[dict]:
+    saldos = saldos_antes_de(inicio_dia(fecha + timedelta(days=1)))
+    total_expr = func.coalesce(func.sum(saldos.c.stock), 0)
 
     stmt = (
         select(
-            Movimiento.producto_id.label("producto_id"),
+            saldos.c.producto_id.label("producto_id"),
             Producto.nombre.label("producto_nombre"),
             Producto.sku.label("sku"),
             UOM.id.label("uom_id"),
             UOM.nombre.label("uom_nombre"),
             UOM.abreviatura.label("uom_abreviatura"),
-            func.coalesce(func.sum(saldo_expr), 0).label("total_stock"),
+            total_expr.label("total_stock"),
         )
-        .join(Producto, Producto.id == Movimiento.producto_id)
+        .join(Producto, Producto.id == saldos.c.producto_id)
         .join(UOM, Producto.uom_id == UOM.id)
-        .where(func.date(Movimiento.fecha) <= fecha)
         .group_by(
-            Movimiento.producto_id,
+            saldos.c.producto_id,
             Producto.nombre,
             Producto.sku,
             UOM.id,
             UOM.nombre,
             UOM.abreviatura,
         )
-        .having(func.coalesce(func.sum(saldo_expr), 0) > 0)
+        .having(total_expr > 0)
         .order_by(Producto.nombre)
     )
 
@@ -156,6 +204,45 @@ def get_total_por_dia(db: Session, *, fecha: date) -> list[dict]:
     ]
 
 
+def get_as_of(
+    db: Session,
+    *,
+    ts: datetime,
+    producto_id: int | None = None,
+    locacion_id: int | None = None,
+) -> list[dict]:
+    """Saldo por producto y locacion en el instante `ts`, incluyendo los movimientos registrados en `ts`.
+
+    Un `ts` sin zona horaria se interpreta en la zona del negocio (``instante_local``).
+    """
+    ts = instante_local(ts)
+    # fecha es TIMESTAMPTZ con resolucion de microsegundos: < ts + 1us equivale a <= ts
+    saldos = saldos_antes_de(
+        ts + timedelta(microseconds=1),
+        producto_id=producto_id,
+        locacion_id=locacion_id,
+    )
+
+    stmt = (
+        select(
+            saldos.c.producto_id.label("producto_id"),
+            Producto.nombre.label("producto_nombre"),
+            Producto.sku.label("sku"),
+            saldos.c.locacion_id.label("locacion_id"),
+            Locacion.nombre.label("locacion_nombre"),
+            UOM.id.label("uom_id"),
+            UOM.abreviatura.label("uom_abreviatura"),
+            saldos.c.stock.label("stock"),
+        )
+        .join(Producto, Producto.id == saldos.c.producto_id)
+        .join(Locacion, Locacion.id == saldos.c.locacion_id)
+        .join(UOM, Producto.uom_id == UOM.id)
+        .where(saldos.c.stock != 0)
+        .order_by(Locacion.nombre, Producto.nombre)
+    )
+    return [dict(row) for row in db.execute(stmt).mappings().all()]
+
+
 def get_weekly_inventory(
     db: Session,
     *,
@@ -165,206 +252,126 @@ def get_weekly_inventory(
     producto_ids: list[int] | None = None,
     include_zero: bool = False,
 ) -> dict:
-    """Calcula el inventario diario por producto para el rango semanal solicitado."""
-
-    entrada_tipos = (TipoMovimiento.ingreso, TipoMovimiento.traspaso, TipoMovimiento.ajuste)
-    salida_tipos = (TipoMovimiento.uso, TipoMovimiento.traspaso, TipoMovimiento.ajuste)
-
-    ingreso_expr = case(
-        (
-            and_(
-                Movimiento.to_locacion_id.isnot(None),
-                Movimiento.tipo.in_(entrada_tipos),
-            ),
-            Movimiento.cantidad,
-        ),
-        else_=0,
-    )
-    egreso_expr = case(
-        (
-            and_(
-                Movimiento.from_locacion_id.isnot(None),
-                Movimiento.tipo.in_(salida_tipos),
-            ),
-            Movimiento.cantidad,
-        ),
-        else_=0,
-    )
-    saldo_expr = ingreso_expr - egreso_expr
-    fecha_col = func.date(Movimiento.fecha)
+    """Calcula el inventario diario por producto para el rango semanal solicitado.
 
-    pre_filters = []
-    if categoria_ids:
-        pre_filters.append(Producto.categoria_id.in_(categoria_ids))
-    if producto_ids:
-        pre_filters.append(Movimiento.producto_id.in_(producto_ids))
+    Una sola consulta arma la grilla producto x dia (generate_series), suma los
+    movimientos de cada dia y acumula `stock_end` con una ventana por producto;
+    las filas llegan ordenadas y aqui solo se agrupan.
+    """
 
-    base_cutoff = start_date - timedelta(days=1)
+    cerrado = ultimo_dia_cerrado(db, hasta=end_date)
 
-    base_stmt = (
+    # Saldo de apertura por producto (cierre o foto diaria mas cercana + kardex)
+    saldos = saldos_antes_de(inicio_dia(start_date))
+    inicial = (
         select(
-            Movimiento.producto_id.label("producto_id"),
-            Producto.nombre.label("producto_nombre"),
-            Producto.sku.label("sku"),
-            Producto.activo.label("activo"),
-            Producto.categoria_id.label("categoria_id"),
-            Categoria.nombre.label("categoria_nombre"),
-            UOM.id.label("uom_id"),
-            UOM.nombre.label("uom_nombre"),
-            UOM.abreviatura.label("uom_abreviatura"),
-            func.coalesce(func.sum(saldo_expr), 0).label("stock"),
+            saldos.c.producto_id.label("producto_id"),
+            func.sum(saldos.c.stock).label("stock"),
         )
-        .join(Producto, Producto.id == Movimiento.producto_id)
-        .join(UOM, Producto.uom_id == UOM.id)
-        .outerjoin(Categoria, Producto.categoria_id == Categoria.id)
-        .where(fecha_col <= base_cutoff)
+        .group_by(saldos.c.producto_id)
+        .cte("inicial")
     )
 
-    for condition in pre_filters:
-        base_stmt = base_stmt.where(condition)
-
-    base_stmt = base_stmt.group_by(
-        Movimiento.producto_id,
-        Producto.nombre,
-        Producto.sku,
-        Producto.activo,
-        Producto.categoria_id,
-        Categoria.nombre,
-        UOM.id,
-        UOM.nombre,
-        UOM.abreviatura,
+    # Dias cerrados se leen de stock_diario; los posteriores al ultimo cierre, del kardex
+    daily_sources = []
+    if start_date <= cerrado:
+        daily_sources.append(
+            select(
+                StockDiario.producto_id.label("producto_id"),
+                StockDiario.fecha.label("fecha"),
+                StockDiario.ingresos.label("ingresos"),
+                StockDiario.egresos.label("egresos"),
+                StockDiario.neto.label("neto"),
+            ).where(
+                StockDiario.fecha >= start_date,
+                StockDiario.fecha <= min(end_date, cerrado),
+            )
+        )
+    if end_date > cerrado:
+        abiertos_desde = max(start_date, cerrado + timedelta(days=1))
+        daily_sources.append(
+            select(
+                VistaMovimientoLocacion.producto_id.label("producto_id"),
+                dia_local(VistaMovimientoLocacion.fecha).label("fecha"),
+                func.greatest(VistaMovimientoLocacion.cantidad, 0).label("ingresos"),
+                func.greatest(-VistaMovimientoLocacion.cantidad, 0).label("egresos"),
+                VistaMovimientoLocacion.cantidad.label("neto"),
+            ).where(rango_dias(VistaMovimientoLocacion.fecha, abiertos_desde, end_date))
+        )
+    fuentes = (union_all(*daily_sources) if len(daily_sources) > 1 else daily_sources[0]).subquery("fuentes")
+    diario = (
+        select(
+            fuentes.c.producto_id,
+            fuentes.c.fecha,
+            func.sum(fuentes.c.ingresos).label("ingresos"),
+            func.sum(fuentes.c.egresos).label("egresos"),
+            func.sum(fuentes.c.neto).label("neto"),
+        )
+        .group_by(fuentes.c.producto_id, fuentes.c.fecha)
+        .cte("diario")
     )
 
-    base_rows = db.execute(base_stmt).mappings().all()
-    base_map: dict[int, dict] = {row["producto_id"]: dict(row) for row in base_rows}
-
-    weekly_stmt = (
+    productos_stmt = (
         select(
-            Movimiento.producto_id.label("producto_id"),
-            fecha_col.label("fecha"),
-            func.coalesce(func.sum(ingreso_expr), 0).label("ingresos"),
-            func.coalesce(func.sum(egreso_expr), 0).label("egresos"),
-            func.coalesce(func.sum(saldo_expr), 0).label("neto"),
+            Producto.id.label("producto_id"),
             Producto.nombre.label("producto_nombre"),
             Producto.sku.label("sku"),
-            Producto.activo.label("activo"),
             Producto.categoria_id.label("categoria_id"),
             Categoria.nombre.label("categoria_nombre"),
             UOM.id.label("uom_id"),
             UOM.nombre.label("uom_nombre"),
             UOM.abreviatura.label("uom_abreviatura"),
         )
-        .join(Producto, Producto.id == Movimiento.producto_id)
         .join(UOM, Producto.uom_id == UOM.id)
         .outerjoin(Categoria, Producto.categoria_id == Categoria.id)
-        .where(fecha_col >= start_date)
-        .where(fecha_col <= end_date)
-    )
-
-    for condition in pre_filters:
-        weekly_stmt = weekly_stmt.where(condition)
-
-    weekly_stmt = weekly_stmt.group_by(
-        Movimiento.producto_id,
-        fecha_col,
-        Producto.nombre,
-        Producto.sku,
-        Producto.activo,
-        Producto.categoria_id,
-        Categoria.nombre,
-        UOM.id,
-        UOM.nombre,
-        UOM.abreviatura,
     )
-
-    weekly_rows = db.execute(weekly_stmt).mappings().all()
-
-    product_meta: dict[int, dict] = {}
-    daily_map: dict[tuple[int, date], dict] = {}
-
-    for row in weekly_rows:
-        producto_id = row["producto_id"]
-        product_meta[producto_id] = {
-            "producto_id": producto_id,
-            "producto_nombre": row["producto_nombre"],
-            "sku": row["sku"],
-            "activo": row["activo"],
-            "categoria_id": row["categoria_id"],
-            "categoria_nombre": row["categoria_nombre"],
-            "uom_id": row["uom_id"],
-            "uom_nombre": row["uom_nombre"],
-            "uom_abreviatura": row["uom_abreviatura"],
-        }
-        key = (producto_id, row["fecha"])
-        current = daily_map.setdefault(
-            key,
-            {
-                "ingresos": Decimal("0"),
-                "egresos": Decimal("0"),
-                "neto": Decimal("0"),
-            },
+    if categoria_ids:
+        productos_stmt = productos_stmt.where(Producto.categoria_id.in_(categoria_ids))
+    if producto_ids:
+        productos_stmt = productos_stmt.where(Producto.id.in_(producto_ids))
+    if not include_zero:
+        # Sin stock de apertura ni movimientos en el rango, el producto queda en cero todos los dias
+        con_datos = union_all(
+            select(inicial.c.producto_id).where(inicial.c.stock != 0),
+            select(diario.c.producto_id),
         )
-        current["ingresos"] += row["ingresos"]
-        current["egresos"] += row["egresos"]
-        current["neto"] += row["neto"]
+        productos_stmt = productos_stmt.where(Producto.id.in_(con_datos))
+    productos = productos_stmt.cte("catalogo")
+
+    serie = func.generate_series(
+        literal(start_date, Date()),
+        literal(end_date, Date()),
+        literal_column("interval '1 day'"),
+    ).table_valued("dia").render_derived(name="serie")
+    dias = select(cast(serie.c.dia, Date).label("dia")).subquery("dias")
+
+    ingresos = func.coalesce(diario.c.ingresos, 0)
+    egresos = func.coalesce(diario.c.egresos, 0)
+    neto = func.coalesce(diario.c.neto, 0)
+    stock_inicial = func.coalesce(inicial.c.stock, 0)
+    por_producto = {"partition_by": productos.c.producto_id}
 
-    for producto_id, row in base_map.items():
-        product_meta.setdefault(
-            producto_id,
-            {
-                "producto_id": producto_id,
-                "producto_nombre": row["producto_nombre"],
-                "sku": row["sku"],
-                "activo": row["activo"],
-                "categoria_id": row["categoria_id"],
-                "categoria_nombre": row["categoria_nombre"],
-                "uom_id": row["uom_id"],
-                "uom_nombre": row["uom_nombre"],
-                "uom_abreviatura": row["uom_abreviatura"],
-            },
+    stmt = (
+        select(
+            productos,
+            dias.c.dia.label("fecha"),
+            ingresos.label("ingresos"),
+            egresos.label("egresos"),
+            neto.label("neto"),
+            stock_inicial.label("stock_inicial"),
+            (stock_inicial + func.sum(neto).over(**por_producto, order_by=dias.c.dia)).label("stock_end"),
+            func.sum(ingresos).over(**por_producto).label("total_ingresos"),
+            func.sum(egresos).over(**por_producto).label("total_egresos"),
         )
-
-    producto_ids_considerados = set(product_meta.keys())
-
-    if not producto_ids_considerados:
-        # Consider incluir productos filtrados aunque no tengan movimientos
-        meta_stmt = select(
-            Producto.id,
-            Producto.nombre,
-            Producto.sku,
-            Producto.activo,
-            Producto.categoria_id,
-            Categoria.nombre,
-            UOM.id,
-            UOM.nombre,
-            UOM.abreviatura,
-        ).join(UOM, Producto.uom_id == UOM.id).outerjoin(Categoria, Producto.categoria_id == Categoria.id)
-
-        if categoria_ids:
-            meta_stmt = meta_stmt.where(Producto.categoria_id.in_(categoria_ids))
-        if producto_ids:
-            meta_stmt = meta_stmt.where(Producto.id.in_(producto_ids))
-
-        meta_rows = db.execute(meta_stmt).all()
-        for (pid, nombre, sku, activo, cat_id, cat_nombre, uom_id, uom_nombre, uom_abrev) in meta_rows:
-            product_meta[pid] = {
-                "producto_id": pid,
-                "producto_nombre": nombre,
-                "sku": sku,
-                "activo": activo,
-                "categoria_id": cat_id,
-                "categoria_nombre": cat_nombre,
-                "uom_id": uom_id,
-                "uom_nombre": uom_nombre,
-                "uom_abreviatura": uom_abrev,
-            }
-        producto_ids_considerados = set(product_meta.keys())
-
-    days: list[date] = []
-    cursor = start_date
-    while cursor <= end_date:
-        days.append(cursor)
-        cursor += timedelta(days=1)
+        .select_from(productos)
+        .join(dias, true())
+        .outerjoin(
+            diario,
+            and_(diario.c.producto_id == productos.c.producto_id, diario.c.fecha == dias.c.dia),
+        )
+        .outerjoin(inicial, inicial.c.producto_id == productos.c.producto_id)
+        .order_by(productos.c.producto_id, dias.c.dia)
+    )
 
     DecimalZero = Decimal("0")
     items: list[dict] = []
@@ -373,73 +380,41 @@ def get_weekly_inventory(
     total_ingresos = DecimalZero
     total_egresos = DecimalZero
 
-    for producto_id in sorted(producto_ids_considerados):
-        meta = product_meta.get(producto_id)
-        if not meta:
-            continue
-
-        base_row = base_map.get(producto_id)
-        stock_inicial = Decimal(base_row["stock"]) if base_row else DecimalZero
-        running_stock = stock_inicial
-        producto_tiene_datos = stock_inicial != DecimalZero
-        producto_total_ingresos = DecimalZero
-        producto_total_egresos = DecimalZero
+    filas = db.execute(stmt).mappings()
+    for producto_id, grupo in groupby(filas, key=itemgetter("producto_id")):
         daily_records: list[dict] = []
-
-        for day in days:
-            daily = daily_map.get((producto_id, day))
-            ingresos = daily["ingresos"] if daily else DecimalZero
-            egresos = daily["egresos"] if daily else DecimalZero
-            neto = daily["neto"] if daily else DecimalZero
-            running_stock += neto
-            if daily:
-                producto_tiene_datos = True
-            if ingresos:
-                producto_total_ingresos += ingresos
-            if egresos:
-                producto_total_egresos += egresos
-
-            if neto:
-                producto_tiene_datos = True
-            if running_stock:
-                producto_tiene_datos = True
-
+        for row in grupo:
             daily_records.append(
                 {
-                    "date": day,
-                    "ingresos": ingresos,
-                    "egresos": egresos,
-                    "neto": neto,
-                    "stock_end": running_stock,
+                    "date": row["fecha"],
+                    "ingresos": row["ingresos"],
+                    "egresos": row["egresos"],
+                    "neto": row["neto"],
+                    "stock_end": row["stock_end"],
                 }
             )
 
-        stock_final = running_stock
-        variation = stock_final - stock_inicial
-
-        if not include_zero and not producto_tiene_datos:
-            continue
-
-        total_stock_inicial += stock_inicial
+        stock_final = daily_records[-1]["stock_end"]
+        total_stock_inicial += row["stock_inicial"]
         total_stock_final += stock_final
-        total_ingresos += producto_total_ingresos
-        total_egresos += producto_total_egresos
+        total_ingresos += row["total_ingresos"]
+        total_egresos += row["total_egresos"]
 
         items.append(
             {
                 "producto_id": producto_id,
-                "producto_nombre": meta["producto_nombre"],
-                "sku": meta["sku"],
-                "categoria_id": meta["categoria_id"],
-                "categoria_nombre": meta["categoria_nombre"],
-                "uom_id": meta["uom_id"],
-                "uom_nombre": meta["uom_nombre"],
-                "uom_abreviatura": meta["uom_abreviatura"],
-                "stock_inicial": stock_inicial,
+                "producto_nombre": row["producto_nombre"],
+                "sku": row["sku"],
+                "categoria_id": row["categoria_id"],
+                "categoria_nombre": row["categoria_nombre"],
+                "uom_id": row["uom_id"],
+                "uom_nombre": row["uom_nombre"],
+                "uom_abreviatura": row["uom_abreviatura"],
+                "stock_inicial": row["stock_inicial"],
                 "stock_final": stock_final,
-                "total_ingresos": producto_total_ingresos,
-                "total_egresos": producto_total_egresos,
-                "variation": variation,
+                "total_ingresos": row["total_ingresos"],
+                "total_egresos": row["total_egresos"],
+                "variation": stock_final - row["stock_inicial"],
                 "daily": daily_records,
             }
         )
@@ -3,6 +3,7 @@ from __future__ import annotations
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.catalog_cache import catalog_cache
 from app.models.uom import UOM
 from app.schemas.uom import UOMCreate, UOMUpdate
 
@@ -30,6 +31,7 @@ def create(db: Session, *, obj_in: UOMCreate) -> UOM:
     db_obj = UOM(**obj_in.model_dump())
     db.add(db_obj)
     db.commit()
+    catalog_cache.invalidar()
     db.refresh(db_obj)
     return db_obj
 
@@ -40,6 +42,7 @@ def update(db: Session, *, db_obj: UOM, obj_in: UOMUpdate) -> UOM:
         setattr(db_obj, field, value)
     db.add(db_obj)
     db.commit()
+    catalog_cache.invalidar()
     db.refresh(db_obj)
     return db_obj
 
@@ -47,3 +50,4 @@ def update(db: Session, *, db_obj: UOM, obj_in: UOMUpdate) -> UOM:
 def delete(db: Session, *, db_obj: UOM) -> None:
     db.delete(db_obj)
     db.commit()
+    catalog_cache.invalidar()
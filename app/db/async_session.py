@@ -0,0 +1,142 @@
+"""Engine y sesiones async (asyncpg), opcionales via ``settings.async_db_enabled``.
+
+Convive con el engine sync de ``app.db.session``: los endpoints migrados usan
+``get_async_db`` y el resto sigue con ``get_db``. La logica de ``app/crud`` y
+``app/services`` es la misma en ambos casos; ``asincrono`` la ejecuta sobre la
+conexion async con ``AsyncSession.run_sync``, sin ocupar un hilo del threadpool
+mientras espera a la base.
+
+Las lecturas (``get_async_read_db``) van a la replica con el mismo control de
+retraso que ``app.db.replica.sesion_lectura``: comparten ``estado_replica``,
+pero la medicion del retraso se hace con el engine async para no bloquear el
+event loop.
+"""
+
+from __future__ import annotations
+
+import functools
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from typing import Concatenate, ParamSpec, TypeVar
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.replica import LAG_SQL, TIMEOUT_PARAMS, TIMEOUT_SQL, estado_replica
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+_engine: AsyncEngine | None = None
+_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+_read_engine: AsyncEngine | None = None
+_read_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+
+
+def _crear_engine(url: str, *, replica: bool = False) -> AsyncEngine:
+    # Las funciones de db/schema.sql leen la zona del negocio desde inventario.zona_horaria
+    connect_args = {"server_settings": {"inventario.zona_horaria": settings.business_timezone}}
+    if replica:
+        # Como el engine sync: transacciones de solo lectura
+        connect_args["server_settings"]["default_transaction_read_only"] = "on"
+        # Una replica que no responde falla rapido
+        connect_args["timeout"] = settings.read_replica_timeout_seconds
+    return create_async_engine(
+        url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping == "pessimistic",
+        pool_use_lifo=settings.db_pool_use_lifo,
+        connect_args=connect_args,
+    )
+
+
+def get_async_engine() -> AsyncEngine:
+    """Crea el engine async en el primer uso; asyncpg solo se importa si se habilita."""
+    global _engine, _sessionmaker
+    if _engine is None:
+        _engine = _crear_engine(settings.async_database_url_resuelta)
+        _sessionmaker = async_sessionmaker(_engine, autoflush=False, expire_on_commit=True)
+    return _engine
+
+
+def get_async_read_engine() -> AsyncEngine | None:
+    """Engine async de la replica de lectura, o None si no hay replica configurada."""
+    global _read_engine, _read_sessionmaker
+    url = settings.async_read_database_url_resuelta
+    if _read_engine is None and url:
+        _read_engine = _crear_engine(url, replica=True)
+        _read_sessionmaker = async_sessionmaker(_read_engine, autoflush=False, expire_on_commit=True)
+    return _read_engine
+
+
+async def usar_replica() -> bool:
+    """Version async de ``estado_replica.usar_replica``."""
+    read_engine = get_async_read_engine()
+    if read_engine is None:
+        return False
+    vigente = estado_replica.vigente()
+    if vigente is not None:
+        return vigente
+    # Sin esperar: mientras otra tarea (o un hilo sync) mide, sigue la ultima decision
+    if not estado_replica.empezar_medicion():
+        return estado_replica.disponible
+    try:
+        async with read_engine.connect() as conn:
+            await conn.execute(TIMEOUT_SQL, TIMEOUT_PARAMS)
+            lag_segundos = float((await conn.execute(LAG_SQL)).scalar_one())
+    except (SQLAlchemyError, OSError) as exc:
+        # OSError: asyncpg no envuelve el timeout de conexion
+        return estado_replica.registrar(None, exc)
+    finally:
+        estado_replica.terminar_medicion()
+    return estado_replica.registrar(lag_segundos)
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    get_async_engine()
+    async with _sessionmaker() as db:
+        yield db
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Sesion para consultas de solo lectura: replica si esta al dia, si no primaria."""
+    if await usar_replica():
+        async with _read_sessionmaker() as db:
+            yield db
+    else:
+        async for db in get_async_db():
+            yield db
+
+
+async def cerrar_engines() -> None:
+    """Cierra los pools async; sus conexiones quedan ligadas al event loop que las abrio."""
+    global _engine, _sessionmaker, _read_engine, _read_sessionmaker
+    for engine in (_engine, _read_engine):
+        if engine is not None:
+            await engine.dispose()
+    _engine = _sessionmaker = _read_engine = _read_sessionmaker = None
+
+
+def asincrono(fn: Callable[Concatenate[Session, P], T]) -> Callable[Concatenate[AsyncSession, P], Awaitable[T]]:
+    """Version async de una funcion de crud/services que recibe una Session sync como primer argumento."""
+
+    @functools.wraps(fn)
+    async def wrapper(db: AsyncSession, *args: P.args, **kwargs: P.kwargs) -> T:
+        return await db.run_sync(fn, *args, **kwargs)
+
+    return wrapper
+
+
+__all__ = [
+    "asincrono",
+    "cerrar_engines",
+    "get_async_db",
+    "get_async_engine",
+    "get_async_read_db",
+    "get_async_read_engine",
+    "usar_replica",
+]
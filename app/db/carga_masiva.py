@@ -0,0 +1,124 @@
+"""Carga masiva con COPY para seeds y datos de benchmark.
+
+``carga_masiva`` abre una transaccion con ``session_replication_role = replica``:
+no se disparan los triggers de usuario ni las validaciones de claves
+foraneas, asi que cada tabla se carga con un unico COPY a velocidad de disco.
+Al cerrar reajusta las secuencias, re-deriva las tablas que mantienen los
+triggers (``fn_reconstruir_stock_saldos``, que tambien regenera
+``mov_rollup_diario``), avanza ``catalogo_version`` y ``kardex_version`` y
+verifica que ningun saldo haya quedado negativo antes del commit. Quien carga
+es responsable de entregar ids consistentes. Requiere un rol superusuario
+(o con permiso para cambiar ``session_replication_role``).
+"""
+
+from __future__ import annotations
+
+import io
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from datetime import date
+from typing import Any
+
+# Tablas con id SERIAL/BIGSERIAL cuya secuencia se reajusta despues de cargar ids explicitos
+TABLAS_CON_SECUENCIA = (
+    "uoms",
+    "categorias",
+    "marcas",
+    "proveedores",
+    "productos",
+    "locaciones",
+    "personas",
+    "movimientos",
+)
+
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _valor_copy(valor: Any) -> str:
+    if valor is None:
+        return "\\N"
+    if isinstance(valor, bool):
+        return "t" if valor else "f"
+    return str(valor).translate(_ESCAPES)
+
+
+def lineas_copy(filas: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """Filas en el formato de texto de COPY (separado por tabs, NULL como \\N)."""
+    for fila in filas:
+        yield ("\t".join(map(_valor_copy, fila)) + "\n").encode()
+
+
+class _Flujo(io.RawIOBase):
+    """Archivo de solo lectura sobre un iterador de bytes, para copy_expert sin materializar la tabla."""
+
+    def __init__(self, partes: Iterator[bytes]) -> None:
+        self._partes = partes
+        self._pendiente = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pendiente:
+            try:
+                self._pendiente = next(self._partes)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._pendiente))
+        buffer[:n] = self._pendiente[:n]
+        self._pendiente = self._pendiente[n:]
+        return n
+
+
+def copiar(cursor, tabla: str, columnas: Sequence[str], filas: Iterable[Sequence[Any]]) -> int:
+    """Carga `filas` en `tabla` con un solo COPY y devuelve la cantidad de filas copiadas."""
+    flujo = io.BufferedReader(_Flujo(lineas_copy(filas)), buffer_size=1 << 20)
+    cursor.copy_expert(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN", flujo, size=1 << 20)
+    return cursor.rowcount
+
+
+@contextmanager
+def carga_masiva(conn, *, truncar: bool = False, desde: date | None = None) -> Iterator[Any]:
+    """Transaccion de carga sobre una conexion psycopg2; entrega el cursor para ``copiar``.
+
+    Con `truncar` vacia antes el kardex, los catalogos y las tablas derivadas.
+    Con `desde` crea antes las particiones mensuales de movimientos a partir de
+    ese mes, para que el COPY no pase por ``movimientos_default``; las filas que
+    igual caigan ahi se mueven a su particion al cerrar.
+    """
+    cursor = conn.cursor()
+    try:
+        if truncar:
+            cursor.execute(
+                "TRUNCATE movimientos, stock_saldos, stock_diario, mov_rollup_diario, cierres_saldos, cierres, "
+                f"{', '.join(t for t in TABLAS_CON_SECUENCIA if t != 'movimientos')} "
+                "RESTART IDENTITY CASCADE"
+            )
+        if desde is not None:
+            cursor.execute("SELECT fn_crear_particiones_movimientos(p_desde => %s)", (desde,))
+        cursor.execute("SET LOCAL session_replication_role = replica")
+        yield cursor
+        cursor.execute("SET LOCAL session_replication_role = origin")
+
+        cursor.execute("SELECT fn_crear_particiones_movimientos()")
+
+        for tabla in TABLAS_CON_SECUENCIA:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {tabla}"
+            )
+        cursor.execute("SELECT fn_reconstruir_stock_saldos()")
+        cursor.execute("UPDATE catalogo_version SET version = version + 1")
+        cursor.execute("UPDATE kardex_version SET version = version + 1")
+        cursor.execute("SELECT COUNT(*) FROM stock_saldos WHERE stock < 0")
+        negativos = cursor.fetchone()[0]
+        if negativos:
+            raise ValueError(f"La carga deja {negativos} saldos negativos; se descarta")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+__all__ = ["TABLAS_CON_SECUENCIA", "carga_masiva", "copiar", "lineas_copy"]
@@ -0,0 +1,30 @@
+"""Cierra las fotos diarias de stock (tabla stock_diario) pendientes.
+
+Uso: ``python -m app.db.cerrar_stock_diario [YYYY-MM-DD]``
+
+Sin fecha cierra hasta ayer. Pensado para correr una vez al dia (cron): los
+endpoints solo leen las fotos y calculan desde el kardex los dias sin cerrar.
+"""
+
+from __future__ import annotations
+
+import sys
+from datetime import date, timedelta
+
+from app import crud
+from app.crud.fechas import hoy
+from app.db.session import SessionLocal
+
+
+def main() -> None:
+    hasta = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else hoy() - timedelta(days=1)
+    db = SessionLocal()
+    try:
+        cerrado = crud.stock.cerrar_stock_diario(db, hasta=hasta)
+    finally:
+        db.close()
+    print(f"stock_diario cerrado hasta {cerrado.isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Particiones mensuales de ``movimientos``.
+
+Uso::
+
+    python -m app.db.particiones                       # crea las particiones que falten
+    python -m app.db.particiones desacoplar 2024-01    # desacopla un mes para archivarlo
+
+La creacion es DDL y corre solo desde este comando, programado una vez al mes
+(cron), para el mes actual y los ``settings.movimientos_particiones_meses``
+siguientes. La API al arrancar solo avisa en el log si falta alguna; si falta
+una particion, los movimientos caen en ``movimientos_default`` y se mueven a su
+mes la proxima vez que se crea.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def crear_particiones(db: Session, *, meses_adelante: int | None = None) -> int:
+    """Crea las particiones que falten hasta `meses_adelante` meses despues del actual; devuelve cuantas creo."""
+    if meses_adelante is None:
+        meses_adelante = settings.movimientos_particiones_meses
+    creadas = db.execute(select(func.fn_crear_particiones_movimientos(meses_adelante))).scalar_one()
+    db.commit()
+    return creadas
+
+
+def particiones_faltantes(db: Session, *, meses_adelante: int | None = None) -> list[str]:
+    """Nombres de las particiones que faltan hasta `meses_adelante` meses despues del actual (sin crearlas)."""
+    if meses_adelante is None:
+        meses_adelante = settings.movimientos_particiones_meses
+    return list(db.execute(select(func.fn_particiones_movimientos_faltantes(meses_adelante))).scalars())
+
+
+def verificar_particiones(db: Session) -> None:
+    """Chequeo al arrancar la API: avisa si faltan particiones, sin DDL. Los movimientos igual caen en la default."""
+    try:
+        faltantes = particiones_faltantes(db)
+    except SQLAlchemyError:
+        db.rollback()
+        logger.warning("No se pudieron verificar las particiones de movimientos", exc_info=True)
+        return
+    db.rollback()
+    if faltantes:
+        logger.warning(
+            "Faltan particiones de movimientos (%s); crearlas con python -m app.db.particiones",
+            ", ".join(faltantes),
+        )
+
+
+def desacoplar_particion(db: Session, *, mes: date) -> str:
+    """Desacopla la particion de `mes` (registrando antes un cierre en su limite) y devuelve su nombre.
+
+    La tabla queda fuera del kardex para archivarla (``pg_dump -t``) y borrarla.
+    """
+    nombre = db.execute(select(func.fn_desacoplar_particion_movimientos(mes))).scalar_one()
+    db.commit()
+    return nombre
+
+
+def main() -> None:
+    db = SessionLocal()
+    try:
+        if len(sys.argv) > 1 and sys.argv[1] == "desacoplar":
+            mes = date.fromisoformat(sys.argv[2] + "-01")
+            nombre = desacoplar_particion(db, mes=mes)
+            print(f"{nombre} desacoplada; archivala con pg_dump -t {nombre} y luego DROP TABLE {nombre}")
+        else:
+            creadas = crear_particiones(db)
+            print(f"Particiones de movimientos creadas: {creadas}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Pool de conexiones instrumentado.
+
+``InstrumentedQueuePool`` es un ``QueuePool`` que mide cuanto espera cada
+checkout por una conexion libre. ``PoolMetrics`` escucha los eventos del pool
+para llevar ademas cuanto tiempo se retiene cada conexion, la edad de las
+conexiones abiertas y los timeouts. ``GET /api/v1/_internal/pool`` expone todo
+junto con el estado actual (en uso, libres, overflow).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.core.metrics import Histograma
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.espera = Histograma()
+        self.retencion = Histograma()
+        self.checkouts = 0
+        self.timeouts = 0
+        # id(conexion DBAPI) -> instante de creacion, para la edad de las conexiones abiertas
+        self._abiertas: dict[int, float] = {}
+
+    def registrar_espera(self, segundos: float, *, timeout: bool = False) -> None:
+        with self._lock:
+            self.espera.observar(segundos)
+            if timeout:
+                self.timeouts += 1
+
+    def escuchar(self, pool: QueuePool) -> None:
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "close", self._on_close)
+        event.listen(pool, "close_detached", self._on_close_detached)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self._abiertas[id(dbapi_connection)] = time.monotonic()
+
+    def _on_close(self, dbapi_connection, connection_record) -> None:
+        self._on_close_detached(dbapi_connection)
+
+    def _on_close_detached(self, dbapi_connection) -> None:
+        with self._lock:
+            self._abiertas.pop(id(dbapi_connection), None)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        connection_record.info["checkout_en"] = time.monotonic()
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        inicio = connection_record.info.pop("checkout_en", None)
+        if inicio is not None:
+            with self._lock:
+                self.retencion.observar(time.monotonic() - inicio)
+
+    def snapshot(self) -> dict[str, Any]:
+        ahora = time.monotonic()
+        with self._lock:
+            edades = [ahora - creada for creada in self._abiertas.values()]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "conexiones_abiertas": len(edades),
+                "edad_maxima_segundos": max(edades, default=0.0),
+                "edad_promedio_segundos": sum(edades) / len(edades) if edades else 0.0,
+                "espera": self.espera.snapshot(),
+                "retencion": self.retencion.snapshot(),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que registra en ``metrics`` la espera de cada checkout."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        # recreate() pasa _dispatch: el pool nuevo ya hereda los listeners del anterior
+        if "_dispatch" not in kwargs:
+            self.metrics.escuchar(self)
+
+    def recreate(self) -> InstrumentedQueuePool:
+        nuevo = super().recreate()
+        # Las metricas describen al pool logico del engine, no a cada instancia
+        nuevo.metrics = self.metrics
+        return nuevo
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.registrar_espera(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.metrics.registrar_espera(time.perf_counter() - inicio)
+        return entry
+
+    def estado(self) -> dict[str, Any]:
+        """Estado actual del pool mas las metricas acumuladas."""
+        return {
+            "tamano": self.size(),
+            "en_uso": self.checkedout(),
+            "libres": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout_segundos": self.timeout(),
+            **self.metrics.snapshot(),
+        }
+
+
+__all__ = ["InstrumentedQueuePool", "PoolMetrics"]
@@ -0,0 +1,22 @@
+"""Reconstruye la tabla stock_saldos desde el kardex de movimientos.
+
+Uso: ``python -m app.db.rebuild_stock_saldos``
+"""
+
+from __future__ import annotations
+
+from app import crud
+from app.db.session import SessionLocal
+
+
+def main() -> None:
+    db = SessionLocal()
+    try:
+        filas = crud.stock.rebuild_saldos(db)
+    finally:
+        db.close()
+    print(f"stock_saldos reconstruido con {filas} filas")
+
+
+if __name__ == "__main__":
+    main()
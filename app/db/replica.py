@@ -0,0 +1,139 @@
+"""Ruteo de lecturas a la replica con control de retraso.
+
+``sesion_lectura()`` entrega una sesion sobre la replica mientras su retraso
+de replicacion no supere ``settings.read_replica_max_lag_seconds``; si lo
+supera, o no responde, entrega una sesion sobre la primaria. El retraso se
+consulta como maximo cada ``settings.read_replica_check_seconds``, con
+``settings.read_replica_timeout_seconds`` para conectar y para la consulta. Un
+solo hilo mide a la vez; los demas siguen con la ultima decision (al principio,
+la primaria) en lugar de esperarlo.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Generator
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import ReadSessionLocal, SessionLocal, read_engine
+
+logger = logging.getLogger(__name__)
+
+# Si todo el WAL recibido ya se aplico la replica esta al dia aunque la primaria este ociosa
+LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+# Tope de la medicion, local a su transaccion; SET no admite parametros
+TIMEOUT_SQL = text("SELECT set_config('statement_timeout', :timeout, true)")
+TIMEOUT_PARAMS = {"timeout": f"{settings.read_replica_timeout_seconds}s"}
+
+
+class EstadoReplica:
+    def __init__(self, max_lag_seconds: float, check_seconds: float) -> None:
+        self._max_lag_seconds = max_lag_seconds
+        self._check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._verificado_en: float | None = None
+        self.lag_segundos: float | None = None
+        self.disponible = False
+
+    def usar_replica(self) -> bool:
+        if read_engine is None:
+            return False
+        vigente = self.vigente()
+        if vigente is not None:
+            return vigente
+
+        if not self.empezar_medicion():
+            return self.disponible
+        try:
+            vigente = self.vigente()
+            if vigente is not None:
+                return vigente
+            try:
+                with read_engine.connect() as conn:
+                    conn.execute(TIMEOUT_SQL, TIMEOUT_PARAMS)
+                    lag_segundos = float(conn.execute(LAG_SQL).scalar_one())
+            except SQLAlchemyError as exc:
+                return self.registrar(None, exc)
+            return self.registrar(lag_segundos)
+        finally:
+            self.terminar_medicion()
+
+    def empezar_medicion(self) -> bool:
+        """Reserva la medicion del retraso sin esperar; False si otro hilo o tarea ya esta midiendo."""
+        return self._lock.acquire(blocking=False)
+
+    def terminar_medicion(self) -> None:
+        self._lock.release()
+
+    def vigente(self) -> bool | None:
+        """Ultima decision si aun no vence el intervalo de verificacion, si no None."""
+        if self._verificado_en is not None and time.monotonic() - self._verificado_en < self._check_seconds:
+            return self.disponible
+        return None
+
+    def registrar(self, lag_segundos: float | None, error: Exception | None = None) -> bool:
+        """Guarda una medicion del retraso (None si la replica no respondio) y decide si usarla."""
+        disponible = lag_segundos is not None and lag_segundos <= self._max_lag_seconds
+        # Solo se registran los cambios de estado, no cada verificacion
+        if disponible != self.disponible or self._verificado_en is None:
+            logger.warning(
+                "Replica de lectura %s (retraso: %s s)%s",
+                "habilitada" if disponible else "deshabilitada; se lee de la primaria",
+                lag_segundos,
+                f": {error}" if error else "",
+            )
+        self.lag_segundos = lag_segundos
+        self.disponible = disponible
+        self._verificado_en = time.monotonic()
+        return disponible
+
+    def snapshot(self) -> dict:
+        return {
+            "configurada": read_engine is not None,
+            "disponible": self.disponible,
+            "lag_segundos": self.lag_segundos,
+            "max_lag_segundos": self._max_lag_seconds,
+        }
+
+
+estado_replica = EstadoReplica(settings.read_replica_max_lag_seconds, settings.read_replica_check_seconds)
+
+
+def sesion_lectura() -> Session:
+    """Sesion para consultas de solo lectura: replica si esta al dia, si no primaria."""
+    if ReadSessionLocal is not None and estado_replica.usar_replica():
+        return ReadSessionLocal()
+    return SessionLocal()
+
+
+def get_read_db() -> Generator[Session, None, None]:
+    db = sesion_lectura()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+__all__ = [
+    "EstadoReplica",
+    "LAG_SQL",
+    "TIMEOUT_PARAMS",
+    "TIMEOUT_SQL",
+    "estado_replica",
+    "get_read_db",
+    "sesion_lectura",
+]
@@ -1,13 +1,42 @@
 from collections.abc import Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.db.pool import InstrumentedQueuePool
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+
+def _crear_engine(url: str, *, replica: bool = False) -> Engine:
+    # Las funciones de db/schema.sql leen la zona del negocio desde inventario.zona_horaria
+    connect_args = {"options": f"-c inventario.zona_horaria={settings.business_timezone}"}
+    if replica:
+        # Transacciones de solo lectura: una escritura por error falla aunque la replica sea la primaria
+        connect_args["options"] += " -c default_transaction_read_only=on"
+        # Una replica que no responde falla rapido y las lecturas vuelven a la primaria
+        connect_args["connect_timeout"] = settings.read_replica_timeout_seconds
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping == "pessimistic",
+        pool_use_lifo=settings.db_pool_use_lifo,
+        connect_args=connect_args,
+    )
+
+
+engine = _crear_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Replica de lectura opcional; sus conexiones solo admiten transacciones de lectura
+read_engine = _crear_engine(settings.read_database_url, replica=True) if settings.read_database_url else None
+ReadSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if read_engine is not None else None
+)
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -0,0 +1,40 @@
+"""Verifica (y opcionalmente repara) los agregados diarios de mov_rollup_diario.
+
+Uso: ``python -m app.db.verificar_mov_rollup [YYYY-MM-DD] [--reparar]``
+
+Compara los agregados contra el kardex desde la fecha indicada (sin fecha:
+todo el historial). Con ``--reparar`` regenera desde el primer dia con
+diferencias. Sale con codigo 1 si quedan diferencias sin reparar.
+"""
+
+from __future__ import annotations
+
+import sys
+from datetime import date
+
+from app.crud import rollup
+from app.db.session import SessionLocal
+
+
+def main() -> None:
+    args = [arg for arg in sys.argv[1:] if arg != "--reparar"]
+    reparar = "--reparar" in sys.argv[1:]
+    desde = date.fromisoformat(args[0]) if args else None
+
+    db = SessionLocal()
+    try:
+        total, diferencias = rollup.verificar(db, desde)
+        if not total:
+            print("mov_rollup_diario consistente con el kardex")
+            return
+        print(f"mov_rollup_diario: {total} diferencias, la primera el {diferencias[0]['dia'].isoformat()}")
+        if not reparar:
+            sys.exit(1)
+        filas = rollup.reconstruir(db, diferencias[0]["dia"])
+        print(f"mov_rollup_diario regenerado desde {diferencias[0]['dia'].isoformat()} ({filas} filas)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,34 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1 import api_router
+from app.core.catalog_cache import catalog_cache
 from app.core.config import settings
+from app.core.instrumentacion import MetricasMiddleware, PresupuestoConsultas, instrumentar_sqlalchemy
+from app.core.metrics import registro
+from app.db.particiones import verificar_particiones
+from app.db.session import SessionLocal
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db = SessionLocal()
+    try:
+        catalog_cache.precargar(db)
+        verificar_particiones(db)
+    finally:
+        db.close()
+    yield
+    if settings.async_db_enabled:
+        from app.db.async_session import cerrar_engines
+
+        await cerrar_engines()
+
 
-app = FastAPI(title=settings.project_name)
+app = FastAPI(title=settings.project_name, lifespan=lifespan)
 
 # Configurar CORS para permitir peticiones desde el frontend
 # Usa la configuración para los orígenes permitidos en CORS
@@ -20,11 +44,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],  # Permite solo los métodos necesarios
     allow_headers=["*"],  # Permite todos los headers
+    expose_headers=["X-Next-Cursor", "ETag"],  # Cursor de paginacion del kardex y ETag de reportes
 )
 
+# Va al final para quedar como middleware externo y medir tambien el resto
+app.add_middleware(
+    MetricasMiddleware,
+    presupuesto=PresupuestoConsultas(
+        settings.query_budget_max_queries,
+        settings.query_budget_max_repeated,
+        settings.query_budget_action,
+    )
+    if settings.query_budget_enabled
+    else None,
+)
+instrumentar_sqlalchemy()
+
 app.include_router(api_router, prefix=settings.api_v1_str)
 
 
 @app.get("/")
 def read_root() -> dict[str, str]:
     return {"message": "Inventario MVP OK"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(registro.exponer(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,12 +1,18 @@
+from app.models.catalogo_version import CatalogoVersion
 from app.models.categoria import Categoria
+from app.models.cierre import Cierre, CierreSaldo
 from app.models.locacion import Locacion
+from app.models.kardex_version import KardexVersion
 from app.models.marca import Marca
+from app.models.mov_rollup import MovRollupDiario
 from app.models.movimiento import Movimiento, TipoMovimiento
 from app.models.persona import Persona
 from app.models.producto import Producto
 from app.models.proveedor import Proveedor
+from app.models.stock_diario import StockDiario
+from app.models.stock_saldo import StockSaldo
 from app.models.uom import UOM
-from app.models.vista_stock import VistaStockActual
+from app.models.vista_stock import VistaMovimientoLocacion, VistaStockActual
 
 __all__ = [
     "Producto",
@@ -14,9 +20,17 @@ __all__ = [
     "Persona",
     "Movimiento",
     "VistaStockActual",
+    "StockSaldo",
+    "StockDiario",
+    "VistaMovimientoLocacion",
     "TipoMovimiento",
     "Marca",
     "Categoria",
     "Proveedor",
     "UOM",
+    "Cierre",
+    "CierreSaldo",
+    "CatalogoVersion",
+    "KardexVersion",
+    "MovRollupDiario",
 ]
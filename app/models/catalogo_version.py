@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, Boolean
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+
+class CatalogoVersion(Base):
+    __tablename__ = "catalogo_version"
+
+    id: Mapped[bool] = mapped_column(Boolean, primary_key=True, default=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default="0")
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import DateTime, ForeignKey, Integer, Numeric, Text, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.db.base_class import Base
+
+
+class Cierre(Base):
+    __tablename__ = "cierres"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    fecha: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, unique=True)
+    nota: Mapped[str | None] = mapped_column(Text, nullable=True)
+    creado_en: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+    saldos: Mapped[list["CierreSaldo"]] = relationship(
+        "CierreSaldo", back_populates="cierre", cascade="all, delete-orphan"
+    )
+
+
+class CierreSaldo(Base):
+    __tablename__ = "cierres_saldos"
+
+    cierre_id: Mapped[int] = mapped_column(ForeignKey("cierres.id", ondelete="CASCADE"), primary_key=True)
+    producto_id: Mapped[int] = mapped_column(ForeignKey("productos.id"), primary_key=True)
+    locacion_id: Mapped[int] = mapped_column(ForeignKey("locaciones.id"), primary_key=True)
+    stock: Mapped[Decimal] = mapped_column(Numeric(14, 3), nullable=False)
+
+    cierre: Mapped["Cierre"] = relationship("Cierre", back_populates="saldos")
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Date, Enum as PgEnum, ForeignKey, Integer, Numeric, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+from app.models.movimiento import TipoMovimiento
+
+
+class MovRollupDiario(Base):
+    """Movimientos agregados por dia; la mantiene tg_actualizar_mov_rollup (db/schema.sql)."""
+
+    __tablename__ = "mov_rollup_diario"
+
+    dia: Mapped[date] = mapped_column(Date, nullable=False)
+    tipo: Mapped[TipoMovimiento] = mapped_column(
+        PgEnum(TipoMovimiento, name="tipo_movimiento", create_type=False), nullable=False
+    )
+    producto_id: Mapped[int] = mapped_column(ForeignKey("productos.id"), nullable=False)
+    from_locacion_id: Mapped[int | None] = mapped_column(ForeignKey("locaciones.id"), nullable=True)
+    to_locacion_id: Mapped[int | None] = mapped_column(ForeignKey("locaciones.id"), nullable=True)
+    persona_id: Mapped[int | None] = mapped_column(ForeignKey("personas.id"), nullable=True)
+    proveedor_id: Mapped[int | None] = mapped_column(ForeignKey("proveedores.id"), nullable=True)
+    cantidad_sum: Mapped[Decimal] = mapped_column(Numeric(16, 3), nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "dia",
+            "tipo",
+            "producto_id",
+            "from_locacion_id",
+            "to_locacion_id",
+            "persona_id",
+            "proveedor_id",
+            name="uq_mov_rollup_diario",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+    # La clave admite NULL (UNIQUE NULLS NOT DISTINCT), asi que no es PRIMARY KEY en la tabla
+    __mapper_args__ = {
+        "primary_key": [dia, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, proveedor_id]
+    }
@@ -26,9 +26,13 @@ class TipoMovimiento(str, Enum):
 
 class Movimiento(Base):
     __tablename__ = "movimientos"
+    # Particionada por mes de fecha (db/schema.sql); la clave primaria de la tabla es (id, fecha)
+    __table_args__ = {"postgresql_partition_by": "RANGE (fecha)"}
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True)
-    fecha: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=text("now()"))
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True, index=True)
+    fecha: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, nullable=False, server_default=text("now()")
+    )
     tipo: Mapped[TipoMovimiento] = mapped_column(
         PgEnum(TipoMovimiento, name="tipo_movimiento", create_type=False), nullable=False, 
     )
@@ -49,3 +53,6 @@ class Movimiento(Base):
     )
     persona: Mapped["Persona | None"] = relationship("Persona", back_populates="movimientos")
     proveedor: Mapped["Proveedor | None"] = relationship("Proveedor", back_populates="movimientos")
+
+    # Los ids salen de una sola secuencia y siguen siendo unicos: la identidad del ORM es solo id
+    __mapper_args__ = {"primary_key": [id]}
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Date, ForeignKey, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+
+class StockDiario(Base):
+    __tablename__ = "stock_diario"
+
+    fecha: Mapped[date] = mapped_column(Date, primary_key=True)
+    producto_id: Mapped[int] = mapped_column(ForeignKey("productos.id"), primary_key=True)
+    locacion_id: Mapped[int] = mapped_column(ForeignKey("locaciones.id"), primary_key=True)
+    ingresos: Mapped[Decimal] = mapped_column(Numeric(14, 3), nullable=False, server_default="0")
+    egresos: Mapped[Decimal] = mapped_column(Numeric(14, 3), nullable=False, server_default="0")
+    neto: Mapped[Decimal] = mapped_column(Numeric(14, 3), nullable=False, server_default="0")
+    stock_end: Mapped[Decimal] = mapped_column(Numeric(14, 3), nullable=False, server_default="0")
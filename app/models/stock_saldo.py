@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Numeric, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+
+class StockSaldo(Base):
+    __tablename__ = "stock_saldos"
+
+    producto_id: Mapped[int] = mapped_column(ForeignKey("productos.id"), primary_key=True)
+    locacion_id: Mapped[int] = mapped_column(ForeignKey("locaciones.id"), primary_key=True)
+    stock: Mapped[Decimal] = mapped_column(Numeric(14, 3), nullable=False, server_default="0")
+    last_movimiento_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import ForeignKey, Numeric
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Numeric
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base_class import Base
@@ -15,3 +16,14 @@ class VistaStockActual(Base):
     producto_id: Mapped[int] = mapped_column(ForeignKey("productos.id"), primary_key=True)
     locacion_id: Mapped[int] = mapped_column(ForeignKey("locaciones.id"), primary_key=True)
     stock: Mapped[Decimal] = mapped_column(Numeric(14, 3), nullable=False)
+
+
+class VistaMovimientoLocacion(Base):
+    __tablename__ = "vista_movimientos_locacion"
+    __table_args__ = {"info": {"is_view": True}}
+
+    movimiento_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    locacion_id: Mapped[int] = mapped_column(ForeignKey("locaciones.id"), primary_key=True)
+    fecha: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    producto_id: Mapped[int] = mapped_column(ForeignKey("productos.id"), nullable=False)
+    cantidad: Mapped[Decimal] = mapped_column(Numeric(14, 3), nullable=False)
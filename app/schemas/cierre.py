@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class CierreCreate(BaseModel):
+    fecha: datetime | None = Field(
+        default=None,
+        description="Instante del cierre; congela los movimientos con fecha anterior. Si se omite se usa el momento actual.",
+    )
+    nota: str | None = None
+
+
+class CierreOut(BaseModel):
+    id: int
+    fecha: datetime
+    nota: str | None
+    creado_en: datetime
+    total_saldos: int
+
+    class Config:
+        from_attributes = True
@@ -35,6 +35,7 @@ class RecentMovementsResponse(BaseModel):
     items: List[RecentMovementItem]
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
 
 
 class StockByLocationItem(BaseModel):
@@ -89,3 +90,18 @@ class AdjustmentsMonitorResponse(BaseModel):
     top_products: List[AdjustmentProductItem]
     top_locations: List[AdjustmentLocationItem]
     days: int
+
+
+class DashboardBundleResponse(BaseModel):
+    summary: DashboardSummaryResponse
+    recent_movements: RecentMovementsResponse
+    stock_by_location: StockByLocationResponse
+    top_used_products: TopUsedProductsResponse
+    top_categories: TopCategoriesResponse
+    adjustments_monitor: AdjustmentsMonitorResponse
+
+
+class DashboardCacheStats(BaseModel):
+    entries: int
+    hits: int
+    misses: int
@@ -50,6 +50,10 @@ class MovimientoCreate(MovimientoBase):
     pass
 
 
+class MovimientoLoteCreate(BaseModel):
+    movimientos: list[MovimientoCreate] = Field(..., min_length=1, max_length=5000)
+
+
 class MovimientoOut(MovimientoBase):
     id: int
     fecha: datetime
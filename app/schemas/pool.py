@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+
+class HistogramaOut(BaseModel):
+    # Conteos acumulados por limite superior en segundos, incluido "+Inf"
+    buckets: dict[str, int]
+    suma: float
+    cantidad: int
+
+
+class PoolStats(BaseModel):
+    tamano: int
+    en_uso: int
+    libres: int
+    overflow: int
+    max_overflow: int
+    timeout_segundos: float
+    checkouts: int
+    timeouts: int
+    conexiones_abiertas: int
+    edad_maxima_segundos: float
+    edad_promedio_segundos: float
+    espera: HistogramaOut
+    retencion: HistogramaOut
+
+
+class ReplicaStats(BaseModel):
+    configurada: bool
+    disponible: bool
+    lag_segundos: float | None
+    max_lag_segundos: float
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from pydantic import BaseModel
+
+from app.models.movimiento import TipoMovimiento
+
+
+class DiferenciaRollup(BaseModel):
+    dia: date
+    tipo: TipoMovimiento
+    producto_id: int
+    from_locacion_id: int | None
+    to_locacion_id: int | None
+    persona_id: int | None
+    proveedor_id: int | None
+    # None: la clave falta de ese lado
+    cantidad_rollup: Decimal | None
+    cantidad_kardex: Decimal | None
+    count_rollup: int | None
+    count_kardex: int | None
+
+
+class VerificacionRollup(BaseModel):
+    desde: date | None
+    hasta: date | None
+    consistente: bool
+    diferencias_total: int
+    diferencias: list[DiferenciaRollup]
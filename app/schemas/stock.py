@@ -51,6 +51,23 @@ class InventarioTotalDia(BaseModel):
     items: list[InventarioTotalProducto]
 
 
+class InventarioAlInstanteItem(BaseModel):
+    producto_id: int
+    producto_nombre: str
+    sku: str | None
+    locacion_id: int
+    locacion_nombre: str
+    uom_id: int
+    uom_abreviatura: str
+    stock: Decimal
+
+
+class InventarioAlInstante(BaseModel):
+    ts: datetime
+    total_stock: Decimal
+    items: list[InventarioAlInstanteItem]
+
+
 class WeeklyInventoryFilters(BaseModel):
     categoria_ids: list[int]
     producto_ids: list[int]
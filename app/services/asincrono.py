@@ -0,0 +1,40 @@
+"""Versiones async de las lecturas de crud/services usadas por los endpoints de sondeo.
+
+Cada funcion es la misma implementacion sync ejecutada con
+``AsyncSession.run_sync`` (ver ``app.db.async_session.asincrono``): las
+consultas, la cache del dashboard y la de catalogos se comparten con el stack
+sync, asi que ambos devuelven exactamente lo mismo mientras conviven.
+"""
+
+from __future__ import annotations
+
+from app import crud
+from app.crud import kardex
+from app.db.async_session import asincrono
+from app.services import dashboard_service
+
+version = asincrono(kardex.version)
+
+get_stock = asincrono(crud.stock.get_all)
+get_stock_filtered = asincrono(crud.stock.get_filtered)
+get_stock_grouped_by_locacion = asincrono(crud.stock.get_grouped_by_locacion)
+
+get_dashboard_summary = asincrono(dashboard_service.get_dashboard_summary)
+get_recent_movements = asincrono(dashboard_service.get_recent_movements)
+get_stock_by_location = asincrono(dashboard_service.get_stock_by_location)
+get_top_used_products = asincrono(dashboard_service.get_top_used_products)
+get_top_categories = asincrono(dashboard_service.get_top_categories)
+get_adjustments_monitor = asincrono(dashboard_service.get_adjustments_monitor)
+
+__all__ = [
+    "get_adjustments_monitor",
+    "get_dashboard_summary",
+    "get_recent_movements",
+    "get_stock",
+    "get_stock_by_location",
+    "get_stock_filtered",
+    "get_stock_grouped_by_locacion",
+    "get_top_categories",
+    "get_top_used_products",
+    "version",
+]
@@ -1,14 +1,28 @@
 from __future__ import annotations
 
+import contextvars
+import functools
 import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from typing import Any, NamedTuple
 
 from fastapi import HTTPException, status
 from sqlalchemy import func, or_, select, union_all
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session, aliased
-
+from sqlalchemy.orm import Session
+
+from app.core.catalog_cache import catalog_cache
+from app.core.config import settings
+from app.core.instrumentacion import EstadisticasRequest, request_actual
+from app.crud import kardex
+from app.crud.rollup import movimientos_desde
+from app.crud.paginacion import Cursor, antes_de_cursor, next_cursor
 from app.models import (
     Categoria,
     Locacion,
@@ -16,13 +30,14 @@ from app.models import (
     Persona,
     Producto,
     Proveedor,
+    StockSaldo,
     TipoMovimiento,
-    VistaStockActual,
 )
 from app.schemas.dashboard import (
     AdjustmentLocationItem,
     AdjustmentProductItem,
     AdjustmentsMonitorResponse,
+    DashboardBundleResponse,
     DashboardSummaryResponse,
     MovementTypePercentage,
     RecentMovementItem,
@@ -38,6 +53,75 @@ from app.schemas.dashboard import (
 logger = logging.getLogger(__name__)
 
 
+class _CacheEntry(NamedTuple):
+    version: kardex.Version
+    expira: float
+    valor: Any
+
+
+class DashboardCache:
+    """Cache LRU de respuestas del dashboard, versionada por el estado del kardex.
+
+    La clave es (endpoint, parametros); cada entrada guarda la version del
+    kardex con la que se calculo: (kardex_version, catalogo_version). Una
+    entrada solo se sirve si la version actual coincide y no vencio el TTL (los
+    rangos "ultimos N dias" se mueven con el reloj aunque no haya movimientos).
+    Los movimientos registrados por este nodo la vacian de inmediato.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, _CacheEntry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: tuple, version: kardex.Version, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version and entry.expira > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.valor
+            self.misses += 1
+
+        valor = compute()
+        with self._lock:
+            self._entries[key] = _CacheEntry(version, time.monotonic() + self._ttl_seconds, valor)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return valor
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+dashboard_cache = DashboardCache(settings.dashboard_cache_max_entries, settings.dashboard_cache_ttl_seconds)
+
+
+def _cacheado(endpoint: str):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(db: Session, **params):
+            try:
+                version = kardex.version(db)
+            except SQLAlchemyError as exc:
+                _raise_db_error(exc)
+            key = (endpoint, tuple(sorted(params.items())))
+            return dashboard_cache.get_or_compute(key, version, lambda: fn(db, **params))
+
+        return wrapper
+
+    return decorator
+
+
 def _raise_db_error(exc: SQLAlchemyError) -> None:
     logger.exception("Error fetching dashboard data")
     raise HTTPException(
@@ -50,62 +134,46 @@ def _decimal_to_float(value: Decimal | None) -> float:
     return float(value) if value is not None else 0.0
 
 
+def _nombre(catalogo: dict[int, dict], id_: int | None) -> str | None:
+    return catalogo[id_]["nombre"] if id_ is not None else None
+
+
+@_cacheado("summary")
 def get_dashboard_summary(db: Session) -> DashboardSummaryResponse:
     now = datetime.now(timezone.utc)
     seven_days_ago = now - timedelta(days=7)
     thirty_days_ago = now - timedelta(days=30)
 
+    # Un solo recorrido de la ventana de 30 dias; cada KPI filtra su propio rango y tipo
+    last_7d = Movimiento.fecha >= seven_days_ago
     try:
-        totals_row = db.execute(
+        row = db.execute(
             select(
-                func.count(Movimiento.id).label("total_movements"),
-                func.count(func.distinct(Movimiento.producto_id)).label("distinct_products"),
-            ).where(Movimiento.fecha >= seven_days_ago)
+                func.count().filter(last_7d).label("total_movements"),
+                func.count(func.distinct(Movimiento.producto_id)).filter(last_7d).label("distinct_products"),
+                func.count().filter(last_7d, Movimiento.tipo == TipoMovimiento.ingreso).label("ingresos"),
+                func.count().filter(last_7d, Movimiento.tipo == TipoMovimiento.uso).label("usos"),
+                func.count().filter(Movimiento.tipo == TipoMovimiento.ajuste).label("adjustments"),
+            ).where(Movimiento.fecha >= thirty_days_ago)
         ).one()
-
-        total_movements = int(totals_row.total_movements or 0)
-        distinct_products = int(totals_row.distinct_products or 0)
-
-        ratio_rows = db.execute(
-            select(
-                Movimiento.tipo,
-                func.count(Movimiento.id).label("count"),
-            )
-            .where(
-                Movimiento.fecha >= seven_days_ago,
-                Movimiento.tipo.in_([TipoMovimiento.ingreso, TipoMovimiento.uso]),
-            )
-            .group_by(Movimiento.tipo)
-        ).all()
-
-        ratio_counts: dict[TipoMovimiento, int] = {
-            TipoMovimiento.ingreso: 0,
-            TipoMovimiento.uso: 0,
-        }
-        for movement_type, count in ratio_rows:
-            if movement_type in ratio_counts:
-                ratio_counts[movement_type] = int(count or 0)
-
-        ratio_total = sum(ratio_counts.values())
-        ingreso_percentage = (
-            ratio_counts[TipoMovimiento.ingreso] / ratio_total * 100 if ratio_total else 0.0
-        )
-        uso_percentage = (
-            ratio_counts[TipoMovimiento.uso] / ratio_total * 100 if ratio_total else 0.0
-        )
-
-        adjustments_last_30d = int(
-            db.execute(
-                select(func.count(Movimiento.id)).where(
-                    Movimiento.fecha >= thirty_days_ago,
-                    Movimiento.tipo == TipoMovimiento.ajuste,
-                )
-            ).scalar_one()
-            or 0
-        )
     except SQLAlchemyError as exc:
         _raise_db_error(exc)
 
+    total_movements = int(row.total_movements or 0)
+    distinct_products = int(row.distinct_products or 0)
+    ratio_counts: dict[TipoMovimiento, int] = {
+        TipoMovimiento.ingreso: int(row.ingresos or 0),
+        TipoMovimiento.uso: int(row.usos or 0),
+    }
+    ratio_total = sum(ratio_counts.values())
+    ingreso_percentage = (
+        ratio_counts[TipoMovimiento.ingreso] / ratio_total * 100 if ratio_total else 0.0
+    )
+    uso_percentage = (
+        ratio_counts[TipoMovimiento.uso] / ratio_total * 100 if ratio_total else 0.0
+    )
+    adjustments_last_30d = int(row.adjustments or 0)
+
     return DashboardSummaryResponse(
         total_movements_last_7d=total_movements,
         distinct_products_moved_last_7d=distinct_products,
@@ -123,6 +191,7 @@ def get_dashboard_summary(db: Session) -> DashboardSummaryResponse:
     )
 
 
+@_cacheado("recent-movements")
 def get_recent_movements(
     db: Session,
     *,
@@ -131,29 +200,20 @@ def get_recent_movements(
     tipo: TipoMovimiento | None = None,
     locacion_id: int | None = None,
     producto_id: int | None = None,
+    cursor: Cursor | None = None,
 ) -> RecentMovementsResponse:
-    from_loc = aliased(Locacion, name="from_locacion")
-    to_loc = aliased(Locacion, name="to_locacion")
-
-    stmt = (
-        select(
-            Movimiento.id,
-            Movimiento.fecha,
-            Movimiento.tipo,
-            Producto.nombre.label("producto_nombre"),
-            from_loc.nombre.label("from_locacion_nombre"),
-            to_loc.nombre.label("to_locacion_nombre"),
-            Persona.nombre.label("persona_nombre"),
-            Proveedor.nombre.label("proveedor_nombre"),
-            Movimiento.cantidad,
-            Movimiento.nota,
-        )
-        .join(Producto, Movimiento.producto_id == Producto.id)
-        .outerjoin(from_loc, Movimiento.from_locacion_id == from_loc.id)
-        .outerjoin(to_loc, Movimiento.to_locacion_id == to_loc.id)
-        .outerjoin(Persona, Movimiento.persona_id == Persona.id)
-        .outerjoin(Proveedor, Movimiento.proveedor_id == Proveedor.id)
-    )
+    stmt = select(
+        Movimiento.id,
+        Movimiento.fecha,
+        Movimiento.tipo,
+        Producto.nombre.label("producto_nombre"),
+        Movimiento.from_locacion_id,
+        Movimiento.to_locacion_id,
+        Movimiento.persona_id,
+        Movimiento.proveedor_id,
+        Movimiento.cantidad,
+        Movimiento.nota,
+    ).join(Producto, Movimiento.producto_id == Producto.id)
 
     filters = []
     if tipo is not None:
@@ -164,13 +224,26 @@ def get_recent_movements(
         filters.append(
             or_(Movimiento.from_locacion_id == locacion_id, Movimiento.to_locacion_id == locacion_id)
         )
+    if cursor is not None:
+        filters.append(antes_de_cursor(cursor))
     if filters:
         stmt = stmt.where(*filters)
 
-    stmt = stmt.order_by(Movimiento.fecha.desc(), Movimiento.id.desc()).limit(limit).offset(offset)
+    stmt = stmt.order_by(Movimiento.fecha.desc(), Movimiento.id.desc()).limit(limit)
+    if cursor is None:
+        stmt = stmt.offset(offset)
 
     try:
         rows = db.execute(stmt).all()
+        # Locaciones, personas y proveedores salen de la cache de catalogos en lugar de joins
+        catalogos = catalog_cache.get_con(
+            db,
+            {
+                Locacion: {row.from_locacion_id for row in rows} | {row.to_locacion_id for row in rows},
+                Persona: {row.persona_id for row in rows},
+                Proveedor: {row.proveedor_id for row in rows},
+            },
+        )
     except SQLAlchemyError as exc:
         _raise_db_error(exc)
 
@@ -180,27 +253,34 @@ def get_recent_movements(
             fecha=row.fecha,
             tipo=row.tipo.value if isinstance(row.tipo, TipoMovimiento) else str(row.tipo),
             producto_nombre=row.producto_nombre,
-            from_locacion_nombre=row.from_locacion_nombre,
-            to_locacion_nombre=row.to_locacion_nombre,
-            persona_nombre=row.persona_nombre,
-            proveedor_nombre=row.proveedor_nombre,
+            from_locacion_nombre=_nombre(catalogos.locaciones, row.from_locacion_id),
+            to_locacion_nombre=_nombre(catalogos.locaciones, row.to_locacion_id),
+            persona_nombre=_nombre(catalogos.personas, row.persona_id),
+            proveedor_nombre=_nombre(catalogos.proveedores, row.proveedor_id),
             cantidad=_decimal_to_float(row.cantidad),
             nota=row.nota,
         )
         for row in rows
     ]
-    return RecentMovementsResponse(items=items, limit=limit, offset=offset)
+    return RecentMovementsResponse(
+        items=items,
+        limit=limit,
+        offset=offset,
+        next_cursor=next_cursor(rows, limit),
+    )
 
 
+@_cacheado("stock-by-location")
 def get_stock_by_location(db: Session, *, exclude_zero_stock: bool = True) -> StockByLocationResponse:
     stmt = (
         select(
-            VistaStockActual.locacion_id,
+            Locacion.id.label("locacion_id"),
             Locacion.nombre.label("locacion_nombre"),
-            func.sum(VistaStockActual.stock).label("stock_total"),
+            func.coalesce(func.sum(StockSaldo.stock), 0).label("stock_total"),
         )
-        .join(Locacion, VistaStockActual.locacion_id == Locacion.id)
-        .group_by(VistaStockActual.locacion_id, Locacion.nombre)
+        .select_from(Locacion)
+        .outerjoin(StockSaldo, StockSaldo.locacion_id == Locacion.id)
+        .group_by(Locacion.id, Locacion.nombre)
         .order_by(Locacion.nombre.asc())
     )
 
@@ -225,22 +305,20 @@ def get_stock_by_location(db: Session, *, exclude_zero_stock: bool = True) -> St
     return StockByLocationResponse(items=items)
 
 
+@_cacheado("top-used-products")
 def get_top_used_products(db: Session, *, days: int, limit: int) -> TopUsedProductsResponse:
     since = datetime.now(timezone.utc) - timedelta(days=days)
+    ventana = movimientos_desde(since, tipo=TipoMovimiento.uso)
 
     stmt = (
         select(
-            Movimiento.producto_id,
+            ventana.c.producto_id,
             Producto.nombre.label("producto_nombre"),
-            func.sum(Movimiento.cantidad).label("total_usado"),
-        )
-        .join(Producto, Movimiento.producto_id == Producto.id)
-        .where(
-            Movimiento.fecha >= since,
-            Movimiento.tipo == TipoMovimiento.uso,
+            func.sum(ventana.c.cantidad).label("total_usado"),
         )
-        .group_by(Movimiento.producto_id, Producto.nombre)
-        .order_by(func.sum(Movimiento.cantidad).desc(), Producto.nombre.asc())
+        .join(Producto, ventana.c.producto_id == Producto.id)
+        .group_by(ventana.c.producto_id, Producto.nombre)
+        .order_by(func.sum(ventana.c.cantidad).desc(), Producto.nombre.asc())
         .limit(limit)
     )
 
@@ -260,26 +338,26 @@ def get_top_used_products(db: Session, *, days: int, limit: int) -> TopUsedProdu
     return TopUsedProductsResponse(items=items, days=days, limit=limit)
 
 
+@_cacheado("top-categories")
 def get_top_categories(db: Session, *, days: int, limit: int) -> TopCategoriesResponse:
     since = datetime.now(timezone.utc) - timedelta(days=days)
+    ventana = movimientos_desde(since)
+    # cantidad es siempre positiva (CHECK en movimientos): la suma ya es el volumen movido
+    total_movimiento = func.sum(ventana.c.cantidad)
+    movimientos_count = func.sum(ventana.c.movimientos)
 
     stmt = (
         select(
             Categoria.id.label("categoria_id"),
             Categoria.nombre.label("categoria_nombre"),
-            func.sum(func.abs(Movimiento.cantidad)).label("total_movimiento"),
-            func.count(Movimiento.id).label("movimientos_count"),
+            total_movimiento.label("total_movimiento"),
+            movimientos_count.label("movimientos_count"),
         )
-        .select_from(Movimiento)
-        .join(Producto, Movimiento.producto_id == Producto.id)
+        .select_from(ventana)
+        .join(Producto, ventana.c.producto_id == Producto.id)
         .join(Categoria, Producto.categoria_id == Categoria.id)
-        .where(Movimiento.fecha >= since)
         .group_by(Categoria.id, Categoria.nombre)
-        .order_by(
-            func.sum(func.abs(Movimiento.cantidad)).desc(),
-            func.count(Movimiento.id).desc(),
-            Categoria.nombre.asc(),
-        )
+        .order_by(total_movimiento.desc(), movimientos_count.desc(), Categoria.nombre.asc())
         .limit(limit)
     )
 
@@ -300,54 +378,51 @@ def get_top_categories(db: Session, *, days: int, limit: int) -> TopCategoriesRe
     return TopCategoriesResponse(items=items, days=days, limit=limit)
 
 
+@_cacheado("adjustments-monitor")
 def get_adjustments_monitor(db: Session, *, days: int, top: int) -> AdjustmentsMonitorResponse:
     since = datetime.now(timezone.utc) - timedelta(days=days)
-    base_filter = (
-        Movimiento.fecha >= since,
-        Movimiento.tipo == TipoMovimiento.ajuste,
-    )
+    ajustes = movimientos_desde(since, tipo=TipoMovimiento.ajuste)
 
     try:
         total_adjustments = int(
-            db.execute(
-                select(func.count(Movimiento.id)).where(*base_filter)
-            ).scalar_one()
+            db.execute(select(func.sum(ajustes.c.movimientos))).scalar_one()
             or 0
         )
 
+        ajustes_count = func.sum(ajustes.c.movimientos)
         product_rows = db.execute(
             select(
-                Movimiento.producto_id,
+                ajustes.c.producto_id,
                 Producto.nombre.label("producto_nombre"),
-                func.count(Movimiento.id).label("ajustes_count"),
+                ajustes_count.label("ajustes_count"),
             )
-            .join(Producto, Movimiento.producto_id == Producto.id)
-            .where(*base_filter)
-            .group_by(Movimiento.producto_id, Producto.nombre)
-            .order_by(func.count(Movimiento.id).desc(), Producto.nombre.asc())
+            .join(Producto, ajustes.c.producto_id == Producto.id)
+            .group_by(ajustes.c.producto_id, Producto.nombre)
+            .order_by(ajustes_count.desc(), Producto.nombre.asc())
             .limit(top)
         ).all()
 
         from_loc_stmt = (
-            select(Movimiento.from_locacion_id.label("locacion_id"))
-            .where(*base_filter, Movimiento.from_locacion_id.is_not(None))
+            select(ajustes.c.from_locacion_id.label("locacion_id"), ajustes.c.movimientos)
+            .where(ajustes.c.from_locacion_id.is_not(None))
         )
         to_loc_stmt = (
-            select(Movimiento.to_locacion_id.label("locacion_id"))
-            .where(*base_filter, Movimiento.to_locacion_id.is_not(None))
+            select(ajustes.c.to_locacion_id.label("locacion_id"), ajustes.c.movimientos)
+            .where(ajustes.c.to_locacion_id.is_not(None))
         )
         loc_union = union_all(from_loc_stmt, to_loc_stmt).cte("ajuste_locaciones")
+        loc_count = func.sum(loc_union.c.movimientos)
 
         location_rows = db.execute(
             select(
                 Locacion.id.label("locacion_id"),
                 Locacion.nombre.label("locacion_nombre"),
-                func.count().label("ajustes_count"),
+                loc_count.label("ajustes_count"),
             )
             .select_from(Locacion)
             .join(loc_union, Locacion.id == loc_union.c.locacion_id)
             .group_by(Locacion.id, Locacion.nombre)
-            .order_by(func.count().desc(), Locacion.nombre.asc())
+            .order_by(loc_count.desc(), Locacion.nombre.asc())
             .limit(top)
         ).all()
     except SQLAlchemyError as exc:
@@ -376,3 +451,54 @@ def get_adjustments_monitor(db: Session, *, days: int, top: int) -> AdjustmentsM
         top_locations=top_locations,
         days=days,
     )
+
+
+# Compartido entre requests: acota las conexiones que los bundles ocupan a la vez
+_bundle_executor = ThreadPoolExecutor(
+    max_workers=settings.dashboard_bundle_workers,
+    thread_name_prefix="dashboard-bundle",
+)
+
+
+def get_dashboard_bundle(
+    session_factory: Callable[[], Session],
+    *,
+    days: int,
+    limit: int,
+    recent_limit: int,
+    top: int,
+) -> DashboardBundleResponse:
+    """Todos los widgets del dashboard en una sola respuesta.
+
+    Cada widget corre en su propia sesion (y conexion del pool) en paralelo y
+    pasa por la cache del dashboard igual que su endpoint individual. Cada hilo
+    cuenta sus consultas aparte; se suman a las del request al terminar.
+    """
+    estadisticas = request_actual.get()
+
+    def widget(fn: Callable[..., Any], **params: Any) -> tuple[Any, EstadisticasRequest | None]:
+        # Corre en una copia del contexto: la ContextVar solo cambia para este hilo
+        propias = estadisticas.parcial() if estadisticas is not None else None
+        request_actual.set(propias)
+        with session_factory() as db:
+            return fn(db, **params), propias
+
+    def submit(fn: Callable[..., Any], **params: Any):
+        return _bundle_executor.submit(contextvars.copy_context().run, widget, fn, **params)
+
+    futures = {
+        "summary": submit(get_dashboard_summary),
+        "recent_movements": submit(get_recent_movements, limit=recent_limit, offset=0),
+        "stock_by_location": submit(get_stock_by_location),
+        "top_used_products": submit(get_top_used_products, days=days, limit=limit),
+        "top_categories": submit(get_top_categories, days=days, limit=limit),
+        "adjustments_monitor": submit(get_adjustments_monitor, days=days, top=top),
+    }
+    resultados = {}
+    for name, future in futures.items():
+        resultados[name], propias = future.result()
+        if estadisticas is not None:
+            estadisticas.sumar(propias)
+    if estadisticas is not None:
+        estadisticas.verificar()
+    return DashboardBundleResponse(**resultados)
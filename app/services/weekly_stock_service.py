@@ -1,15 +1,19 @@
 """
 Servicio para calcular stock semanal por categorías
 """
-from datetime import datetime, date, timedelta
-from sqlalchemy import func, and_, case
-from sqlalchemy.orm import Session, joinedload
+from collections.abc import Iterator
+from datetime import date, timedelta
+from sqlalchemy import Select, func, literal, select, union_all
+from sqlalchemy.orm import Session
 
+from app.crud.fechas import hoy, inicio_dia, rango_dias
+from app.crud.stock import saldos_antes_de
 from app.models import (
     Producto,
     Categoria,
     Marca,
-    Movimiento,
+    StockSaldo,
+    VistaMovimientoLocacion,
 )
 from app.schemas.weekly_stock import (
     WeeklyStockResponse,
@@ -18,57 +22,115 @@ from app.schemas.weekly_stock import (
     DailyMovements,
 )
 
+DAY_NAMES = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
 
 def _get_monday(d: date) -> date:
     """Obtiene el lunes de la semana dada"""
     return d - timedelta(days=d.weekday())
 
 
-def _get_stock_at_date(db: Session, producto_id: int, until_date: date) -> float:
+def _weekly_stock_stmt(monday: date, category_ids: list[int] | None) -> Select:
     """
-    Calcula el stock de un producto hasta una fecha dada.
-    INGRESO suma (+), USO resta (-), TRASPASO no afecta stock total.
+    Consulta única del reporte: una fila por producto activo con su categoría y marca,
+    el stock inicial (antes del lunes), el neto de cada día y el stock actual real.
+
+    El stock inicial parte del cierre o foto diaria más cercana; el actual sale de stock_saldos.
+    Los días futuros vuelven en NULL.
     """
-    result = db.query(
-        func.coalesce(
-            func.sum(
-                case(
-                    (Movimiento.tipo == 'ingreso', Movimiento.cantidad),
-                    (Movimiento.tipo == 'uso', -Movimiento.cantidad),
-                    else_=0
-                )
+    filtros = [Producto.activo == True]
+    if category_ids:
+        filtros.append(Producto.categoria_id.in_(category_ids))
+    productos_ids = select(Producto.id).where(*filtros)
+
+    saldos = saldos_antes_de(inicio_dia(monday))
+    fuentes = union_all(
+        select(
+            saldos.c.producto_id.label("producto_id"),
+            saldos.c.stock.label("inicial"),
+            literal(0).label("actual"),
+        ),
+        select(
+            StockSaldo.producto_id.label("producto_id"),
+            literal(0).label("inicial"),
+            StockSaldo.stock.label("actual"),
+        ),
+    ).subquery("fuentes")
+    saldos_producto = (
+        select(
+            fuentes.c.producto_id,
+            func.sum(fuentes.c.inicial).label("inicial"),
+            func.sum(fuentes.c.actual).label("actual"),
+        )
+        .where(fuentes.c.producto_id.in_(productos_ids))
+        .group_by(fuentes.c.producto_id)
+        .subquery("saldos_producto")
+    )
+
+    # Movimiento neto por día (ingresos, usos y ajustes; los traspasos se compensan)
+    ultimo_dia = min(monday + timedelta(days=6), hoy())
+    week_dates = [monday + timedelta(days=offset) for offset in range(7)]
+    movimientos = (
+        select(
+            VistaMovimientoLocacion.producto_id,
+            *(
+                func.sum(VistaMovimientoLocacion.cantidad)
+                .filter(rango_dias(VistaMovimientoLocacion.fecha, day_date))
+                .label(day_name)
+                for day_name, day_date in zip(DAY_NAMES, week_dates)
+                if day_date <= ultimo_dia
             ),
-            0
         )
-    ).filter(
-        Movimiento.producto_id == producto_id,
-        func.date(Movimiento.fecha) <= until_date
-    ).scalar()
-    
-    return float(result or 0)
+        .where(
+            VistaMovimientoLocacion.producto_id.in_(productos_ids),
+            rango_dias(VistaMovimientoLocacion.fecha, monday, ultimo_dia),
+        )
+        .group_by(VistaMovimientoLocacion.producto_id)
+        .subquery("movimientos")
+    )
 
+    daily_columns = []
+    for day_name, day_date in zip(DAY_NAMES, week_dates):
+        if day_date <= ultimo_dia:
+            daily_columns.append(func.coalesce(movimientos.c[day_name], 0).label(day_name))
+        else:
+            daily_columns.append(literal(None).label(day_name))
 
-def _get_current_stock(db: Session, producto_id: int) -> float:
+    return (
+        select(
+            Categoria.id.label("category_id"),
+            Categoria.nombre.label("category_name"),
+            Producto.id.label("id"),
+            Producto.nombre.label("name"),
+            Marca.nombre.label("brand"),
+            func.coalesce(saldos_producto.c.inicial, 0).label("initial_stock"),
+            *daily_columns,
+            func.coalesce(saldos_producto.c.actual, 0).label("final_stock_realtime"),
+        )
+        .join(Categoria, Producto.categoria_id == Categoria.id)
+        .outerjoin(Marca, Producto.marca_id == Marca.id)
+        .outerjoin(saldos_producto, saldos_producto.c.producto_id == Producto.id)
+        .outerjoin(movimientos, movimientos.c.producto_id == Producto.id)
+        .where(*filtros)
+        .order_by(Categoria.id, Producto.id)
+    )
+
+
+def iter_weekly_stock_rows(
+    db: Session,
+    *,
+    week_start: date,
+    category_ids: list[int] | None = None,
+    chunk_size: int = 500,
+) -> Iterator[list]:
     """
-    Obtiene el stock actual real del producto calculando:
-    INGRESO suma (+), USO resta (-), TRASPASO no afecta stock total.
+    Recorre el reporte semanal con un cursor del servidor, en bloques de `chunk_size` filas.
+    Cada fila trae categoría, producto, marca, stock inicial, los siete días y el stock actual.
     """
-    result = db.query(
-        func.coalesce(
-            func.sum(
-                case(
-                    (Movimiento.tipo == 'ingreso', Movimiento.cantidad),
-                    (Movimiento.tipo == 'uso', -Movimiento.cantidad),
-                    else_=0
-                )
-            ),
-            0
-        )
-    ).filter(
-        Movimiento.producto_id == producto_id
-    ).scalar()
-    
-    return float(result or 0)
+    stmt = _weekly_stock_stmt(_get_monday(week_start), category_ids)
+    result = db.execute(stmt.execution_options(yield_per=chunk_size))
+    for partition in result.mappings().partitions():
+        yield partition
 
 
 def get_weekly_stock(
@@ -79,121 +141,44 @@ def get_weekly_stock(
 ) -> WeeklyStockResponse:
     """
     Obtiene el reporte semanal de stock por categorías.
-    
+
     Args:
         db: Sesión de base de datos
         week_start: Fecha de inicio de semana (debe ser lunes)
         category_ids: Lista de IDs de categorías a filtrar (None = todas)
-    
+
     Returns:
         WeeklyStockResponse con datos de stock semanal
     """
     # Asegurar que week_start sea lunes
     monday = _get_monday(week_start)
-    
-    # Calcular fechas de la semana
-    week_dates = {
-        'monday': monday,
-        'tuesday': monday + timedelta(days=1),
-        'wednesday': monday + timedelta(days=2),
-        'thursday': monday + timedelta(days=3),
-        'friday': monday + timedelta(days=4),
-        'saturday': monday + timedelta(days=5),
-        'sunday': monday + timedelta(days=6),
-    }
-    
-    # Fecha límite (domingo)
-    week_end = monday + timedelta(days=6)
-    
-    # Fecha del día anterior al lunes (para stock inicial)
-    prev_day = monday - timedelta(days=1)
-    
-    # Query base de productos
-    query = db.query(Producto).filter(Producto.activo == True)
-    
-    # Filtrar por categorías si se especifican
-    if category_ids:
-        query = query.filter(Producto.categoria_id.in_(category_ids))
-    
-    # Obtener productos con sus relaciones
-    productos = query.options(
-        joinedload(Producto.categoria),
-        joinedload(Producto.marca)
-    ).all()
-    
-    # Agrupar productos por categoría
-    categories_map: dict[int, list[Producto]] = {}
-    for producto in productos:
-        cat_id = producto.categoria_id
-        if cat_id not in categories_map:
-            categories_map[cat_id] = []
-        categories_map[cat_id].append(producto)
-    
-    # Procesar cada categoría
-    categories_result = []
-    
-    for cat_id, cat_productos in categories_map.items():
-        # Obtener info de categoría
-        categoria = cat_productos[0].categoria
-        
-        weekly_products = []
-        
-        for producto in cat_productos:
-            # Calcular stock inicial (al final del día anterior al lunes)
-            initial_stock = _get_stock_at_date(db, producto.id, prev_day)
-            
-            # Calcular movimientos diarios
-            daily_movements_data = {}
-            
-            for day_name, day_date in week_dates.items():
-                # Si la fecha es futura, no calcular
-                if day_date > date.today():
-                    daily_movements_data[day_name] = None
-                else:
-                    # Calcular movimientos del día: INGRESO suma, USO resta
-                    movement_sum = db.query(
-                        func.coalesce(
-                            func.sum(
-                                case(
-                                    (Movimiento.tipo == 'ingreso', Movimiento.cantidad),
-                                    (Movimiento.tipo == 'uso', -Movimiento.cantidad),
-                                    else_=0
-                                )
-                            ),
-                            0
-                        )
-                    ).filter(
-                        Movimiento.producto_id == producto.id,
-                        func.date(Movimiento.fecha) == day_date
-                    ).scalar()
-                    
-                    daily_movements_data[day_name] = float(movement_sum or 0)
-            
-            # Obtener stock actual real (fuente de verdad)
-            final_stock_realtime = _get_current_stock(db, producto.id)
-            
-            # Crear objeto WeeklyProduct
-            weekly_product = WeeklyProduct(
-                id=producto.id,
-                name=producto.nombre,
-                brand=producto.marca.nombre if producto.marca else None,
+
+    rows = db.execute(_weekly_stock_stmt(monday, category_ids)).mappings().all()
+
+    # Agrupar productos por categoría (las filas vienen ordenadas por categoría)
+    categories_result: list[WeeklyCategory] = []
+    for row in rows:
+        if not categories_result or categories_result[-1].category_id != row["category_id"]:
+            categories_result.append(
+                WeeklyCategory(
+                    category_id=row["category_id"],
+                    category_name=row["category_name"],
+                    products=[],
+                )
+            )
+
+        categories_result[-1].products.append(
+            WeeklyProduct(
+                id=row["id"],
+                name=row["name"],
+                brand=row["brand"],
                 supplier=None,  # No existe relación proveedor en Producto
-                initial_stock=initial_stock,
-                daily_movements=DailyMovements(**daily_movements_data),
-                final_stock_realtime=final_stock_realtime
+                initial_stock=row["initial_stock"],
+                daily_movements=DailyMovements(**{day_name: row[day_name] for day_name in DAY_NAMES}),
+                final_stock_realtime=row["final_stock_realtime"],
             )
-            
-            weekly_products.append(weekly_product)
-        
-        # Crear objeto WeeklyCategory
-        weekly_category = WeeklyCategory(
-            category_id=cat_id,
-            category_name=categoria.nombre,
-            products=weekly_products
         )
-        
-        categories_result.append(weekly_category)
-    
+
     return WeeklyStockResponse(
         week_start=monday.isoformat(),
         categories=categories_result
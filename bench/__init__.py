@@ -0,0 +1 @@
+"""Scripts de carga y benchmark; no forman parte de la API."""
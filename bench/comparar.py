@@ -0,0 +1,36 @@
+"""Compara dos resultados de ``bench.runner`` (p50 por endpoint y escala).
+
+    python -m bench.comparar bench/resultados/abc123.json bench/resultados/def456.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base", type=Path)
+    parser.add_argument("nuevo", type=Path)
+    parser.add_argument("--metrica", default="p50_ms", choices=["min_ms", "p50_ms", "p95_ms", "media_ms"])
+    args = parser.parse_args()
+
+    base = json.loads(args.base.read_text(encoding="utf-8"))
+    nuevo = json.loads(args.nuevo.read_text(encoding="utf-8"))
+    print(f"{args.metrica}: {base.get('commit', '')[:10]} -> {nuevo.get('commit', '')[:10]}")
+    for escala, datos in nuevo["escalas"].items():
+        anteriores = base["escalas"].get(escala, {}).get("endpoints", {})
+        print(f"\n[{escala}]")
+        for endpoint, medicion in datos["endpoints"].items():
+            actual = medicion[args.metrica]
+            previo = anteriores.get(endpoint, {}).get(args.metrica)
+            if previo:
+                print(f"  {endpoint:<70} {previo:9.1f} -> {actual:9.1f} ms  x{actual / previo:5.2f}")
+            else:
+                print(f"  {endpoint:<70} {'':9} -> {actual:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
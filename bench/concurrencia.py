@@ -0,0 +1,81 @@
+"""Verificacion de retiros concurrentes contra tg_actualizar_stock_saldos.
+
+Lanza muchos usos simultaneos del mismo producto y locacion, cada uno en su
+propia sesion, por una cantidad fija. Con el bloqueo de la fila de
+stock_saldos deben aceptarse exactamente ``floor(stock / cantidad)`` retiros y
+el saldo final debe ser el inicial menos lo aceptado, nunca negativo.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import crud
+from app.models import StockSaldo
+from app.models.movimiento import TipoMovimiento
+from app.schemas.movimiento import MovimientoCreate
+
+
+def _saldo(factory: sessionmaker[Session], producto_id: int, locacion_id: int) -> Decimal:
+    with factory() as db:
+        stock = db.execute(
+            select(StockSaldo.stock).where(
+                StockSaldo.producto_id == producto_id,
+                StockSaldo.locacion_id == locacion_id,
+            )
+        ).scalar_one_or_none()
+    return stock or Decimal(0)
+
+
+def verificar_retiros_concurrentes(
+    factory: sessionmaker[Session],
+    *,
+    producto_id: int,
+    locacion_id: int,
+    retiros: int = 64,
+    hilos: int = 16,
+) -> dict:
+    inicial = _saldo(factory, producto_id, locacion_id)
+    # Aproximadamente la mitad de los retiros deberia fallar por stock insuficiente
+    cantidad = max((inicial * 2 / retiros).quantize(Decimal("0.001")), Decimal("0.001"))
+    movimiento = MovimientoCreate(
+        producto_id=producto_id,
+        tipo=TipoMovimiento.uso,
+        from_locacion_id=locacion_id,
+        cantidad=cantidad,
+        nota="bench: retiro concurrente",
+    )
+
+    def retirar(_: int) -> bool:
+        with factory() as db:
+            try:
+                crud.movimientos.create(db, obj_in=movimiento)
+                return True
+            except DBAPIError:
+                db.rollback()
+                return False
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(retirar, range(retiros)))
+
+    aceptados = sum(resultados)
+    final = _saldo(factory, producto_id, locacion_id)
+    esperados = min(int(inicial // cantidad), retiros)
+    return {
+        "retiros": retiros,
+        "hilos": hilos,
+        "cantidad": str(cantidad),
+        "stock_inicial": str(inicial),
+        "stock_final": str(final),
+        "aceptados": aceptados,
+        "aceptados_esperados": esperados,
+        "consistente": aceptados == esperados and final == inicial - aceptados * cantidad and final >= 0,
+    }
+
+
+__all__ = ["verificar_retiros_concurrentes"]
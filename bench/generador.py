@@ -0,0 +1,228 @@
+"""Kardex sintetico determinista a escala: N productos x M locaciones x K movimientos.
+
+Usa el vocabulario del seeder de Calameno (categorias, locaciones, personas y
+unidades de medida) y una semilla fija, asi que la misma escala, semilla y
+fecha de fin producen exactamente los mismos datos. Los movimientos se
+generan en orden cronologico llevando el saldo de cada producto y locacion,
+de modo que ningun uso, traspaso o ajuste negativo deja stock bajo cero.
+
+    python -m bench.generador --escala s --database-url postgresql+psycopg2://...
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from db.build_calamenio_seeder import CATEGORY_MAP, LOCATION_PERSON, UOM_DEFS
+
+
+@dataclass(frozen=True)
+class Escala:
+    productos: int
+    locaciones: int
+    movimientos: int
+    dias: int = 180
+
+
+ESCALAS: dict[str, Escala] = {
+    "xs": Escala(productos=200, locaciones=4, movimientos=20_000),
+    "s": Escala(productos=1_000, locaciones=8, movimientos=200_000),
+    "m": Escala(productos=5_000, locaciones=16, movimientos=1_000_000),
+    "l": Escala(productos=20_000, locaciones=32, movimientos=5_000_000),
+}
+
+COLUMNAS_MOVIMIENTOS = (
+    "id",
+    "fecha",
+    "tipo",
+    "producto_id",
+    "from_locacion_id",
+    "to_locacion_id",
+    "persona_id",
+    "proveedor_id",
+    "cantidad",
+    "nota",
+)
+
+
+def _cantidad(milis: int) -> str:
+    return f"{milis // 1000}.{milis % 1000:03d}"
+
+
+class LedgerSintetico:
+    def __init__(self, escala: Escala, *, semilla: int = 42, fin: datetime | None = None) -> None:
+        self.escala = escala
+        self.semilla = semilla
+        if fin is None:
+            fin = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.fin = fin
+        rng = random.Random(semilla)
+
+        self.uoms = [
+            (id_, nombre, abreviatura, descripcion, True)
+            for id_, (abreviatura, (nombre, descripcion)) in enumerate(UOM_DEFS.items(), start=1)
+        ]
+        self.categorias = [(id_, nombre, True) for id_, nombre in enumerate(sorted(set(CATEGORY_MAP.values())), start=1)]
+        self.marcas = [(id_, f"Marca {id_:04d}", True) for id_ in range(1, max(10, escala.productos // 20) + 1)]
+        self.proveedores = [(1, "Proveedores Varios Calameno", True)] + [
+            (id_, f"Proveedor {id_:03d}", True) for id_ in range(2, max(5, escala.productos // 100) + 1)
+        ]
+
+        bases = list(LOCATION_PERSON.items())
+        self.locaciones = []
+        self.personas = []
+        for indice in range(escala.locaciones):
+            locacion, persona = bases[indice % len(bases)]
+            sufijo = f" {indice // len(bases) + 1}" if indice >= len(bases) else ""
+            self.locaciones.append((indice + 1, locacion + sufijo, True))
+            self.personas.append((indice + 1, persona + sufijo, True))
+
+        self.productos = []
+        for id_ in range(1, escala.productos + 1):
+            categoria = rng.choice(self.categorias)
+            self.productos.append(
+                (
+                    id_,
+                    f"BENCH-{id_:06d}",
+                    f"{categoria[1]} {id_:05d}",
+                    True,
+                    rng.choice(self.uoms)[0],
+                    rng.choice(self.marcas)[0],
+                    categoria[0],
+                )
+            )
+
+    def movimientos(self) -> Iterator[tuple]:
+        """Movimientos en orden de fecha e id; se regeneran igual en cada llamada."""
+        escala = self.escala
+        rng = random.Random(self.semilla + 1)
+        inicio = self.fin - timedelta(days=escala.dias)
+        paso = escala.dias * 86400 / escala.movimientos
+        n_productos = escala.productos
+        n_locaciones = escala.locaciones
+        n_proveedores = len(self.proveedores)
+        # saldo en milesimas por producto: {locacion_id: milis}
+        saldos: list[dict[int, int]] = [{} for _ in range(n_productos + 1)]
+
+        for id_ in range(1, escala.movimientos + 1):
+            fecha = inicio + timedelta(seconds=(id_ - 1 + rng.random()) * paso)
+            # Pocos productos concentran la mayoria de los movimientos
+            producto_id = int(rng.random() ** 2 * n_productos) + 1
+            saldo = saldos[producto_id]
+            con_stock = [locacion for locacion, milis in saldo.items() if milis > 0]
+            r = rng.random()
+            from_id = to_id = proveedor_id = None
+
+            if r < 0.35 or not con_stock:
+                tipo = "ingreso"
+                to_id = rng.randrange(n_locaciones) + 1
+                milis = rng.randint(10, 200) * 1000
+                proveedor_id = rng.randrange(n_proveedores) + 1
+                persona_id = to_id
+            elif r < 0.75:
+                tipo = "uso"
+                from_id = rng.choice(con_stock)
+                milis = rng.randint(1, min(saldo[from_id], 20_000))
+                persona_id = from_id
+            elif r < 0.90 and n_locaciones > 1:
+                tipo = "traspaso"
+                from_id = rng.choice(con_stock)
+                to_id = rng.randrange(n_locaciones - 1) + 1
+                if to_id >= from_id:
+                    to_id += 1
+                milis = rng.randint(1, saldo[from_id])
+                persona_id = from_id
+            else:
+                tipo = "ajuste"
+                if rng.random() < 0.5:
+                    to_id = rng.randrange(n_locaciones) + 1
+                    milis = rng.randint(1, 5_000)
+                    persona_id = to_id
+                else:
+                    from_id = rng.choice(con_stock)
+                    milis = rng.randint(1, min(saldo[from_id], 5_000))
+                    persona_id = from_id
+
+            if from_id is not None:
+                saldo[from_id] -= milis
+            if to_id is not None:
+                saldo[to_id] = saldo.get(to_id, 0) + milis
+
+            yield (
+                id_,
+                fecha.isoformat(),
+                tipo,
+                producto_id,
+                from_id,
+                to_id,
+                persona_id,
+                proveedor_id,
+                _cantidad(milis),
+                None,
+            )
+
+    def tablas(self) -> list[tuple[str, tuple[str, ...], object]]:
+        """(tabla, columnas, filas) en orden de dependencias para ``copiar``."""
+        return [
+            ("uoms", ("id", "nombre", "abreviatura", "descripcion", "activa"), self.uoms),
+            ("categorias", ("id", "nombre", "activa"), self.categorias),
+            ("marcas", ("id", "nombre", "activa"), self.marcas),
+            ("proveedores", ("id", "nombre", "activa"), self.proveedores),
+            ("locaciones", ("id", "nombre", "activa"), self.locaciones),
+            ("personas", ("id", "nombre", "activa"), self.personas),
+            (
+                "productos",
+                ("id", "sku", "nombre", "activo", "uom_id", "marca_id", "categoria_id"),
+                self.productos,
+            ),
+            ("movimientos", COLUMNAS_MOVIMIENTOS, self.movimientos()),
+        ]
+
+
+def cargar(engine, ledger: LedgerSintetico) -> dict[str, float]:
+    """Reemplaza el contenido de la base por `ledger` (COPY sin triggers) y analiza las tablas."""
+    from app.db.carga_masiva import carga_masiva, copiar
+
+    inicio = time.perf_counter()
+    filas: dict[str, float] = {}
+    conn = engine.raw_connection()
+    try:
+        desde = (ledger.fin - timedelta(days=ledger.escala.dias)).date()
+        with carga_masiva(conn.driver_connection, truncar=True, desde=desde) as cursor:
+            for tabla, columnas, datos in ledger.tablas():
+                filas[tabla] = copiar(cursor, tabla, columnas, datos)
+        conn.driver_connection.autocommit = True
+        with conn.driver_connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        conn.driver_connection.autocommit = False
+    finally:
+        conn.close()
+    filas["segundos"] = time.perf_counter() - inicio
+    return filas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Carga un kardex sintetico en la base indicada.")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="xs")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--fin", type=datetime.fromisoformat, help="Fecha del ultimo movimiento (por defecto hoy, UTC)")
+    parser.add_argument("--database-url", help="Por defecto DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.database_url:
+        import os
+
+        os.environ["DATABASE_URL"] = args.database_url
+    from app.db.session import engine
+
+    ledger = LedgerSintetico(ESCALAS[args.escala], semilla=args.semilla, fin=args.fin)
+    print(cargar(engine, ledger))
+
+
+if __name__ == "__main__":
+    main()
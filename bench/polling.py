@@ -0,0 +1,123 @@
+"""Benchmark de sondeo concurrente contra una API en ejecucion.
+
+Simula N clientes que consultan en bucle los endpoints de sondeo (stock y
+dashboard) durante D segundos y reporta RPS y latencias p50/p99. Sirve para
+comparar el stack sync con el async: correrlo con la API levantada con
+ASYNC_DB_ENABLED=false y luego con true, con los mismos datos.
+
+    python -m bench.polling --url http://localhost:8000 --clientes 200 --segundos 30
+
+Por defecto no envia If-None-Match, para medir las consultas y no los 304.
+Con ``--salida`` agrega el resultado a un JSON (una entrada por stack) en
+``bench/resultados``. Requiere httpx (``pip install httpx``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import time
+from pathlib import Path
+
+import httpx
+
+RUTAS = (
+    "/api/v1/stock/",
+    "/api/v1/stock/locaciones",
+    "/api/v1/dashboard/summary",
+    "/api/v1/dashboard/recent-movements?limit=50",
+    "/api/v1/dashboard/stock-by-location",
+    "/api/v1/dashboard/top-used-products",
+)
+
+
+async def _cliente(
+    http: httpx.AsyncClient,
+    rutas: itertools.cycle,
+    fin: float,
+    latencias: list[float],
+    errores: list[int],
+    usar_etag: bool,
+) -> None:
+    etags: dict[str, str] = {}
+    while time.perf_counter() < fin:
+        ruta = next(rutas)
+        headers = {"If-None-Match": etags[ruta]} if usar_etag and ruta in etags else {}
+        inicio = time.perf_counter()
+        try:
+            response = await http.get(ruta, headers=headers)
+        except httpx.HTTPError:
+            errores.append(0)
+            continue
+        latencias.append(time.perf_counter() - inicio)
+        if response.status_code >= 400:
+            errores.append(response.status_code)
+        elif "etag" in response.headers:
+            etags[ruta] = response.headers["etag"]
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    if len(valores) < 2:
+        return valores[0] if valores else 0.0
+    return statistics.quantiles(valores, n=100, method="inclusive")[int(p) - 1]
+
+
+async def correr(url: str, clientes: int, segundos: float, usar_etag: bool) -> dict[str, float]:
+    latencias: list[float] = []
+    errores: list[int] = []
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30.0) as http:
+        inicio = time.perf_counter()
+        fin = inicio + segundos
+        await asyncio.gather(
+            *(
+                _cliente(http, itertools.cycle(RUTAS[i % len(RUTAS):] + RUTAS[: i % len(RUTAS)]), fin, latencias, errores, usar_etag)
+                for i in range(clientes)
+            )
+        )
+        duracion = time.perf_counter() - inicio
+
+    return {
+        "requests": len(latencias),
+        "errores": len(errores),
+        "rps": len(latencias) / duracion,
+        "p50_ms": _percentil(latencias, 50) * 1000,
+        "p99_ms": _percentil(latencias, 99) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clientes", type=int, default=100, help="Clientes concurrentes")
+    parser.add_argument("--segundos", type=float, default=30.0, help="Duracion de la prueba")
+    parser.add_argument("--etag", action="store_true", help="Reenviar If-None-Match como un navegador")
+    parser.add_argument("--stack", help="Etiqueta de la corrida en --salida, por ejemplo sync o async")
+    parser.add_argument("--salida", type=Path, help="JSON al que se agrega el resultado")
+    args = parser.parse_args()
+
+    resultado = asyncio.run(correr(args.url, args.clientes, args.segundos, args.etag))
+    print(
+        f"clientes={args.clientes} requests={resultado['requests']} errores={resultado['errores']} "
+        f"rps={resultado['rps']:.1f} p50={resultado['p50_ms']:.1f}ms p99={resultado['p99_ms']:.1f}ms"
+    )
+    if args.salida:
+        corridas = json.loads(args.salida.read_text(encoding="utf-8")) if args.salida.exists() else []
+        corridas.append(
+            {
+                "stack": args.stack,
+                "clientes": args.clientes,
+                "segundos": args.segundos,
+                "etag": args.etag,
+                **{clave: round(valor, 2) for clave, valor in resultado.items()},
+            }
+        )
+        args.salida.parent.mkdir(parents=True, exist_ok=True)
+        args.salida.write_text(json.dumps(corridas, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
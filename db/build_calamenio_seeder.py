@@ -3,19 +3,19 @@
 
 from __future__ import annotations
 
+import argparse
 import math
+import os
 import re
+import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
 
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
 
 BASE_DIR = Path(__file__).resolve().parents[1]
-EXCEL_CANDIDATES = sorted(BASE_DIR.glob("inventarios angel*.xlsx"))
-if not EXCEL_CANDIDATES:
-    raise FileNotFoundError("No se encontró el Excel de inventarios Calameño.")
-EXCEL_PATH = EXCEL_CANDIDATES[0]
 OUTPUT_PATH = Path(__file__).with_name("seeds_calamenio.sql")
 
 CATEGORY_MAP = {
@@ -404,6 +404,114 @@ def escape(value: str) -> str:
     return value.replace("'", "''")
 
 
+LOCATIONS = ["Bodega Calameno", "Camara Fria Calameno", "Bar Calameno", "Operaciones Calameno"]
+
+
+def movement_entries(stock_entries: List[Dict]) -> Iterable[Dict]:
+    return (entry for entry in stock_entries if entry["quantity"] > 0 and entry.get("sku"))
+
+
+def build_copy_tables(
+    products: List[Dict],
+    stock_entries: List[Dict],
+    providers: List[str],
+    categories: List[str],
+) -> List[Tuple[str, Tuple[str, ...], List[tuple]]]:
+    """Filas de cada tabla con los ids ya resueltos, para cargarlas con COPY sobre una base vacia."""
+    uom_ids = {abbr: index for index, abbr in enumerate(UOM_DEFS, start=1)}
+    category_ids = {name: index for index, name in enumerate(categories, start=1)}
+    brand_ids = {name: index for index, name in enumerate(sorted({prod["brand"] for prod in products}), start=1)}
+    provider_ids = {name: index for index, name in enumerate(providers, start=1)}
+    location_ids = {name: index for index, name in enumerate(LOCATIONS, start=1)}
+    persona_ids = {name: index for index, name in enumerate(sorted(set(LOCATION_PERSON.values())), start=1)}
+    product_ids = {prod["sku"]: index for index, prod in enumerate(products, start=1)}
+
+    movements = [
+        (
+            MOVEMENT_TIMESTAMP,
+            "ingreso",
+            product_ids[entry["sku"]],
+            None,
+            location_ids[entry["location"]],
+            persona_ids.get(entry["persona"]),
+            provider_ids.get(entry["supplier"]) if entry["supplier"] else None,
+            f"{entry['quantity']:.3f}",
+            entry["note"],
+        )
+        for entry in movement_entries(stock_entries)
+    ]
+    return [
+        (
+            "uoms",
+            ("id", "nombre", "abreviatura", "descripcion"),
+            [(uom_ids[abbr], name, abbr, desc) for abbr, (name, desc) in UOM_DEFS.items()],
+        ),
+        ("categorias", ("id", "nombre"), [(index, name) for name, index in category_ids.items()]),
+        ("marcas", ("id", "nombre"), [(index, name) for name, index in brand_ids.items()]),
+        ("proveedores", ("id", "nombre"), [(index, name) for name, index in provider_ids.items()]),
+        ("locaciones", ("id", "nombre"), [(index, name) for name, index in location_ids.items()]),
+        ("personas", ("id", "nombre"), [(index, name) for name, index in persona_ids.items()]),
+        (
+            "productos",
+            ("id", "sku", "nombre", "activo", "uom_id", "marca_id", "categoria_id"),
+            [
+                (
+                    product_ids[prod["sku"]],
+                    prod["sku"],
+                    prod["name"],
+                    True,
+                    uom_ids[prod["uom"]],
+                    brand_ids.get(prod["brand"]),
+                    category_ids.get(prod["category"]),
+                )
+                for prod in products
+            ],
+        ),
+        (
+            "movimientos",
+            (
+                "fecha",
+                "tipo",
+                "producto_id",
+                "from_locacion_id",
+                "to_locacion_id",
+                "persona_id",
+                "proveedor_id",
+                "cantidad",
+                "nota",
+            ),
+            movements,
+        ),
+    ]
+
+
+def load_direct(tables: List[Tuple[str, Tuple[str, ...], List[tuple]]], database_url: str, replace: bool) -> None:
+    """Carga las tablas con un COPY por tabla en una sola transaccion (ver app/db/carga_masiva.py)."""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+
+    from app.db.carga_masiva import carga_masiva, copiar
+
+    engine = create_engine(database_url, poolclass=NullPool)
+    connection = engine.raw_connection()
+    try:
+        conn = connection.driver_connection
+        if not replace:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT EXISTS (SELECT 1 FROM productos) OR EXISTS (SELECT 1 FROM movimientos)")
+                if cursor.fetchone()[0]:
+                    raise SystemExit("La base ya tiene datos; usa --replace para reemplazarlos.")
+        with carga_masiva(conn, truncar=True) as cursor:
+            for table, columns, rows in tables:
+                count = copiar(cursor, table, columns, rows)
+                print(f"{table}: {count} filas")
+    finally:
+        connection.close()
+        engine.dispose()
+
+
 def build_sql(
     products: List[Dict],
     stock_entries: List[Dict],
@@ -418,14 +526,7 @@ def build_sql(
     brand_set = sorted({prod["brand"] for prod in products})
     brand_values = ",\n  ".join(f"('{escape(brand)}')" for brand in brand_set)
     provider_values = ",\n  ".join(f"('{escape(prov)}')" for prov in providers)
-    location_values = ",\n  ".join(
-        [
-            "('Bodega Calameno')",
-            "('Camara Fria Calameno')",
-            "('Bar Calameno')",
-            "('Operaciones Calameno')",
-        ]
-    )
+    location_values = ",\n  ".join(f"('{escape(name)}')" for name in LOCATIONS)
     persona_values = ",\n  ".join(
         f"('{escape(name)}')" for name in sorted(set(LOCATION_PERSON.values()))
     )
@@ -437,29 +538,19 @@ def build_sql(
     )
 
     movement_values = []
-    for entry in stock_entries:
-        if entry["quantity"] <= 0 or not entry.get("sku"):
-            continue
-        provider_literal = (
-            f"(SELECT id FROM proveedores WHERE nombre = '{escape(entry['supplier'])}')"
-            if entry["supplier"]
-            else "NULL"
-        )
-        sku = escape(entry["sku"])
+    for entry in movement_entries(stock_entries):
+        supplier_literal = f"'{escape(entry['supplier'])}'" if entry["supplier"] else "NULL"
         movement_values.append(
             "("
-            f"TIMESTAMPTZ '{MOVEMENT_TIMESTAMP}', "
-            f"'ingreso', "
-            f"(SELECT id FROM productos WHERE sku = '{sku}'), "
-            "NULL, "
-            f"(SELECT id FROM locaciones WHERE nombre = '{escape(entry['location'])}'), "
-            f"(SELECT id FROM personas WHERE nombre = '{escape(entry['persona'])}'), "
-            f"{provider_literal}, "
+            f"'{escape(entry['sku'])}', "
+            f"'{escape(entry['location'])}', "
+            f"'{escape(entry['persona'])}', "
+            f"{supplier_literal}, "
             f"{entry['quantity']:.3f}, "
             f"'{escape(entry['note'])}'"
             ")"
         )
-    movement_values_sql = ",\n  ".join(movement_values)
+    movement_values_sql = ",\n    ".join(movement_values)
 
     sql_parts = [
         "-- Archivo generado automáticamente por build_calamenio_seeder.py",
@@ -495,9 +586,50 @@ def build_sql(
     if movement_values_sql:
         sql_parts.extend(
             [
-                "\n-- Movimientos iniciales",
-                "INSERT INTO movimientos (fecha, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, proveedor_id, cantidad, nota)\nVALUES",
-                f"  {movement_values_sql};",
+                "\n-- Movimientos iniciales (ids resueltos con un join, no una subconsulta por fila)",
+                "CREATE TEMP TABLE movimiento_data (",
+                "  sku TEXT, locacion TEXT, persona TEXT, proveedor TEXT, cantidad NUMERIC, nota TEXT",
+                ") ON COMMIT DROP;",
+                "INSERT INTO movimiento_data (sku, locacion, persona, proveedor, cantidad, nota)\nVALUES",
+                f"    {movement_values_sql};",
+                "\n-- Un sku o nombre sin fila en su catalogo aborta la carga en lugar de descartar el movimiento",
+                "DO $$",
+                "DECLARE",
+                "  faltantes TEXT;",
+                "BEGIN",
+                "  SELECT string_agg(DISTINCT f.referencia, ', ') INTO faltantes",
+                "  FROM movimiento_data d",
+                "  LEFT JOIN productos p ON p.sku = d.sku",
+                "  LEFT JOIN locaciones l ON l.nombre = d.locacion",
+                "  LEFT JOIN personas pe ON pe.nombre = d.persona",
+                "  LEFT JOIN proveedores pr ON pr.nombre = d.proveedor",
+                "  CROSS JOIN LATERAL (VALUES",
+                "    (CASE WHEN p.id IS NULL THEN 'producto ' || d.sku END),",
+                "    (CASE WHEN l.id IS NULL THEN 'locacion ' || d.locacion END),",
+                "    (CASE WHEN d.persona IS NOT NULL AND pe.id IS NULL THEN 'persona ' || d.persona END),",
+                "    (CASE WHEN d.proveedor IS NOT NULL AND pr.id IS NULL THEN 'proveedor ' || d.proveedor END)",
+                "  ) AS f (referencia)",
+                "  WHERE f.referencia IS NOT NULL;",
+                "  IF faltantes IS NOT NULL THEN",
+                "    RAISE EXCEPTION 'Movimientos con referencias desconocidas: %', faltantes;",
+                "  END IF;",
+                "END",
+                "$$;",
+                "\nINSERT INTO movimientos (fecha, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, proveedor_id, cantidad, nota)\nSELECT",
+                f"  TIMESTAMPTZ '{MOVEMENT_TIMESTAMP}',",
+                "  'ingreso',",
+                "  p.id,",
+                "  NULL,",
+                "  l.id,",
+                "  pe.id,",
+                "  pr.id,",
+                "  d.cantidad,",
+                "  d.nota",
+                "FROM movimiento_data d",
+                "LEFT JOIN productos p ON p.sku = d.sku",
+                "LEFT JOIN locaciones l ON l.nombre = d.locacion",
+                "LEFT JOIN personas pe ON pe.nombre = d.persona",
+                "LEFT JOIN proveedores pr ON pr.nombre = d.proveedor;",
             ]
         )
 
@@ -587,8 +719,30 @@ def process_sheet(
                 provider_set.add(supplier)
 
 
+def find_excel() -> Path:
+    # Se busca recien al ejecutar: el vocabulario del modulo se reutiliza sin el Excel (bench/)
+    candidates = sorted(BASE_DIR.glob("inventarios angel*.xlsx"))
+    if not candidates:
+        raise FileNotFoundError("No se encontró el Excel de inventarios Calameño.")
+    return candidates[0]
+
+
 def main() -> None:
-    workbook = pd.ExcelFile(EXCEL_PATH)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--load",
+        action="store_true",
+        help="Cargar directo en la base con COPY (sin triggers) en lugar de generar seeds_calamenio.sql",
+    )
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), help="Por defecto DATABASE_URL")
+    parser.add_argument("--replace", action="store_true", help="Con --load, reemplazar los datos existentes")
+    args = parser.parse_args()
+    if args.load and not args.database_url:
+        parser.error("--load requiere --database-url o DATABASE_URL")
+
+    import pandas as pd
+
+    workbook = pd.ExcelFile(find_excel())
     product_map: Dict[Tuple[str, str, str], Dict] = {}
     stock_entries: List[Dict] = []
     provider_set: set[str] = set()
@@ -607,6 +761,9 @@ def main() -> None:
         providers.append("Proveedores Varios Calameno")
 
     categories = sorted({prod["category"] for prod in products})
+    if args.load:
+        load_direct(build_copy_tables(products, stock_entries, providers, categories), args.database_url, args.replace)
+        return
     sql = build_sql(products, stock_entries, providers, categories)
     OUTPUT_PATH.write_text(sql, encoding="utf-8")
     print(f"Generados {len(products)} productos y {len(stock_entries)} movimientos en {OUTPUT_PATH}")
@@ -0,0 +1,4 @@
+-- Script de docker-entrypoint-initdb.d (ver docker-compose.yml). Carga el esquema
+-- desde /db, donde esta montado el directorio completo, para que su \ir
+-- encuentre db/funciones.sql.
+\i /db/schema.sql
@@ -0,0 +1,575 @@
+-- Funciones de la logica del inventario en PostgreSQL. Las incluyen (\ir)
+-- db/schema.sql y db/particionar_movimientos.sql, asi que solo contiene
+-- CREATE OR REPLACE FUNCTION: volver a correrlo actualiza las funciones de una
+-- base existente. Las tablas y los triggers quedan en db/schema.sql.
+--
+-- Como en pg_dump, sin validar los cuerpos: las funciones SQL se crean antes
+-- que las tablas que leen.
+SET check_function_bodies = off;
+
+-- Zona horaria del negocio para cortar los dias. La API la fija por conexion
+-- (settings.business_timezone); para otros clientes (psql, seeds) configurar
+-- ALTER DATABASE inventario SET inventario.zona_horaria = 'America/Santiago';
+CREATE OR REPLACE FUNCTION fn_zona_negocio() RETURNS TEXT AS $$
+  SELECT COALESCE(NULLIF(current_setting('inventario.zona_horaria', true), ''), 'UTC');
+$$ LANGUAGE sql STABLE;
+
+-- Crea la particion mensual de movimientos que contiene p_mes, si no existe.
+-- Los meses se cortan en la zona del negocio. Las filas de ese mes que hayan
+-- caido en movimientos_default se mueven a la nueva particion antes de
+-- adjuntarla. Devuelve TRUE si la creo.
+CREATE OR REPLACE FUNCTION fn_crear_particion_movimientos(p_mes DATE) RETURNS BOOLEAN AS $$
+DECLARE
+  zona TEXT := fn_zona_negocio();
+  mes DATE := date_trunc('month', p_mes)::date;
+  nombre TEXT := 'movimientos_' || to_char(mes, 'YYYYMM');
+  desde TIMESTAMPTZ := mes::timestamp AT TIME ZONE zona;
+  hasta TIMESTAMPTZ := (mes + INTERVAL '1 month')::timestamp AT TIME ZONE zona;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('particiones_movimientos'));
+  IF to_regclass(nombre) IS NOT NULL THEN
+    RETURN FALSE;
+  END IF;
+
+  -- Se arma fuera de la tabla y se adjunta. ATTACH toma SHARE UPDATE EXCLUSIVE
+  -- sobre movimientos (las demas particiones siguen leyendose y escribiendose),
+  -- pero ACCESS EXCLUSIVE sobre la particion nueva y sobre movimientos_default
+  -- hasta el commit, y recorre movimientos_default entera para comprobar que no
+  -- le queden filas del rango. El CHECK solo evita recorrer la particion nueva.
+  -- Con las particiones creadas de antemano movimientos_default esta vacia y el
+  -- bloqueo es breve; si acumulo filas, correrlo fuera de horario.
+  EXECUTE format('CREATE TABLE %I (LIKE movimientos INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', nombre);
+  EXECUTE format(
+    'ALTER TABLE %I ADD CONSTRAINT %I CHECK (fecha >= %L AND fecha < %L)',
+    nombre, nombre || '_rango', desde, hasta
+  );
+  EXECUTE format(
+    'WITH movidos AS (DELETE FROM movimientos_default WHERE fecha >= $1 AND fecha < $2 RETURNING *)
+     INSERT INTO %I SELECT * FROM movidos',
+    nombre
+  ) USING desde, hasta;
+  EXECUTE format('ALTER TABLE movimientos ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', nombre, desde, hasta);
+  EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', nombre, nombre || '_rango');
+  RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Asegura las particiones desde p_desde (por defecto, el mes mas antiguo que
+-- quede en movimientos_default o el mes actual) hasta p_meses_adelante meses
+-- despues del actual. Corre desde python -m app.db.particiones, programado una
+-- vez al mes (cron), y no desde la API: es DDL. Devuelve cuantas creo.
+CREATE OR REPLACE FUNCTION fn_crear_particiones_movimientos(
+  p_meses_adelante INTEGER DEFAULT 3,
+  p_desde DATE DEFAULT NULL
+) RETURNS INTEGER AS $$
+DECLARE
+  zona TEXT := fn_zona_negocio();
+  actual DATE := date_trunc('month', now() AT TIME ZONE zona)::date;
+  mes DATE;
+  creadas INTEGER := 0;
+BEGIN
+  mes := COALESCE(
+    date_trunc('month', p_desde)::date,
+    LEAST(actual, (SELECT date_trunc('month', MIN(fecha) AT TIME ZONE zona)::date FROM movimientos_default))
+  );
+  WHILE mes <= actual + make_interval(months => p_meses_adelante) LOOP
+    IF fn_crear_particion_movimientos(mes) THEN
+      creadas := creadas + 1;
+    END IF;
+    mes := (mes + INTERVAL '1 month')::date;
+  END LOOP;
+  RETURN creadas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Particiones que faltan entre el mes actual y p_meses_adelante meses despues.
+-- Solo consulta el catalogo; la API la usa al arrancar para avisar que hay que
+-- correr fn_crear_particiones_movimientos.
+CREATE OR REPLACE FUNCTION fn_particiones_movimientos_faltantes(p_meses_adelante INTEGER DEFAULT 3)
+RETURNS SETOF TEXT AS $$
+  SELECT 'movimientos_' || to_char(mes, 'YYYYMM')
+  FROM generate_series(
+    date_trunc('month', now() AT TIME ZONE fn_zona_negocio()),
+    date_trunc('month', now() AT TIME ZONE fn_zona_negocio()) + make_interval(months => p_meses_adelante),
+    INTERVAL '1 month'
+  ) AS mes
+  WHERE to_regclass('movimientos_' || to_char(mes, 'YYYYMM')) IS NULL
+  ORDER BY mes;
+$$ LANGUAGE sql STABLE;
+
+-- Desacopla la particion mensual que contiene p_mes para archivarla (pg_dump
+-- de la tabla y DROP). Antes registra un cierre en el limite superior de la
+-- particion, de modo que los saldos posteriores parten de ese cierre y no
+-- necesitan los movimientos archivados, y lo anota en movimientos_archivados
+-- (horizonte de archivo). Solo admite meses ya terminados y en orden: el mes
+-- debe ser el mas antiguo que quede en el kardex.
+CREATE OR REPLACE FUNCTION fn_desacoplar_particion_movimientos(p_mes DATE) RETURNS TEXT AS $$
+DECLARE
+  zona TEXT := fn_zona_negocio();
+  mes DATE := date_trunc('month', p_mes)::date;
+  nombre TEXT := 'movimientos_' || to_char(mes, 'YYYYMM');
+  desde TIMESTAMPTZ := mes::timestamp AT TIME ZONE zona;
+  hasta TIMESTAMPTZ := (mes + INTERVAL '1 month')::timestamp AT TIME ZONE zona;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('particiones_movimientos'));
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(nombre) AND inhparent = 'movimientos'::regclass
+  ) THEN
+    RAISE EXCEPTION 'No existe la particion % de movimientos', nombre
+      USING ERRCODE = 'undefined_table';
+  END IF;
+  IF hasta > now() THEN
+    RAISE EXCEPTION 'El mes % no termino; no se puede archivar', to_char(mes, 'YYYY-MM')
+      USING ERRCODE = 'check_violation';
+  END IF;
+  IF EXISTS (SELECT 1 FROM movimientos WHERE fecha < desde) THEN
+    RAISE EXCEPTION 'Hay movimientos anteriores a %; archivar primero los meses mas antiguos', to_char(mes, 'YYYY-MM')
+      USING ERRCODE = 'check_violation';
+  END IF;
+
+  IF NOT EXISTS (SELECT 1 FROM cierres WHERE fecha = hasta) THEN
+    PERFORM fn_crear_cierre(hasta, 'Archivo de ' || nombre);
+  END IF;
+
+  EXECUTE format('ALTER TABLE movimientos DETACH PARTITION %I', nombre);
+  INSERT INTO movimientos_archivados (particion, desde, hasta) VALUES (nombre, desde, hasta);
+  -- El mes archivado sale de los listados del kardex
+  UPDATE kardex_version SET version = version + 1;
+  RETURN nombre;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Aplica cada movimiento sobre stock_saldos antes de insertarlo y rechaza usos y
+-- traspasos que dejen stock negativo en la locacion origen. Valida y descuenta en
+-- el mismo paso (BEFORE ROW): en un INSERT multi-fila los triggers AFTER ROW
+-- recien corren al final de la sentencia, asi que una validacion separada de la
+-- actualizacion no veria el descuento de las filas anteriores del mismo lote.
+-- El upsert bloquea la fila de saldo hasta el commit, de modo que los retiros
+-- concurrentes de la misma locacion se serializan y cada uno valida contra el
+-- saldo ya descontado por el anterior. Las filas se actualizan en orden de
+-- locacion para que traspasos cruzados no se interbloqueen.
+CREATE OR REPLACE FUNCTION fn_actualizar_stock_saldos() RETURNS trigger AS $$
+DECLARE
+  efecto RECORD;
+  stock_nuevo NUMERIC(14,3);
+BEGIN
+  FOR efecto IN
+    SELECT e.locacion_id, e.cantidad, e.retiro
+    FROM (VALUES
+      (CASE WHEN NEW.tipo IN ('ingreso','traspaso','ajuste') THEN NEW.to_locacion_id END,
+       NEW.cantidad, FALSE),
+      (CASE WHEN NEW.tipo IN ('traspaso','uso','ajuste')
+                 AND NEW.from_locacion_id IS DISTINCT FROM NEW.to_locacion_id
+            THEN NEW.from_locacion_id END,
+       -NEW.cantidad, NEW.tipo IN ('uso','traspaso'))
+    ) AS e(locacion_id, cantidad, retiro)
+    WHERE e.locacion_id IS NOT NULL
+    ORDER BY e.locacion_id
+  LOOP
+    INSERT INTO stock_saldos AS s (producto_id, locacion_id, stock, last_movimiento_id, updated_at)
+    VALUES (NEW.producto_id, efecto.locacion_id, efecto.cantidad, NEW.id, now())
+    ON CONFLICT (producto_id, locacion_id) DO UPDATE
+      SET stock = s.stock + EXCLUDED.stock,
+          last_movimiento_id = GREATEST(s.last_movimiento_id, EXCLUDED.last_movimiento_id),
+          updated_at = EXCLUDED.updated_at
+    RETURNING s.stock INTO stock_nuevo;
+
+    IF efecto.retiro AND stock_nuevo < 0 THEN
+      RAISE EXCEPTION 'Stock insuficiente en locacion origen (%. Disponible: %, Intentado: %)',
+        NEW.from_locacion_id, stock_nuevo + NEW.cantidad, NEW.cantidad
+        USING ERRCODE = 'check_violation';
+    END IF;
+  END LOOP;
+
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Reconstruye stock_saldos (y mov_rollup_diario) desde el kardex. Bloquea nuevos movimientos mientras corre.
+CREATE OR REPLACE FUNCTION fn_reconstruir_stock_saldos() RETURNS INTEGER AS $$
+DECLARE
+  filas INTEGER;
+  v_cierre_id INTEGER;
+  v_desde TIMESTAMPTZ := '-infinity';
+BEGIN
+  LOCK TABLE movimientos IN SHARE MODE;
+  LOCK TABLE stock_saldos IN EXCLUSIVE MODE;
+
+  DELETE FROM stock_saldos;
+  -- Las fotos diarias tambien derivan del kardex; se regeneran bajo demanda
+  DELETE FROM stock_diario;
+  -- Los agregados diarios del dashboard tambien
+  PERFORM fn_reconstruir_mov_rollup();
+
+  -- Parte del ultimo cierre: los meses archivados (particiones desacopladas)
+  -- ya no estan en el kardex, pero si en los saldos congelados del cierre
+  SELECT c.id, c.fecha INTO v_cierre_id, v_desde
+  FROM cierres c
+  ORDER BY c.fecha DESC
+  LIMIT 1;
+
+  INSERT INTO stock_saldos (producto_id, locacion_id, stock, last_movimiento_id, updated_at)
+  SELECT
+    b.producto_id,
+    b.locacion_id,
+    SUM(b.cantidad),
+    MAX(b.movimiento_id),
+    now()
+  FROM (
+    SELECT cs.producto_id, cs.locacion_id, cs.stock AS cantidad, NULL::BIGINT AS movimiento_id
+    FROM cierres_saldos cs
+    WHERE cs.cierre_id = v_cierre_id
+    UNION ALL
+    SELECT v.producto_id, v.locacion_id, v.cantidad, v.movimiento_id
+    FROM vista_movimientos_locacion v
+    WHERE v.fecha >= COALESCE(v_desde, '-infinity')
+  ) b
+  GROUP BY b.producto_id, b.locacion_id;
+
+  GET DIAGNOSTICS filas = ROW_COUNT;
+  RETURN filas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Cierra los dias pendientes hasta p_hasta (como maximo ayer) y devuelve el ultimo
+-- dia cerrado. Cada dia parte de la foto del dia anterior y suma solo sus movimientos.
+CREATE OR REPLACE FUNCTION fn_cerrar_stock_diario(p_hasta DATE) RETURNS DATE AS $$
+DECLARE
+  zona TEXT := fn_zona_negocio();
+  limite DATE := LEAST(p_hasta, (now() AT TIME ZONE zona)::date - 1);
+  dia DATE;
+  primero BOOLEAN := FALSE;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('stock_diario'));
+
+  SELECT MAX(fecha) + 1 INTO dia FROM stock_diario;
+  IF dia IS NULL THEN
+    -- Sin fotos, el saldo de apertura sale de fn_saldos_antes_de (cierre mas
+    -- cercano + kardex), que cubre tambien los meses ya archivados
+    SELECT (MIN(fecha) AT TIME ZONE zona)::date INTO dia FROM movimientos;
+    primero := TRUE;
+  END IF;
+  IF dia IS NULL THEN
+    RETURN limite;
+  END IF;
+
+  WHILE dia <= limite LOOP
+    INSERT INTO stock_diario (fecha, producto_id, locacion_id, ingresos, egresos, neto, stock_end)
+    SELECT
+      dia,
+      COALESCE(a.producto_id, d.producto_id),
+      COALESCE(a.locacion_id, d.locacion_id),
+      COALESCE(d.ingresos, 0),
+      COALESCE(d.egresos, 0),
+      COALESCE(d.neto, 0),
+      COALESCE(a.stock_end, 0) + COALESCE(d.neto, 0)
+    FROM (
+      SELECT producto_id, locacion_id, stock_end
+      FROM stock_diario
+      WHERE fecha = dia - 1
+        AND stock_end <> 0
+        AND NOT primero
+      UNION ALL
+      SELECT s.producto_id, s.locacion_id, s.stock
+      FROM fn_saldos_antes_de(dia::timestamp AT TIME ZONE zona) s
+      WHERE primero
+        AND s.stock <> 0
+    ) a
+    FULL JOIN (
+      SELECT
+        v.producto_id,
+        v.locacion_id,
+        SUM(GREATEST(v.cantidad, 0)) AS ingresos,
+        SUM(GREATEST(-v.cantidad, 0)) AS egresos,
+        SUM(v.cantidad) AS neto
+      FROM vista_movimientos_locacion v
+      WHERE v.fecha >= (dia::timestamp AT TIME ZONE zona)
+        AND v.fecha < ((dia + 1)::timestamp AT TIME ZONE zona)
+      GROUP BY v.producto_id, v.locacion_id
+    ) d
+      ON d.producto_id = a.producto_id
+     AND d.locacion_id = a.locacion_id
+    ON CONFLICT (fecha, producto_id, locacion_id) DO NOTHING;
+
+    dia := dia + 1;
+    primero := FALSE;
+  END LOOP;
+
+  RETURN limite;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un movimiento con fecha de un dia ya cerrado invalida las fotos desde ese dia.
+-- Toma el mismo advisory lock que fn_cerrar_stock_diario: si un cierre esta en
+-- curso, el DELETE espera su commit y borra tambien las fotos que escribio (sin
+-- el lock no las veria y quedarian fotos viejas que nada vuelve a invalidar);
+-- si el cierre llega despues, espera este commit y ya ve el movimiento. Los
+-- movimientos retroactivos se serializan entre si; los del dia no lo toman.
+CREATE OR REPLACE FUNCTION fn_invalidar_stock_diario() RETURNS trigger AS $$
+DECLARE
+  zona TEXT := fn_zona_negocio();
+BEGIN
+  IF NEW.fecha < (date_trunc('day', now() AT TIME ZONE zona) AT TIME ZONE zona) THEN
+    PERFORM pg_advisory_xact_lock(hashtext('stock_diario'));
+    DELETE FROM stock_diario WHERE fecha >= (NEW.fecha AT TIME ZONE zona)::date;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_actualizar_mov_rollup() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO mov_rollup_diario AS r (
+    dia, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, proveedor_id, cantidad_sum, count
+  )
+  VALUES (
+    (NEW.fecha AT TIME ZONE fn_zona_negocio())::date, NEW.tipo, NEW.producto_id,
+    NEW.from_locacion_id, NEW.to_locacion_id, NEW.persona_id, NEW.proveedor_id, NEW.cantidad, 1
+  )
+  ON CONFLICT ON CONSTRAINT uq_mov_rollup_diario DO UPDATE
+    SET cantidad_sum = r.cantidad_sum + EXCLUDED.cantidad_sum,
+        count = r.count + 1;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Movimientos del kardex agregados con la misma clave que mov_rollup_diario,
+-- para los dias [p_desde, p_hasta] (NULL = sin limite)
+CREATE OR REPLACE FUNCTION fn_mov_rollup_kardex(p_desde DATE DEFAULT NULL, p_hasta DATE DEFAULT NULL)
+RETURNS TABLE (
+  dia DATE,
+  tipo tipo_movimiento,
+  producto_id INTEGER,
+  from_locacion_id INTEGER,
+  to_locacion_id INTEGER,
+  persona_id INTEGER,
+  proveedor_id INTEGER,
+  cantidad_sum NUMERIC,
+  count INTEGER
+) AS $$
+  SELECT
+    (m.fecha AT TIME ZONE fn_zona_negocio())::date,
+    m.tipo, m.producto_id, m.from_locacion_id, m.to_locacion_id, m.persona_id, m.proveedor_id,
+    SUM(m.cantidad),
+    COUNT(*)::integer
+  FROM movimientos m
+  WHERE (p_desde IS NULL OR m.fecha >= (p_desde::timestamp AT TIME ZONE fn_zona_negocio()))
+    AND (p_hasta IS NULL OR m.fecha < ((p_hasta + 1)::timestamp AT TIME ZONE fn_zona_negocio()))
+  GROUP BY 1, 2, 3, 4, 5, 6, 7;
+$$ LANGUAGE sql STABLE;
+
+-- Reconstruye mov_rollup_diario desde p_desde (NULL = completa). Sirve para
+-- ponerse al dia tras cargas con los triggers desactivados o un cambio de zona
+-- horaria. Bloquea nuevos movimientos mientras corre.
+CREATE OR REPLACE FUNCTION fn_reconstruir_mov_rollup(p_desde DATE DEFAULT NULL) RETURNS INTEGER AS $$
+DECLARE
+  filas INTEGER;
+  desde DATE := p_desde;
+BEGIN
+  LOCK TABLE movimientos IN SHARE MODE;
+  LOCK TABLE mov_rollup_diario IN EXCLUSIVE MODE;
+
+  -- Completa: desde el horizonte de archivo (conservando los dias de meses
+  -- archivados, aun con el kardex vacio) o, sin archivos, el primer dia del kardex
+  IF desde IS NULL THEN
+    desde := COALESCE(
+      (SELECT (MAX(a.hasta) AT TIME ZONE fn_zona_negocio())::date FROM movimientos_archivados a),
+      (SELECT (MIN(m.fecha) AT TIME ZONE fn_zona_negocio())::date FROM movimientos m)
+    );
+  END IF;
+  DELETE FROM mov_rollup_diario WHERE desde IS NULL OR dia >= desde;
+
+  INSERT INTO mov_rollup_diario (
+    dia, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, proveedor_id, cantidad_sum, count
+  )
+  SELECT * FROM fn_mov_rollup_kardex(desde, NULL);
+
+  GET DIAGNOSTICS filas = ROW_COUNT;
+  RETURN filas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Diferencias entre mov_rollup_diario y el kardex en [p_desde, p_hasta]; vacia si estan al dia.
+-- Sin p_desde compara desde el horizonte de archivo o el primer dia del kardex
+-- (los meses archivados solo quedan en el rollup).
+CREATE OR REPLACE FUNCTION fn_verificar_mov_rollup(p_desde DATE DEFAULT NULL, p_hasta DATE DEFAULT NULL)
+RETURNS TABLE (
+  dia DATE,
+  tipo tipo_movimiento,
+  producto_id INTEGER,
+  from_locacion_id INTEGER,
+  to_locacion_id INTEGER,
+  persona_id INTEGER,
+  proveedor_id INTEGER,
+  cantidad_rollup NUMERIC,
+  cantidad_kardex NUMERIC,
+  count_rollup INTEGER,
+  count_kardex INTEGER
+) AS $$
+  SELECT
+    COALESCE(r.dia, k.dia),
+    COALESCE(r.tipo, k.tipo),
+    COALESCE(r.producto_id, k.producto_id),
+    COALESCE(r.from_locacion_id, k.from_locacion_id),
+    COALESCE(r.to_locacion_id, k.to_locacion_id),
+    COALESCE(r.persona_id, k.persona_id),
+    COALESCE(r.proveedor_id, k.proveedor_id),
+    r.cantidad_sum,
+    k.cantidad_sum,
+    r.count,
+    k.count
+  FROM (
+    SELECT *
+    FROM mov_rollup_diario
+    WHERE mov_rollup_diario.dia >= COALESCE(
+        p_desde,
+        (SELECT (MAX(a.hasta) AT TIME ZONE fn_zona_negocio())::date FROM movimientos_archivados a),
+        (SELECT (MIN(m.fecha) AT TIME ZONE fn_zona_negocio())::date FROM movimientos m)
+      )
+      AND (p_hasta IS NULL OR mov_rollup_diario.dia <= p_hasta)
+  ) r
+  FULL JOIN fn_mov_rollup_kardex(p_desde, p_hasta) k
+    ON k.dia = r.dia
+   AND k.tipo = r.tipo
+   AND k.producto_id = r.producto_id
+   AND k.from_locacion_id IS NOT DISTINCT FROM r.from_locacion_id
+   AND k.to_locacion_id IS NOT DISTINCT FROM r.to_locacion_id
+   AND k.persona_id IS NOT DISTINCT FROM r.persona_id
+   AND k.proveedor_id IS NOT DISTINCT FROM r.proveedor_id
+  WHERE r.cantidad_sum IS DISTINCT FROM k.cantidad_sum
+     OR r.count IS DISTINCT FROM k.count
+  ORDER BY 1, 2, 3;
+$$ LANGUAGE sql STABLE;
+
+-- Saldo por producto y locacion de los movimientos con fecha < p_antes_de.
+-- Parte del punto de control mas cercano (cierre o foto diaria) y suma solo
+-- los movimientos posteriores a el. Antes del horizonte de archivo faltan
+-- movimientos y el saldo saldria incompleto: se rechaza con SQLSTATE 22A01
+-- (propio, de la clase data_exception), que la API responde como 410.
+CREATE OR REPLACE FUNCTION fn_saldos_antes_de(
+  p_antes_de TIMESTAMPTZ,
+  p_producto_id INTEGER DEFAULT NULL,
+  p_locacion_id INTEGER DEFAULT NULL
+) RETURNS TABLE (producto_id INTEGER, locacion_id INTEGER, stock NUMERIC(14,3)) AS $$
+DECLARE
+  v_cierre_id INTEGER;
+  v_cierre_fecha TIMESTAMPTZ;
+  v_foto_dia DATE;
+  v_desde TIMESTAMPTZ := '-infinity';
+  v_zona TEXT := fn_zona_negocio();
+  v_horizonte TIMESTAMPTZ := (SELECT MAX(a.hasta) FROM movimientos_archivados a);
+BEGIN
+  IF p_antes_de < v_horizonte THEN
+    RAISE EXCEPTION 'Los movimientos anteriores a % estan archivados; no se puede calcular el saldo a %',
+      v_horizonte, p_antes_de
+      USING ERRCODE = '22A01';
+  END IF;
+
+  SELECT c.id, c.fecha INTO v_cierre_id, v_cierre_fecha
+  FROM cierres c
+  WHERE c.fecha <= p_antes_de
+  ORDER BY c.fecha DESC
+  LIMIT 1;
+
+  SELECT MAX(d.fecha) INTO v_foto_dia
+  FROM stock_diario d
+  WHERE d.fecha < (p_antes_de AT TIME ZONE v_zona)::date;
+
+  IF v_cierre_id IS NOT NULL
+     AND (v_foto_dia IS NULL OR v_cierre_fecha >= ((v_foto_dia + 1)::timestamp AT TIME ZONE v_zona)) THEN
+    v_desde := v_cierre_fecha;
+    v_foto_dia := NULL;
+  ELSIF v_foto_dia IS NOT NULL THEN
+    v_desde := (v_foto_dia + 1)::timestamp AT TIME ZONE v_zona;
+    v_cierre_id := NULL;
+  END IF;
+
+  -- SQL dinamico: se planifica con los valores reales, asi los filtros opcionales
+  -- llegan a cada rama y usan idx_movimientos_producto_fecha / idx_movimientos_fecha
+  RETURN QUERY EXECUTE '
+    SELECT b.producto_id, b.locacion_id, SUM(b.cantidad)::NUMERIC(14,3)
+    FROM (
+      SELECT cs.producto_id, cs.locacion_id, cs.stock AS cantidad
+      FROM cierres_saldos cs
+      WHERE cs.cierre_id = $1
+      UNION ALL
+      SELECT d.producto_id, d.locacion_id, d.stock_end
+      FROM stock_diario d
+      WHERE d.fecha = $2
+      UNION ALL
+      SELECT v.producto_id, v.locacion_id, v.cantidad
+      FROM vista_movimientos_locacion v
+      WHERE v.fecha >= $3
+        AND v.fecha < $4
+    ) b
+    WHERE ($5::INTEGER IS NULL OR b.producto_id = $5)
+      AND ($6::INTEGER IS NULL OR b.locacion_id = $6)
+    GROUP BY b.producto_id, b.locacion_id'
+  USING v_cierre_id, v_foto_dia, v_desde, p_antes_de, p_producto_id, p_locacion_id;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Registra un cierre en p_fecha. Bloquea los inserts de movimientos mientras
+-- calcula para que ninguna transaccion en curso quede fuera del cierre.
+CREATE OR REPLACE FUNCTION fn_crear_cierre(p_fecha TIMESTAMPTZ, p_nota TEXT DEFAULT NULL) RETURNS INTEGER AS $$
+DECLARE
+  nuevo_id INTEGER;
+BEGIN
+  IF p_fecha > now() THEN
+    RAISE EXCEPTION 'No se puede cerrar un periodo futuro (%)', p_fecha
+      USING ERRCODE = 'check_violation';
+  END IF;
+
+  LOCK TABLE movimientos IN SHARE MODE;
+
+  -- Una sola sentencia: fn_saldos_antes_de (STABLE) no ve el cierre que se
+  -- esta insertando y parte del anterior
+  WITH nuevo AS (
+    INSERT INTO cierres (fecha, nota) VALUES (p_fecha, p_nota) RETURNING id
+  ), saldos AS (
+    INSERT INTO cierres_saldos (cierre_id, producto_id, locacion_id, stock)
+    SELECT nuevo.id, s.producto_id, s.locacion_id, s.stock
+    FROM nuevo, fn_saldos_antes_de(p_fecha) s
+    WHERE s.stock <> 0
+  )
+  SELECT id INTO nuevo_id FROM nuevo;
+
+  RETURN nuevo_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un periodo cerrado no admite movimientos nuevos con fecha anterior al cierre
+CREATE OR REPLACE FUNCTION fn_validar_periodo_cerrado() RETURNS trigger AS $$
+DECLARE
+  ultimo_cierre TIMESTAMPTZ;
+BEGIN
+  SELECT MAX(c.fecha) INTO ultimo_cierre FROM cierres c;
+  IF ultimo_cierre IS NOT NULL AND NEW.fecha < ultimo_cierre THEN
+    RAISE EXCEPTION 'Periodo cerrado: el ultimo cierre es %, movimiento con fecha %',
+      ultimo_cierre, NEW.fecha
+      USING ERRCODE = 'check_violation';
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_incrementar_catalogo_version() RETURNS trigger AS $$
+BEGIN
+  UPDATE catalogo_version SET version = version + 1;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger diferido por fila (ver kardex_version en db/schema.sql): solo la
+-- primera fila de cada transaccion incrementa la version.
+CREATE OR REPLACE FUNCTION fn_incrementar_kardex_version() RETURNS trigger AS $$
+BEGIN
+  IF current_setting('inventario.kardex_version_xid', true) IS DISTINCT FROM pg_current_xact_id()::text THEN
+    PERFORM set_config('inventario.kardex_version_xid', pg_current_xact_id()::text, true);
+    UPDATE kardex_version SET version = version + 1;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+RESET check_function_bodies;
@@ -0,0 +1,189 @@
+-- Migra una base existente (movimientos sin particionar) a la tabla
+-- particionada por mes de db/schema.sql. Bloquea el kardex mientras copia,
+-- asi que debe correr en una ventana de mantenimiento:
+--
+--   ALTER DATABASE inventario SET inventario.zona_horaria = '...';  -- si aun no esta
+--   psql postgresql://... -v ON_ERROR_STOP=1 -f db/particionar_movimientos.sql
+--
+-- Incluye db/funciones.sql (\ir), asi que se corre desde el repositorio o con
+-- ese archivo junto a este.
+--
+-- Los meses de las particiones se cortan con inventario.zona_horaria. La tabla
+-- original queda como movimientos_sin_particionar para verificarla; despues:
+--   DROP TABLE movimientos_sin_particionar;
+-- stock_saldos, stock_diario, mov_rollup_diario y los cierres no cambian: los
+-- movimientos se copian con los mismos ids y fechas.
+-- Supone el esquema anterior completo, incluido mov_rollup_diario (ver README).
+
+BEGIN;
+
+LOCK TABLE movimientos IN ACCESS EXCLUSIVE MODE;
+
+-- 1. Tablas nuevas y funciones: las de db/funciones.sql, las mismas que incluye
+--    db/schema.sql
+
+CREATE TABLE IF NOT EXISTS kardex_version (
+  id       BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  version  BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO kardex_version DEFAULT VALUES ON CONFLICT DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS movimientos_archivados (
+  particion     TEXT PRIMARY KEY,
+  desde         TIMESTAMPTZ NOT NULL,
+  hasta         TIMESTAMPTZ NOT NULL,
+  archivado_en  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+\ir funciones.sql
+
+-- 2. La tabla original se aparta con sus indices; sus triggers se quitan
+
+ALTER TABLE movimientos RENAME TO movimientos_sin_particionar;
+ALTER TABLE movimientos_sin_particionar RENAME CONSTRAINT movimientos_pkey TO movimientos_sin_particionar_pkey;
+ALTER TABLE movimientos_sin_particionar ALTER COLUMN id DROP DEFAULT;
+ALTER INDEX IF EXISTS idx_movimientos_producto_fecha RENAME TO idx_movimientos_sin_particionar_producto_fecha;
+ALTER INDEX IF EXISTS idx_movimientos_fecha RENAME TO idx_movimientos_sin_particionar_fecha;
+ALTER INDEX IF EXISTS idx_movimientos_from RENAME TO idx_movimientos_sin_particionar_from;
+ALTER INDEX IF EXISTS idx_movimientos_to RENAME TO idx_movimientos_sin_particionar_to;
+ALTER INDEX IF EXISTS idx_movimientos_persona RENAME TO idx_movimientos_sin_particionar_persona;
+ALTER INDEX IF EXISTS idx_movimientos_proveedor RENAME TO idx_movimientos_sin_particionar_proveedor;
+DROP TRIGGER IF EXISTS tg_evitar_stock_negativo ON movimientos_sin_particionar;
+DROP TRIGGER IF EXISTS tg_actualizar_stock_saldos ON movimientos_sin_particionar;
+DROP TRIGGER IF EXISTS tg_invalidar_stock_diario ON movimientos_sin_particionar;
+DROP TRIGGER IF EXISTS tg_actualizar_mov_rollup ON movimientos_sin_particionar;
+DROP TRIGGER IF EXISTS tg_validar_periodo_cerrado ON movimientos_sin_particionar;
+
+-- 3. Tabla particionada (misma definicion que db/schema.sql), con la secuencia existente
+
+CREATE TABLE movimientos (
+  id                 BIGINT NOT NULL DEFAULT nextval('movimientos_id_seq'),
+  fecha              TIMESTAMPTZ NOT NULL DEFAULT now(),
+  tipo               tipo_movimiento NOT NULL,
+  producto_id        INTEGER NOT NULL REFERENCES productos(id),
+  from_locacion_id   INTEGER REFERENCES locaciones(id),
+  to_locacion_id     INTEGER REFERENCES locaciones(id),
+  persona_id         INTEGER REFERENCES personas(id),
+  proveedor_id       INTEGER REFERENCES proveedores(id),
+  cantidad           NUMERIC(14,3) NOT NULL CHECK (cantidad > 0),
+  nota               TEXT,
+  PRIMARY KEY (id, fecha)
+) PARTITION BY RANGE (fecha);
+
+-- Recibe las fechas sin particion mensual; fn_crear_particiones_movimientos
+-- mueve sus filas a la particion del mes cuando la crea
+CREATE TABLE movimientos_default PARTITION OF movimientos DEFAULT;
+
+ALTER SEQUENCE movimientos_id_seq OWNED BY movimientos.id;
+
+ALTER TABLE movimientos ADD CONSTRAINT chk_mov_ingreso
+  CHECK (
+    (tipo <> 'ingreso')
+    OR (from_locacion_id IS NULL AND to_locacion_id IS NOT NULL)
+  );
+
+ALTER TABLE movimientos ADD CONSTRAINT chk_mov_traspaso
+  CHECK (
+    (tipo <> 'traspaso')
+    OR (from_locacion_id IS NOT NULL AND to_locacion_id IS NOT NULL AND from_locacion_id <> to_locacion_id)
+  );
+
+ALTER TABLE movimientos ADD CONSTRAINT chk_mov_uso
+  CHECK (
+    (tipo <> 'uso')
+    OR (
+      from_locacion_id IS NOT NULL
+      AND (to_locacion_id IS NULL OR to_locacion_id <> from_locacion_id)
+    )
+  );
+
+-- 4. Particiones de todos los meses con movimientos y copia (sin triggers todavia:
+--    los saldos y agregados derivados ya reflejan estos movimientos)
+
+SELECT fn_crear_particiones_movimientos(
+  p_desde => (SELECT (MIN(fecha) AT TIME ZONE fn_zona_negocio())::date FROM movimientos_sin_particionar)
+);
+
+INSERT INTO movimientos (
+  id, fecha, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, proveedor_id, cantidad, nota
+)
+SELECT id, fecha, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, proveedor_id, cantidad, nota
+FROM movimientos_sin_particionar;
+
+DO $$
+BEGIN
+  IF (SELECT COUNT(*) FROM movimientos) <> (SELECT COUNT(*) FROM movimientos_sin_particionar) THEN
+    RAISE EXCEPTION 'La copia de movimientos no coincide con la tabla original';
+  END IF;
+END;
+$$;
+
+-- 5. Indices, triggers y vista sobre la tabla nueva
+
+CREATE INDEX idx_movimientos_producto_fecha ON movimientos (producto_id, fecha, id);
+CREATE INDEX idx_movimientos_fecha ON movimientos (fecha, id);
+CREATE INDEX idx_movimientos_from ON movimientos (from_locacion_id);
+CREATE INDEX idx_movimientos_to   ON movimientos (to_locacion_id);
+CREATE INDEX idx_movimientos_persona ON movimientos (persona_id);
+CREATE INDEX idx_movimientos_proveedor ON movimientos (proveedor_id);
+
+DROP FUNCTION IF EXISTS fn_evitar_stock_negativo();
+
+CREATE TRIGGER tg_actualizar_stock_saldos
+BEFORE INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_actualizar_stock_saldos();
+
+CREATE TRIGGER tg_invalidar_stock_diario
+AFTER INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_invalidar_stock_diario();
+
+CREATE TRIGGER tg_actualizar_mov_rollup
+AFTER INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_actualizar_mov_rollup();
+
+CREATE TRIGGER tg_validar_periodo_cerrado
+BEFORE INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_validar_periodo_cerrado();
+
+CREATE CONSTRAINT TRIGGER tg_kardex_version_movimientos
+AFTER INSERT OR UPDATE OR DELETE ON movimientos
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE FUNCTION fn_incrementar_kardex_version();
+
+CREATE TRIGGER tg_kardex_version_movimientos_truncate
+AFTER TRUNCATE ON movimientos
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_kardex_version();
+
+-- La tabla nueva cambia de identidad para caches y ETags
+UPDATE kardex_version SET version = version + 1;
+
+CREATE OR REPLACE VIEW vista_movimientos_locacion AS
+SELECT
+  m.id              AS movimiento_id,
+  m.fecha           AS fecha,
+  m.producto_id     AS producto_id,
+  m.to_locacion_id  AS locacion_id,
+  m.cantidad        AS cantidad
+FROM movimientos m
+WHERE m.tipo IN ('ingreso','traspaso','ajuste')
+  AND m.to_locacion_id IS NOT NULL
+UNION ALL
+SELECT
+  m.id,
+  m.fecha,
+  m.producto_id,
+  m.from_locacion_id,
+  -m.cantidad
+FROM movimientos m
+WHERE m.tipo IN ('traspaso','uso','ajuste')
+  AND m.from_locacion_id IS NOT NULL
+  AND m.from_locacion_id IS DISTINCT FROM m.to_locacion_id;
+
+ANALYZE movimientos;
+
+COMMIT;
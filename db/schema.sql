@@ -1,6 +1,9 @@
 -- Tipos
 CREATE TYPE tipo_movimiento AS ENUM ('ingreso', 'traspaso', 'uso', 'ajuste');
 
+-- Funciones y funciones de trigger, compartidas con db/particionar_movimientos.sql
+\ir funciones.sql
+
 -- Unidades de medida
 CREATE TABLE uoms (
   id            SERIAL PRIMARY KEY,
@@ -54,9 +57,11 @@ CREATE TABLE personas (
   activa  BOOLEAN NOT NULL DEFAULT TRUE
 );
 
--- Movimientos de inventario (Kardex simplificado)
+-- Movimientos de inventario (Kardex simplificado). Particionada por mes de
+-- fecha (ver fn_crear_particiones_movimientos): la clave primaria incluye la
+-- columna de particion; los ids siguen saliendo de una unica secuencia.
 CREATE TABLE movimientos (
-  id                 BIGSERIAL PRIMARY KEY,
+  id                 BIGSERIAL,
   fecha              TIMESTAMPTZ NOT NULL DEFAULT now(),
   tipo               tipo_movimiento NOT NULL,
   producto_id        INTEGER NOT NULL REFERENCES productos(id),
@@ -65,8 +70,13 @@ CREATE TABLE movimientos (
   persona_id         INTEGER REFERENCES personas(id),
   proveedor_id       INTEGER REFERENCES proveedores(id),
   cantidad           NUMERIC(14,3) NOT NULL CHECK (cantidad > 0),
-  nota               TEXT
-);
+  nota               TEXT,
+  PRIMARY KEY (id, fecha)
+) PARTITION BY RANGE (fecha);
+
+-- Recibe las fechas sin particion mensual; fn_crear_particiones_movimientos
+-- mueve sus filas a la particion del mes cuando la crea
+CREATE TABLE movimientos_default PARTITION OF movimientos DEFAULT;
 
 ALTER TABLE movimientos ADD CONSTRAINT chk_mov_ingreso
   CHECK (
@@ -89,51 +99,208 @@ ALTER TABLE movimientos ADD CONSTRAINT chk_mov_uso
     )
   );
 
-CREATE INDEX idx_movimientos_producto_fecha ON movimientos (producto_id, fecha);
+-- (fecha, id) es la clave de paginacion por cursor del kardex
+CREATE INDEX idx_movimientos_producto_fecha ON movimientos (producto_id, fecha, id);
+CREATE INDEX idx_movimientos_fecha ON movimientos (fecha, id);
 CREATE INDEX idx_movimientos_from ON movimientos (from_locacion_id);
 CREATE INDEX idx_movimientos_to   ON movimientos (to_locacion_id);
 CREATE INDEX idx_movimientos_persona ON movimientos (persona_id);
 CREATE INDEX idx_movimientos_proveedor ON movimientos (proveedor_id);
 CREATE INDEX idx_productos_uom ON productos (uom_id);
 
+-- Saldo vigente por producto y locacion, mantenido por tg_actualizar_stock_saldos
+-- en la misma transaccion que cada movimiento. El kardex sigue siendo la fuente
+-- de verdad: fn_reconstruir_stock_saldos() lo vuelve a derivar desde el ultimo
+-- cierre y los movimientos posteriores.
+CREATE TABLE stock_saldos (
+  producto_id         INTEGER NOT NULL REFERENCES productos(id),
+  locacion_id         INTEGER NOT NULL REFERENCES locaciones(id),
+  stock               NUMERIC(14,3) NOT NULL DEFAULT 0,
+  last_movimiento_id  BIGINT,
+  updated_at          TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (producto_id, locacion_id)
+);
+
+CREATE INDEX idx_stock_saldos_locacion ON stock_saldos (locacion_id);
+
+-- Efecto de cada movimiento sobre el stock de una locacion (positivo entra, negativo sale)
+CREATE VIEW vista_movimientos_locacion AS
+SELECT
+  m.id              AS movimiento_id,
+  m.fecha           AS fecha,
+  m.producto_id     AS producto_id,
+  m.to_locacion_id  AS locacion_id,
+  m.cantidad        AS cantidad
+FROM movimientos m
+WHERE m.tipo IN ('ingreso','traspaso','ajuste')
+  AND m.to_locacion_id IS NOT NULL
+UNION ALL
+SELECT
+  m.id,
+  m.fecha,
+  m.producto_id,
+  m.from_locacion_id,
+  -m.cantidad
+FROM movimientos m
+WHERE m.tipo IN ('traspaso','uso','ajuste')
+  AND m.from_locacion_id IS NOT NULL
+  AND m.from_locacion_id IS DISTINCT FROM m.to_locacion_id;
+
+-- Foto diaria por producto y locacion (dias ya cerrados). Solo guarda pares con
+-- movimientos en el dia o stock distinto de cero; un par ausente tiene stock 0.
+CREATE TABLE stock_diario (
+  fecha        DATE NOT NULL,
+  producto_id  INTEGER NOT NULL REFERENCES productos(id),
+  locacion_id  INTEGER NOT NULL REFERENCES locaciones(id),
+  ingresos     NUMERIC(14,3) NOT NULL DEFAULT 0,
+  egresos      NUMERIC(14,3) NOT NULL DEFAULT 0,
+  neto         NUMERIC(14,3) NOT NULL DEFAULT 0,
+  stock_end    NUMERIC(14,3) NOT NULL DEFAULT 0,
+  PRIMARY KEY (fecha, producto_id, locacion_id)
+);
+
+CREATE INDEX idx_stock_diario_producto ON stock_diario (producto_id, fecha);
+
+-- Cierres de inventario: congelan el saldo por producto y locacion de todo
+-- movimiento con fecha anterior a cierres.fecha. Sirven de punto de partida
+-- para los calculos historicos, que solo suman movimientos posteriores.
+CREATE TABLE cierres (
+  id         SERIAL PRIMARY KEY,
+  fecha      TIMESTAMPTZ NOT NULL UNIQUE,
+  nota       TEXT,
+  creado_en  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE cierres_saldos (
+  cierre_id    INTEGER NOT NULL REFERENCES cierres(id) ON DELETE CASCADE,
+  producto_id  INTEGER NOT NULL REFERENCES productos(id),
+  locacion_id  INTEGER NOT NULL REFERENCES locaciones(id),
+  stock        NUMERIC(14,3) NOT NULL,
+  PRIMARY KEY (cierre_id, producto_id, locacion_id)
+);
+
+-- Meses desacoplados del kardex (fn_desacoplar_particion_movimientos). El
+-- mayor "hasta" es el horizonte de archivo: antes de el no quedan movimientos
+-- y fn_saldos_antes_de rechaza los calculos.
+CREATE TABLE movimientos_archivados (
+  particion     TEXT PRIMARY KEY,
+  desde         TIMESTAMPTZ NOT NULL,
+  hasta         TIMESTAMPTZ NOT NULL,
+  archivado_en  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
 CREATE VIEW vista_stock_actual AS
 SELECT
   p.id  AS producto_id,
   l.id  AS locacion_id,
-  COALESCE(SUM(
-    CASE
-      WHEN m.tipo IN ('ingreso','traspaso','ajuste') AND m.to_locacion_id = l.id THEN m.cantidad
-      WHEN m.tipo IN ('traspaso','uso','ajuste') AND m.from_locacion_id = l.id THEN -m.cantidad
-      ELSE 0
-    END
-  ), 0)::NUMERIC(14,3) AS stock
+  COALESCE(s.stock, 0)::NUMERIC(14,3) AS stock
 FROM productos p
 CROSS JOIN locaciones l
-LEFT JOIN movimientos m
-  ON m.producto_id = p.id
-GROUP BY p.id, l.id;
-
-CREATE OR REPLACE FUNCTION fn_evitar_stock_negativo() RETURNS trigger AS $$
-DECLARE
-  stock_actual NUMERIC(14,3);
-BEGIN
-  IF (NEW.tipo IN ('uso','traspaso')) AND NEW.from_locacion_id IS NOT NULL THEN
-    SELECT COALESCE(v.stock,0) INTO stock_actual
-    FROM vista_stock_actual v
-    WHERE v.producto_id = NEW.producto_id
-      AND v.locacion_id = NEW.from_locacion_id;
-
-    IF stock_actual < NEW.cantidad THEN
-      RAISE EXCEPTION 'Stock insuficiente en locacion origen (%. Disponible: %, Intentado: %)',
-        NEW.from_locacion_id, stock_actual, NEW.cantidad;
-    END IF;
-  END IF;
-
-  RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
-
-CREATE TRIGGER tg_evitar_stock_negativo
+LEFT JOIN stock_saldos s
+  ON s.producto_id = p.id
+ AND s.locacion_id = l.id;
+
+CREATE TRIGGER tg_actualizar_stock_saldos
+BEFORE INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_actualizar_stock_saldos();
+
+CREATE TRIGGER tg_invalidar_stock_diario
+AFTER INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_invalidar_stock_diario();
+
+-- Movimientos agregados por dia (zona del negocio) y combinacion de claves. Los
+-- reportes del dashboard sobre ventanas largas leen estas filas en lugar del
+-- kardex. Se mantiene con tg_actualizar_mov_rollup en la misma transaccion que
+-- cada movimiento; fn_reconstruir_mov_rollup() la vuelve a derivar del kardex.
+CREATE TABLE mov_rollup_diario (
+  dia               DATE NOT NULL,
+  tipo              tipo_movimiento NOT NULL,
+  producto_id       INTEGER NOT NULL REFERENCES productos(id),
+  from_locacion_id  INTEGER REFERENCES locaciones(id),
+  to_locacion_id    INTEGER REFERENCES locaciones(id),
+  persona_id        INTEGER REFERENCES personas(id),
+  proveedor_id      INTEGER REFERENCES proveedores(id),
+  cantidad_sum      NUMERIC(16,3) NOT NULL,
+  count             INTEGER NOT NULL,
+  CONSTRAINT uq_mov_rollup_diario UNIQUE NULLS NOT DISTINCT
+    (dia, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, proveedor_id)
+);
+
+CREATE TRIGGER tg_actualizar_mov_rollup
+AFTER INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_actualizar_mov_rollup();
+
+CREATE TRIGGER tg_validar_periodo_cerrado
 BEFORE INSERT ON movimientos
 FOR EACH ROW
-EXECUTE FUNCTION fn_evitar_stock_negativo();
+EXECUTE FUNCTION fn_validar_periodo_cerrado();
+
+-- Version de los catalogos (locaciones, uoms, categorias, marcas, personas,
+-- proveedores y productos). Cualquier escritura la incrementa; cada nodo de la
+-- API compara su copia en memoria y su cache del dashboard contra esta fila.
+CREATE TABLE catalogo_version (
+  id       BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  version  BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO catalogo_version DEFAULT VALUES;
+
+CREATE TRIGGER tg_catalogo_version_locaciones
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON locaciones
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_uoms
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON uoms
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_categorias
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON categorias
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_marcas
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON marcas
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_personas
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON personas
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_proveedores
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON proveedores
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_productos
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON productos
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+-- Version del kardex para caches y ETags: un contador que incrementa cada
+-- transaccion que escribe movimientos. El UPDATE bloquea la fila hasta el commit,
+-- asi que las transacciones concurrentes la incrementan en orden de commit y
+-- una version leida ya incluye todos los movimientos confirmados antes (a
+-- diferencia de max(movimientos.id): un id menor puede confirmarse despues).
+-- Costo: ese lock serializa todas las transacciones que escriben movimientos,
+-- aun de productos y locaciones distintos. Para acotarlo el trigger es diferido
+-- y corre al commit, una vez por transaccion: la fila queda tomada solo durante
+-- el commit y no mientras la transaccion valida saldos o espera al cliente. Un
+-- TRUNCATE (o SET CONSTRAINTS ... IMMEDIATE) la toma antes, hasta el commit.
+CREATE TABLE kardex_version (
+  id       BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  version  BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO kardex_version DEFAULT VALUES;
+
+CREATE CONSTRAINT TRIGGER tg_kardex_version_movimientos
+AFTER INSERT OR UPDATE OR DELETE ON movimientos
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE FUNCTION fn_incrementar_kardex_version();
+
+CREATE TRIGGER tg_kardex_version_movimientos_truncate
+AFTER TRUNCATE ON movimientos
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_kardex_version();
+
+-- Particiones del mes actual y los siguientes
+SELECT fn_crear_particiones_movimientos();
@@ -232,6 +232,7 @@ WHERE NOT EXISTS (
   SELECT 1
   FROM movimientos existing
   WHERE existing.nota = md.nota
-);
+)
+ORDER BY md.fecha;
 
 COMMIT;
@@ -0,0 +1,185 @@
+"""Fixtures de los tests de integracion contra un PostgreSQL real.
+
+Requieren ``TEST_DATABASE_URL`` con la URL (SQLAlchemy) de un servidor de
+pruebas, por ejemplo ``postgresql+psycopg2://postgres@localhost:5432/postgres``.
+En cada corrida se recrea la base ``inventario_test`` en ese servidor con
+db/schema.sql y la API apunta a ella. Sin la variable los tests se omiten.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+NOMBRE_BASE = "inventario_test"
+RAIZ = Path(__file__).resolve().parent.parent
+
+if TEST_DATABASE_URL:
+    # Antes de importar app: el engine se crea al importar app.db.session
+    os.environ["DATABASE_URL"] = (
+        make_url(TEST_DATABASE_URL).set(database=NOMBRE_BASE).render_as_string(hide_password=False)
+    )
+    os.environ.pop("READ_DATABASE_URL", None)
+
+_INCLUDE = re.compile(r"^\\ir?\s+(\S+)\s*$", re.MULTILINE)
+
+
+def leer_sql(ruta: Path) -> str:
+    """Contenido de un script de psql con sus ``\\i``/``\\ir`` expandidos."""
+    return _INCLUDE.sub(lambda m: leer_sql(ruta.parent / m.group(1)), ruta.read_text(encoding="utf-8"))
+
+
+def ejecutar_sql(url: str, sql: str) -> None:
+    # Por el cursor del driver sin parametros: el script puede contener "%"
+    engine = create_engine(url)
+    try:
+        conexion = engine.raw_connection()
+        try:
+            with conexion.cursor() as cursor:
+                cursor.execute(sql)
+            conexion.commit()
+        finally:
+            conexion.close()
+    finally:
+        engine.dispose()
+
+
+def recrear_base(nombre: str, *scripts: Path) -> str:
+    """Recrea la base `nombre` en el servidor de pruebas, corre `scripts` y devuelve su URL."""
+    admin = create_engine(TEST_DATABASE_URL, isolation_level="AUTOCOMMIT")
+    try:
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{nombre}" WITH (FORCE)'))
+            conn.execute(text(f'CREATE DATABASE "{nombre}"'))
+    finally:
+        admin.dispose()
+    url = make_url(TEST_DATABASE_URL).set(database=nombre).render_as_string(hide_password=False)
+    for script in scripts:
+        ejecutar_sql(url, leer_sql(script))
+    return url
+
+
+@pytest.fixture(scope="session")
+def base_test() -> str:
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL no configurada")
+    return recrear_base(NOMBRE_BASE, RAIZ / "db" / "schema.sql")
+
+
+def vaciar_base() -> None:
+    """Vacia catalogos, kardex y tablas derivadas, e invalida las caches de la API."""
+    from app.core.catalog_cache import catalog_cache
+    from app.db.session import engine
+    from app.services.dashboard_service import dashboard_cache
+
+    with engine.begin() as conn:
+        tablas = conn.execute(
+            text(
+                "SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND NOT c.relispartition "
+                "AND c.relname NOT LIKE '%version'"
+            )
+        ).scalars().all()
+        conn.execute(text(f"TRUNCATE {', '.join(tablas)} RESTART IDENTITY CASCADE"))
+        conn.execute(text("UPDATE catalogo_version SET version = version + 1"))
+    catalog_cache.invalidar()
+    dashboard_cache.invalidar()
+
+
+@pytest.fixture(autouse=True)
+def base_limpia(base_test):
+    vaciar_base()
+    yield
+
+
+@pytest.fixture(scope="session")
+def client(base_test):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def db(base_test):
+    from app.db.session import SessionLocal
+
+    sesion = SessionLocal()
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+
+
+@pytest.fixture
+def catalogo(db) -> dict[str, int]:
+    """Una unidad, un producto, dos locaciones y una persona."""
+    ids = {}
+    ids["uom"] = db.execute(text("INSERT INTO uoms (nombre, abreviatura) VALUES ('Kilogramo', 'kg') RETURNING id")).scalar_one()
+    ids["producto"] = db.execute(
+        text("INSERT INTO productos (sku, nombre, uom_id) VALUES ('SKU-1', 'Harina', :uom) RETURNING id"),
+        {"uom": ids["uom"]},
+    ).scalar_one()
+    ids["bodega"] = db.execute(text("INSERT INTO locaciones (nombre) VALUES ('Bodega') RETURNING id")).scalar_one()
+    ids["cocina"] = db.execute(text("INSERT INTO locaciones (nombre) VALUES ('Cocina') RETURNING id")).scalar_one()
+    ids["persona"] = db.execute(text("INSERT INTO personas (nombre) VALUES ('Ana') RETURNING id")).scalar_one()
+    db.commit()
+    return ids
+
+
+def saldos(db) -> dict[tuple[int, int], Decimal]:
+    filas = db.execute(text("SELECT producto_id, locacion_id, stock FROM stock_saldos WHERE stock <> 0"))
+    return {(producto_id, locacion_id): stock for producto_id, locacion_id, stock in filas}
+
+
+def saldos_kardex(db) -> dict[tuple[int, int], Decimal]:
+    filas = db.execute(
+        text(
+            "SELECT producto_id, locacion_id, SUM(cantidad) FROM vista_movimientos_locacion "
+            "GROUP BY producto_id, locacion_id HAVING SUM(cantidad) <> 0"
+        )
+    )
+    return {(producto_id, locacion_id): stock for producto_id, locacion_id, stock in filas}
+
+
+def insertar_movimiento(db, *, fecha, tipo: str, producto_id: int, cantidad, desde=None, hacia=None) -> int:
+    """Inserta un movimiento con `fecha` explicita (la API siempre usa now())."""
+    movimiento_id = db.execute(
+        text(
+            "INSERT INTO movimientos (fecha, tipo, producto_id, from_locacion_id, to_locacion_id, cantidad) "
+            "VALUES (:fecha, :tipo, :producto_id, :desde, :hacia, :cantidad) RETURNING id"
+        ),
+        {
+            "fecha": fecha,
+            "tipo": tipo,
+            "producto_id": producto_id,
+            "desde": desde,
+            "hacia": hacia,
+            "cantidad": cantidad,
+        },
+    ).scalar_one()
+    db.commit()
+    return movimiento_id
+
+
+def contar_consultas(llamada, presupuesto=None):
+    """Ejecuta `llamada` contando sus consultas como en un request; devuelve (EstadisticasRequest, resultado)."""
+    from app.core.instrumentacion import EstadisticasRequest, instrumentar_sqlalchemy, request_actual
+
+    instrumentar_sqlalchemy()
+    estadisticas = EstadisticasRequest(presupuesto)
+    token = request_actual.set(estadisticas)
+    try:
+        resultado = llamada()
+    finally:
+        request_actual.reset(token)
+    return estadisticas, resultado
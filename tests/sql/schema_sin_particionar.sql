@@ -0,0 +1,643 @@
+-- db/schema.sql antes de particionar movimientos (commit d2f2bb6): la base de
+-- partida de db/particionar_movimientos.sql en tests/test_particionar_movimientos.py.
+
+-- Tipos
+CREATE TYPE tipo_movimiento AS ENUM ('ingreso', 'traspaso', 'uso', 'ajuste');
+
+-- Zona horaria del negocio para cortar los dias. La API la fija por conexion
+-- (settings.business_timezone); para otros clientes (psql, seeds) configurar
+-- ALTER DATABASE inventario SET inventario.zona_horaria = 'America/Santiago';
+CREATE OR REPLACE FUNCTION fn_zona_negocio() RETURNS TEXT AS $$
+  SELECT COALESCE(NULLIF(current_setting('inventario.zona_horaria', true), ''), 'UTC');
+$$ LANGUAGE sql STABLE;
+
+-- Unidades de medida
+CREATE TABLE uoms (
+  id            SERIAL PRIMARY KEY,
+  nombre        TEXT NOT NULL UNIQUE,
+  abreviatura   TEXT NOT NULL UNIQUE,
+  descripcion   TEXT,
+  activa        BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+-- Catalogos auxiliares
+CREATE TABLE categorias (
+  id      SERIAL PRIMARY KEY,
+  nombre  TEXT NOT NULL UNIQUE,
+  activa  BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE marcas (
+  id      SERIAL PRIMARY KEY,
+  nombre  TEXT NOT NULL UNIQUE,
+  activa  BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE proveedores (
+  id      SERIAL PRIMARY KEY,
+  nombre  TEXT NOT NULL UNIQUE,
+  activa  BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+-- Catalogo de productos
+CREATE TABLE productos (
+  id            SERIAL PRIMARY KEY,
+  sku           TEXT UNIQUE,
+  nombre        TEXT NOT NULL,
+  activo        BOOLEAN NOT NULL DEFAULT TRUE,
+  uom_id        INTEGER NOT NULL REFERENCES uoms(id),
+  marca_id      INTEGER REFERENCES marcas(id) ON DELETE SET NULL,
+  categoria_id  INTEGER REFERENCES categorias(id) ON DELETE SET NULL
+);
+
+-- Zonas/Bodegas/Locaciones
+CREATE TABLE locaciones (
+  id      SERIAL PRIMARY KEY,
+  nombre  TEXT NOT NULL UNIQUE,
+  activa  BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+-- Personas responsables de movimientos
+CREATE TABLE personas (
+  id      SERIAL PRIMARY KEY,
+  nombre  TEXT NOT NULL UNIQUE,
+  activa  BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+-- Movimientos de inventario (Kardex simplificado)
+CREATE TABLE movimientos (
+  id                 BIGSERIAL PRIMARY KEY,
+  fecha              TIMESTAMPTZ NOT NULL DEFAULT now(),
+  tipo               tipo_movimiento NOT NULL,
+  producto_id        INTEGER NOT NULL REFERENCES productos(id),
+  from_locacion_id   INTEGER REFERENCES locaciones(id),
+  to_locacion_id     INTEGER REFERENCES locaciones(id),
+  persona_id         INTEGER REFERENCES personas(id),
+  proveedor_id       INTEGER REFERENCES proveedores(id),
+  cantidad           NUMERIC(14,3) NOT NULL CHECK (cantidad > 0),
+  nota               TEXT
+);
+
+ALTER TABLE movimientos ADD CONSTRAINT chk_mov_ingreso
+  CHECK (
+    (tipo <> 'ingreso')
+    OR (from_locacion_id IS NULL AND to_locacion_id IS NOT NULL)
+  );
+
+ALTER TABLE movimientos ADD CONSTRAINT chk_mov_traspaso
+  CHECK (
+    (tipo <> 'traspaso')
+    OR (from_locacion_id IS NOT NULL AND to_locacion_id IS NOT NULL AND from_locacion_id <> to_locacion_id)
+  );
+
+ALTER TABLE movimientos ADD CONSTRAINT chk_mov_uso
+  CHECK (
+    (tipo <> 'uso')
+    OR (
+      from_locacion_id IS NOT NULL
+      AND (to_locacion_id IS NULL OR to_locacion_id <> from_locacion_id)
+    )
+  );
+
+-- (fecha, id) es la clave de paginacion por cursor del kardex
+CREATE INDEX idx_movimientos_producto_fecha ON movimientos (producto_id, fecha, id);
+CREATE INDEX idx_movimientos_fecha ON movimientos (fecha, id);
+CREATE INDEX idx_movimientos_from ON movimientos (from_locacion_id);
+CREATE INDEX idx_movimientos_to   ON movimientos (to_locacion_id);
+CREATE INDEX idx_movimientos_persona ON movimientos (persona_id);
+CREATE INDEX idx_movimientos_proveedor ON movimientos (proveedor_id);
+CREATE INDEX idx_productos_uom ON productos (uom_id);
+
+-- Saldo vigente por producto y locacion, mantenido por tg_actualizar_stock_saldos
+-- en la misma transaccion que cada movimiento. El kardex sigue siendo la fuente
+-- de verdad: fn_reconstruir_stock_saldos() lo vuelve a derivar desde movimientos.
+CREATE TABLE stock_saldos (
+  producto_id         INTEGER NOT NULL REFERENCES productos(id),
+  locacion_id         INTEGER NOT NULL REFERENCES locaciones(id),
+  stock               NUMERIC(14,3) NOT NULL DEFAULT 0,
+  last_movimiento_id  BIGINT,
+  updated_at          TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (producto_id, locacion_id)
+);
+
+CREATE INDEX idx_stock_saldos_locacion ON stock_saldos (locacion_id);
+
+-- Efecto de cada movimiento sobre el stock de una locacion (positivo entra, negativo sale)
+CREATE VIEW vista_movimientos_locacion AS
+SELECT
+  m.id              AS movimiento_id,
+  m.fecha           AS fecha,
+  m.producto_id     AS producto_id,
+  m.to_locacion_id  AS locacion_id,
+  m.cantidad        AS cantidad
+FROM movimientos m
+WHERE m.tipo IN ('ingreso','traspaso','ajuste')
+  AND m.to_locacion_id IS NOT NULL
+UNION ALL
+SELECT
+  m.id,
+  m.fecha,
+  m.producto_id,
+  m.from_locacion_id,
+  -m.cantidad
+FROM movimientos m
+WHERE m.tipo IN ('traspaso','uso','ajuste')
+  AND m.from_locacion_id IS NOT NULL
+  AND m.from_locacion_id IS DISTINCT FROM m.to_locacion_id;
+
+-- Foto diaria por producto y locacion (dias ya cerrados). Solo guarda pares con
+-- movimientos en el dia o stock distinto de cero; un par ausente tiene stock 0.
+CREATE TABLE stock_diario (
+  fecha        DATE NOT NULL,
+  producto_id  INTEGER NOT NULL REFERENCES productos(id),
+  locacion_id  INTEGER NOT NULL REFERENCES locaciones(id),
+  ingresos     NUMERIC(14,3) NOT NULL DEFAULT 0,
+  egresos      NUMERIC(14,3) NOT NULL DEFAULT 0,
+  neto         NUMERIC(14,3) NOT NULL DEFAULT 0,
+  stock_end    NUMERIC(14,3) NOT NULL DEFAULT 0,
+  PRIMARY KEY (fecha, producto_id, locacion_id)
+);
+
+CREATE INDEX idx_stock_diario_producto ON stock_diario (producto_id, fecha);
+
+-- Cierres de inventario: congelan el saldo por producto y locacion de todo
+-- movimiento con fecha anterior a cierres.fecha. Sirven de punto de partida
+-- para los calculos historicos, que solo suman movimientos posteriores.
+CREATE TABLE cierres (
+  id         SERIAL PRIMARY KEY,
+  fecha      TIMESTAMPTZ NOT NULL UNIQUE,
+  nota       TEXT,
+  creado_en  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE cierres_saldos (
+  cierre_id    INTEGER NOT NULL REFERENCES cierres(id) ON DELETE CASCADE,
+  producto_id  INTEGER NOT NULL REFERENCES productos(id),
+  locacion_id  INTEGER NOT NULL REFERENCES locaciones(id),
+  stock        NUMERIC(14,3) NOT NULL,
+  PRIMARY KEY (cierre_id, producto_id, locacion_id)
+);
+
+CREATE VIEW vista_stock_actual AS
+SELECT
+  p.id  AS producto_id,
+  l.id  AS locacion_id,
+  COALESCE(s.stock, 0)::NUMERIC(14,3) AS stock
+FROM productos p
+CROSS JOIN locaciones l
+LEFT JOIN stock_saldos s
+  ON s.producto_id = p.id
+ AND s.locacion_id = l.id;
+
+-- Valida el retiro contra stock_saldos bloqueando las filas afectadas (FOR UPDATE).
+-- El bloqueo se mantiene hasta el commit, asi que tg_actualizar_stock_saldos descuenta
+-- sobre la misma fila y los retiros concurrentes de la misma locacion se serializan.
+-- Las filas se bloquean en orden de locacion para que traspasos cruzados no se interbloqueen.
+CREATE OR REPLACE FUNCTION fn_evitar_stock_negativo() RETURNS trigger AS $$
+DECLARE
+  saldo RECORD;
+  stock_actual NUMERIC(14,3) := 0;
+BEGIN
+  IF (NEW.tipo IN ('uso','traspaso')) AND NEW.from_locacion_id IS NOT NULL THEN
+    FOR saldo IN
+      SELECT s.locacion_id, s.stock
+      FROM stock_saldos s
+      WHERE s.producto_id = NEW.producto_id
+        AND s.locacion_id IN (NEW.from_locacion_id, NEW.to_locacion_id)
+      ORDER BY s.locacion_id
+      FOR UPDATE
+    LOOP
+      IF saldo.locacion_id = NEW.from_locacion_id THEN
+        stock_actual := saldo.stock;
+      END IF;
+    END LOOP;
+
+    IF stock_actual < NEW.cantidad THEN
+      RAISE EXCEPTION 'Stock insuficiente en locacion origen (%. Disponible: %, Intentado: %)',
+        NEW.from_locacion_id, stock_actual, NEW.cantidad
+        USING ERRCODE = 'check_violation';
+    END IF;
+  END IF;
+
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tg_evitar_stock_negativo
+BEFORE INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_evitar_stock_negativo();
+
+CREATE OR REPLACE FUNCTION fn_actualizar_stock_saldos() RETURNS trigger AS $$
+BEGIN
+  IF NEW.tipo IN ('ingreso','traspaso','ajuste') AND NEW.to_locacion_id IS NOT NULL THEN
+    INSERT INTO stock_saldos AS s (producto_id, locacion_id, stock, last_movimiento_id, updated_at)
+    VALUES (NEW.producto_id, NEW.to_locacion_id, NEW.cantidad, NEW.id, now())
+    ON CONFLICT (producto_id, locacion_id) DO UPDATE
+      SET stock = s.stock + EXCLUDED.stock,
+          last_movimiento_id = GREATEST(s.last_movimiento_id, EXCLUDED.last_movimiento_id),
+          updated_at = EXCLUDED.updated_at;
+  END IF;
+
+  IF NEW.tipo IN ('traspaso','uso','ajuste')
+     AND NEW.from_locacion_id IS NOT NULL
+     AND NEW.from_locacion_id IS DISTINCT FROM NEW.to_locacion_id THEN
+    INSERT INTO stock_saldos AS s (producto_id, locacion_id, stock, last_movimiento_id, updated_at)
+    VALUES (NEW.producto_id, NEW.from_locacion_id, -NEW.cantidad, NEW.id, now())
+    ON CONFLICT (producto_id, locacion_id) DO UPDATE
+      SET stock = s.stock + EXCLUDED.stock,
+          last_movimiento_id = GREATEST(s.last_movimiento_id, EXCLUDED.last_movimiento_id),
+          updated_at = EXCLUDED.updated_at;
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tg_actualizar_stock_saldos
+AFTER INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_actualizar_stock_saldos();
+
+-- Reconstruye stock_saldos (y mov_rollup_diario) desde el kardex. Bloquea nuevos movimientos mientras corre.
+CREATE OR REPLACE FUNCTION fn_reconstruir_stock_saldos() RETURNS INTEGER AS $$
+DECLARE
+  filas INTEGER;
+BEGIN
+  LOCK TABLE movimientos IN SHARE MODE;
+  LOCK TABLE stock_saldos IN EXCLUSIVE MODE;
+
+  DELETE FROM stock_saldos;
+  -- Las fotos diarias tambien derivan del kardex; se regeneran bajo demanda
+  DELETE FROM stock_diario;
+  -- Los agregados diarios del dashboard tambien
+  PERFORM fn_reconstruir_mov_rollup();
+
+  INSERT INTO stock_saldos (producto_id, locacion_id, stock, last_movimiento_id, updated_at)
+  SELECT
+    v.producto_id,
+    v.locacion_id,
+    SUM(v.cantidad),
+    MAX(v.movimiento_id),
+    now()
+  FROM vista_movimientos_locacion v
+  GROUP BY v.producto_id, v.locacion_id;
+
+  GET DIAGNOSTICS filas = ROW_COUNT;
+  RETURN filas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Cierra los dias pendientes hasta p_hasta (como maximo ayer) y devuelve el ultimo
+-- dia cerrado. Cada dia parte de la foto del dia anterior y suma solo sus movimientos.
+CREATE OR REPLACE FUNCTION fn_cerrar_stock_diario(p_hasta DATE) RETURNS DATE AS $$
+DECLARE
+  zona TEXT := fn_zona_negocio();
+  limite DATE := LEAST(p_hasta, (now() AT TIME ZONE zona)::date - 1);
+  dia DATE;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('stock_diario'));
+
+  SELECT MAX(fecha) + 1 INTO dia FROM stock_diario;
+  IF dia IS NULL THEN
+    SELECT (MIN(fecha) AT TIME ZONE zona)::date INTO dia FROM movimientos;
+  END IF;
+  IF dia IS NULL THEN
+    RETURN limite;
+  END IF;
+
+  WHILE dia <= limite LOOP
+    INSERT INTO stock_diario (fecha, producto_id, locacion_id, ingresos, egresos, neto, stock_end)
+    SELECT
+      dia,
+      COALESCE(a.producto_id, d.producto_id),
+      COALESCE(a.locacion_id, d.locacion_id),
+      COALESCE(d.ingresos, 0),
+      COALESCE(d.egresos, 0),
+      COALESCE(d.neto, 0),
+      COALESCE(a.stock_end, 0) + COALESCE(d.neto, 0)
+    FROM (
+      SELECT producto_id, locacion_id, stock_end
+      FROM stock_diario
+      WHERE fecha = dia - 1
+        AND stock_end <> 0
+    ) a
+    FULL JOIN (
+      SELECT
+        v.producto_id,
+        v.locacion_id,
+        SUM(GREATEST(v.cantidad, 0)) AS ingresos,
+        SUM(GREATEST(-v.cantidad, 0)) AS egresos,
+        SUM(v.cantidad) AS neto
+      FROM vista_movimientos_locacion v
+      WHERE v.fecha >= (dia::timestamp AT TIME ZONE zona)
+        AND v.fecha < ((dia + 1)::timestamp AT TIME ZONE zona)
+      GROUP BY v.producto_id, v.locacion_id
+    ) d
+      ON d.producto_id = a.producto_id
+     AND d.locacion_id = a.locacion_id
+    ON CONFLICT (fecha, producto_id, locacion_id) DO NOTHING;
+
+    dia := dia + 1;
+  END LOOP;
+
+  RETURN limite;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un movimiento con fecha de un dia ya cerrado invalida las fotos desde ese dia
+CREATE OR REPLACE FUNCTION fn_invalidar_stock_diario() RETURNS trigger AS $$
+DECLARE
+  zona TEXT := fn_zona_negocio();
+BEGIN
+  IF NEW.fecha < (date_trunc('day', now() AT TIME ZONE zona) AT TIME ZONE zona) THEN
+    DELETE FROM stock_diario WHERE fecha >= (NEW.fecha AT TIME ZONE zona)::date;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tg_invalidar_stock_diario
+AFTER INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_invalidar_stock_diario();
+
+-- Movimientos agregados por dia (zona del negocio) y combinacion de claves. Los
+-- reportes del dashboard sobre ventanas largas leen estas filas en lugar del
+-- kardex. Se mantiene con tg_actualizar_mov_rollup en la misma transaccion que
+-- cada movimiento; fn_reconstruir_mov_rollup() la vuelve a derivar del kardex.
+CREATE TABLE mov_rollup_diario (
+  dia               DATE NOT NULL,
+  tipo              tipo_movimiento NOT NULL,
+  producto_id       INTEGER NOT NULL REFERENCES productos(id),
+  from_locacion_id  INTEGER REFERENCES locaciones(id),
+  to_locacion_id    INTEGER REFERENCES locaciones(id),
+  persona_id        INTEGER REFERENCES personas(id),
+  proveedor_id      INTEGER REFERENCES proveedores(id),
+  cantidad_sum      NUMERIC(16,3) NOT NULL,
+  count             INTEGER NOT NULL,
+  CONSTRAINT uq_mov_rollup_diario UNIQUE NULLS NOT DISTINCT
+    (dia, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, proveedor_id)
+);
+
+CREATE OR REPLACE FUNCTION fn_actualizar_mov_rollup() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO mov_rollup_diario AS r (
+    dia, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, proveedor_id, cantidad_sum, count
+  )
+  VALUES (
+    (NEW.fecha AT TIME ZONE fn_zona_negocio())::date, NEW.tipo, NEW.producto_id,
+    NEW.from_locacion_id, NEW.to_locacion_id, NEW.persona_id, NEW.proveedor_id, NEW.cantidad, 1
+  )
+  ON CONFLICT ON CONSTRAINT uq_mov_rollup_diario DO UPDATE
+    SET cantidad_sum = r.cantidad_sum + EXCLUDED.cantidad_sum,
+        count = r.count + 1;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tg_actualizar_mov_rollup
+AFTER INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_actualizar_mov_rollup();
+
+-- Movimientos del kardex agregados con la misma clave que mov_rollup_diario,
+-- para los dias [p_desde, p_hasta] (NULL = sin limite)
+CREATE OR REPLACE FUNCTION fn_mov_rollup_kardex(p_desde DATE DEFAULT NULL, p_hasta DATE DEFAULT NULL)
+RETURNS TABLE (
+  dia DATE,
+  tipo tipo_movimiento,
+  producto_id INTEGER,
+  from_locacion_id INTEGER,
+  to_locacion_id INTEGER,
+  persona_id INTEGER,
+  proveedor_id INTEGER,
+  cantidad_sum NUMERIC,
+  count INTEGER
+) AS $$
+  SELECT
+    (m.fecha AT TIME ZONE fn_zona_negocio())::date,
+    m.tipo, m.producto_id, m.from_locacion_id, m.to_locacion_id, m.persona_id, m.proveedor_id,
+    SUM(m.cantidad),
+    COUNT(*)::integer
+  FROM movimientos m
+  WHERE (p_desde IS NULL OR m.fecha >= (p_desde::timestamp AT TIME ZONE fn_zona_negocio()))
+    AND (p_hasta IS NULL OR m.fecha < ((p_hasta + 1)::timestamp AT TIME ZONE fn_zona_negocio()))
+  GROUP BY 1, 2, 3, 4, 5, 6, 7;
+$$ LANGUAGE sql STABLE;
+
+-- Reconstruye mov_rollup_diario desde p_desde (NULL = completa). Sirve para
+-- ponerse al dia tras cargas con los triggers desactivados o un cambio de zona
+-- horaria. Bloquea nuevos movimientos mientras corre.
+CREATE OR REPLACE FUNCTION fn_reconstruir_mov_rollup(p_desde DATE DEFAULT NULL) RETURNS INTEGER AS $$
+DECLARE
+  filas INTEGER;
+BEGIN
+  LOCK TABLE movimientos IN SHARE MODE;
+  LOCK TABLE mov_rollup_diario IN EXCLUSIVE MODE;
+
+  DELETE FROM mov_rollup_diario WHERE p_desde IS NULL OR dia >= p_desde;
+
+  INSERT INTO mov_rollup_diario (
+    dia, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, proveedor_id, cantidad_sum, count
+  )
+  SELECT * FROM fn_mov_rollup_kardex(p_desde, NULL);
+
+  GET DIAGNOSTICS filas = ROW_COUNT;
+  RETURN filas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Diferencias entre mov_rollup_diario y el kardex en [p_desde, p_hasta]; vacia si estan al dia
+CREATE OR REPLACE FUNCTION fn_verificar_mov_rollup(p_desde DATE DEFAULT NULL, p_hasta DATE DEFAULT NULL)
+RETURNS TABLE (
+  dia DATE,
+  tipo tipo_movimiento,
+  producto_id INTEGER,
+  from_locacion_id INTEGER,
+  to_locacion_id INTEGER,
+  persona_id INTEGER,
+  proveedor_id INTEGER,
+  cantidad_rollup NUMERIC,
+  cantidad_kardex NUMERIC,
+  count_rollup INTEGER,
+  count_kardex INTEGER
+) AS $$
+  SELECT
+    COALESCE(r.dia, k.dia),
+    COALESCE(r.tipo, k.tipo),
+    COALESCE(r.producto_id, k.producto_id),
+    COALESCE(r.from_locacion_id, k.from_locacion_id),
+    COALESCE(r.to_locacion_id, k.to_locacion_id),
+    COALESCE(r.persona_id, k.persona_id),
+    COALESCE(r.proveedor_id, k.proveedor_id),
+    r.cantidad_sum,
+    k.cantidad_sum,
+    r.count,
+    k.count
+  FROM (
+    SELECT *
+    FROM mov_rollup_diario
+    WHERE (p_desde IS NULL OR mov_rollup_diario.dia >= p_desde)
+      AND (p_hasta IS NULL OR mov_rollup_diario.dia <= p_hasta)
+  ) r
+  FULL JOIN fn_mov_rollup_kardex(p_desde, p_hasta) k
+    ON k.dia = r.dia
+   AND k.tipo = r.tipo
+   AND k.producto_id = r.producto_id
+   AND k.from_locacion_id IS NOT DISTINCT FROM r.from_locacion_id
+   AND k.to_locacion_id IS NOT DISTINCT FROM r.to_locacion_id
+   AND k.persona_id IS NOT DISTINCT FROM r.persona_id
+   AND k.proveedor_id IS NOT DISTINCT FROM r.proveedor_id
+  WHERE r.cantidad_sum IS DISTINCT FROM k.cantidad_sum
+     OR r.count IS DISTINCT FROM k.count
+  ORDER BY 1, 2, 3;
+$$ LANGUAGE sql STABLE;
+
+-- Saldo por producto y locacion de los movimientos con fecha < p_antes_de.
+-- Parte del punto de control mas cercano (cierre o foto diaria) y suma solo
+-- los movimientos posteriores a el.
+CREATE OR REPLACE FUNCTION fn_saldos_antes_de(
+  p_antes_de TIMESTAMPTZ,
+  p_producto_id INTEGER DEFAULT NULL,
+  p_locacion_id INTEGER DEFAULT NULL
+) RETURNS TABLE (producto_id INTEGER, locacion_id INTEGER, stock NUMERIC(14,3)) AS $$
+DECLARE
+  v_cierre_id INTEGER;
+  v_cierre_fecha TIMESTAMPTZ;
+  v_foto_dia DATE;
+  v_desde TIMESTAMPTZ := '-infinity';
+  v_zona TEXT := fn_zona_negocio();
+BEGIN
+  SELECT c.id, c.fecha INTO v_cierre_id, v_cierre_fecha
+  FROM cierres c
+  WHERE c.fecha < p_antes_de
+  ORDER BY c.fecha DESC
+  LIMIT 1;
+
+  SELECT MAX(d.fecha) INTO v_foto_dia
+  FROM stock_diario d
+  WHERE d.fecha < (p_antes_de AT TIME ZONE v_zona)::date;
+
+  IF v_cierre_id IS NOT NULL
+     AND (v_foto_dia IS NULL OR v_cierre_fecha >= ((v_foto_dia + 1)::timestamp AT TIME ZONE v_zona)) THEN
+    v_desde := v_cierre_fecha;
+    v_foto_dia := NULL;
+  ELSIF v_foto_dia IS NOT NULL THEN
+    v_desde := (v_foto_dia + 1)::timestamp AT TIME ZONE v_zona;
+    v_cierre_id := NULL;
+  END IF;
+
+  -- SQL dinamico: se planifica con los valores reales, asi los filtros opcionales
+  -- llegan a cada rama y usan idx_movimientos_producto_fecha / idx_movimientos_fecha
+  RETURN QUERY EXECUTE '
+    SELECT b.producto_id, b.locacion_id, SUM(b.cantidad)::NUMERIC(14,3)
+    FROM (
+      SELECT cs.producto_id, cs.locacion_id, cs.stock AS cantidad
+      FROM cierres_saldos cs
+      WHERE cs.cierre_id = $1
+      UNION ALL
+      SELECT d.producto_id, d.locacion_id, d.stock_end
+      FROM stock_diario d
+      WHERE d.fecha = $2
+      UNION ALL
+      SELECT v.producto_id, v.locacion_id, v.cantidad
+      FROM vista_movimientos_locacion v
+      WHERE v.fecha >= $3
+        AND v.fecha < $4
+    ) b
+    WHERE ($5::INTEGER IS NULL OR b.producto_id = $5)
+      AND ($6::INTEGER IS NULL OR b.locacion_id = $6)
+    GROUP BY b.producto_id, b.locacion_id'
+  USING v_cierre_id, v_foto_dia, v_desde, p_antes_de, p_producto_id, p_locacion_id;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Registra un cierre en p_fecha. Bloquea los inserts de movimientos mientras
+-- calcula para que ninguna transaccion en curso quede fuera del cierre.
+CREATE OR REPLACE FUNCTION fn_crear_cierre(p_fecha TIMESTAMPTZ, p_nota TEXT DEFAULT NULL) RETURNS INTEGER AS $$
+DECLARE
+  nuevo_id INTEGER;
+BEGIN
+  IF p_fecha > now() THEN
+    RAISE EXCEPTION 'No se puede cerrar un periodo futuro (%)', p_fecha
+      USING ERRCODE = 'check_violation';
+  END IF;
+
+  LOCK TABLE movimientos IN SHARE MODE;
+
+  INSERT INTO cierres (fecha, nota) VALUES (p_fecha, p_nota) RETURNING id INTO nuevo_id;
+
+  INSERT INTO cierres_saldos (cierre_id, producto_id, locacion_id, stock)
+  SELECT nuevo_id, s.producto_id, s.locacion_id, s.stock
+  FROM fn_saldos_antes_de(p_fecha) s
+  WHERE s.stock <> 0;
+
+  RETURN nuevo_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un periodo cerrado no admite movimientos nuevos con fecha anterior al cierre
+CREATE OR REPLACE FUNCTION fn_validar_periodo_cerrado() RETURNS trigger AS $$
+DECLARE
+  ultimo_cierre TIMESTAMPTZ;
+BEGIN
+  SELECT MAX(c.fecha) INTO ultimo_cierre FROM cierres c;
+  IF ultimo_cierre IS NOT NULL AND NEW.fecha < ultimo_cierre THEN
+    RAISE EXCEPTION 'Periodo cerrado: el ultimo cierre es %, movimiento con fecha %',
+      ultimo_cierre, NEW.fecha
+      USING ERRCODE = 'check_violation';
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tg_validar_periodo_cerrado
+BEFORE INSERT ON movimientos
+FOR EACH ROW
+EXECUTE FUNCTION fn_validar_periodo_cerrado();
+
+-- Version de los catalogos (locaciones, uoms, categorias, marcas, personas,
+-- proveedores y productos). Cualquier escritura la incrementa; cada nodo de la
+-- API compara su copia en memoria y su cache del dashboard contra esta fila.
+CREATE TABLE catalogo_version (
+  id       BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  version  BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO catalogo_version DEFAULT VALUES;
+
+CREATE OR REPLACE FUNCTION fn_incrementar_catalogo_version() RETURNS trigger AS $$
+BEGIN
+  UPDATE catalogo_version SET version = version + 1;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tg_catalogo_version_locaciones
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON locaciones
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_uoms
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON uoms
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_categorias
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON categorias
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_marcas
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON marcas
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_personas
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON personas
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_proveedores
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON proveedores
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
+
+CREATE TRIGGER tg_catalogo_version_productos
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON productos
+FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementar_catalogo_version();
@@ -0,0 +1,85 @@
+"""Saldos historicos despues de archivar un mes del kardex (fn_desacoplar_particion_movimientos)."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DataError
+
+from app.crud.stock import KARDEX_ARCHIVADO
+from app.db.particiones import desacoplar_particion
+from tests.conftest import insertar_movimiento
+
+
+@pytest.fixture
+def enero_archivado(db, catalogo):
+    # El reporte de /weekly-stock agrupa por categoria
+    categoria = db.execute(text("INSERT INTO categorias (nombre) VALUES ('Secos') RETURNING id")).scalar_one()
+    db.execute(text("UPDATE productos SET categoria_id = :categoria"), {"categoria": categoria})
+    for dia, cantidad in ((datetime(2024, 1, 15), 10), (datetime(2024, 2, 10), 5)):
+        fecha = dia.replace(hour=12, tzinfo=timezone.utc)
+        insertar_movimiento(
+            db, fecha=fecha, tipo="ingreso", producto_id=catalogo["producto"], cantidad=cantidad, hacia=catalogo["bodega"]
+        )
+    db.execute(text("SELECT fn_crear_particiones_movimientos(0, DATE '2024-01-01')"))
+    db.commit()
+    nombre = desacoplar_particion(db, mes=datetime(2024, 1, 1).date())
+    db.execute(text(f"DROP TABLE {nombre}"))
+    db.commit()
+    return nombre
+
+
+def test_saldos_antes_del_horizonte_de_archivo_se_rechazan(db, enero_archivado):
+    assert db.execute(text("SELECT particion FROM movimientos_archivados")).scalar_one() == enero_archivado
+
+    with pytest.raises(DataError) as error:
+        db.execute(text("SELECT * FROM fn_saldos_antes_de('2024-01-20')")).all()
+    assert error.value.orig.pgcode == KARDEX_ARCHIVADO
+    db.rollback()
+
+    # Despues del horizonte el saldo parte del cierre del archivo e incluye el mes archivado
+    stock = db.execute(text("SELECT SUM(stock) FROM fn_saldos_antes_de('2024-02-15')")).scalar_one()
+    assert stock == Decimal("15")
+
+
+@pytest.mark.parametrize(
+    ("ruta", "params"),
+    [
+        ("/api/v1/stock/as-of", {"ts": "2024-01-20T00:00:00"}),
+        ("/api/v1/stock/total-diario", {"fecha": "2024-01-20"}),
+        ("/api/v1/stock/weekly", {"start_date": "2024-01-15"}),
+        ("/api/v1/weekly-stock", {"week_start": "2024-01-15"}),
+        ("/api/v1/weekly-stock/csv", {"week_start": "2024-01-15"}),
+    ],
+)
+def test_reportes_antes_del_horizonte_responden_410(client, enero_archivado, ruta, params):
+    respuesta = client.get(ruta, params=params)
+
+    assert respuesta.status_code == 410
+    assert respuesta.json()["detail"]["code"] == "kardex_archivado"
+
+
+def test_reportes_despues_del_horizonte(client, enero_archivado):
+    respuesta = client.get("/api/v1/stock/as-of", params={"ts": "2024-02-15T00:00:00"})
+    assert respuesta.status_code == 200
+    assert Decimal(respuesta.json()["total_stock"]) == 15
+
+    assert client.get("/api/v1/weekly-stock/csv", params={"week_start": "2024-02-12"}).status_code == 200
+
+
+def test_reconstruir_rollup_con_el_kardex_vacio_conserva_los_meses_archivados(db, enero_archivado):
+    nombre = desacoplar_particion(db, mes=datetime(2024, 2, 1).date())
+    db.execute(text(f"DROP TABLE {nombre}"))
+    db.commit()
+    assert db.execute(text("SELECT count(*) FROM movimientos")).scalar_one() == 0
+    archivados = db.execute(text("SELECT * FROM mov_rollup_diario ORDER BY dia")).all()
+    assert len(archivados) == 2
+
+    db.execute(text("SELECT fn_reconstruir_mov_rollup()"))
+    db.commit()
+
+    assert db.execute(text("SELECT * FROM mov_rollup_diario ORDER BY dia")).all() == archivados
+    assert db.execute(text("SELECT count(*) FROM fn_verificar_mov_rollup()")).scalar_one() == 0
@@ -0,0 +1,99 @@
+"""Endpoints del stack async (app/api/v1/asincrono.py) con requests concurrentes."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.core.catalog_cache import catalog_cache
+from app.core.config import settings
+from app.db import async_session
+from app.db.replica import estado_replica
+from tests.conftest import insertar_movimiento
+
+pytest.importorskip("asyncpg")
+
+REQUESTS = 40
+
+
+def _app() -> FastAPI:
+    # app.main solo registra estas rutas con ASYNC_DB_ENABLED, que se lee al importar
+    from app.api.v1 import asincrono
+
+    app = FastAPI()
+    app.include_router(asincrono.router, prefix=settings.api_v1_str)
+    return app
+
+
+async def _concurrentes(rutas: list[str]) -> list[httpx.Response]:
+    try:
+        transporte = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as http:
+            return await asyncio.gather(*(http.get(ruta) for ruta in rutas))
+    finally:
+        await async_session.cerrar_engines()
+
+
+def _correr(rutas: list[str], timeout: float = 60.0) -> list[httpx.Response]:
+    """Corre los requests en su propio event loop; un bloqueo del loop no cuelga la suite."""
+    resultado: list = []
+    hilo = threading.Thread(target=lambda: resultado.append(asyncio.run(_concurrentes(rutas))), daemon=True)
+    hilo.start()
+    hilo.join(timeout)
+    assert not hilo.is_alive(), "el event loop quedo bloqueado"
+    return resultado[0]
+
+
+def test_requests_concurrentes_con_cache_de_catalogos_fria(catalogo, db, monkeypatch):
+    # Todos los requests llegan con la cache vacia y la recargan a la vez sobre el mismo loop
+    monkeypatch.setattr(settings, "db_pool_size", REQUESTS)
+    ayer = datetime.now(timezone.utc) - timedelta(days=1)
+    insertar_movimiento(
+        db, fecha=ayer, tipo="ingreso", producto_id=catalogo["producto"], cantidad=10, hacia=catalogo["bodega"]
+    )
+    catalog_cache.invalidar()
+
+    rutas = [
+        f"{settings.api_v1_str}/stock/locaciones" if i % 2 else f"{settings.api_v1_str}/dashboard/stock-by-location"
+        for i in range(REQUESTS)
+    ]
+    respuestas = _correr(rutas)
+
+    assert [r.status_code for r in respuestas] == [200] * REQUESTS
+    locaciones = {r.json()[0]["locacion_nombre"] for r in respuestas if r.url.path.endswith("/stock/locaciones")}
+    assert locaciones == {"Bodega"}
+    totales = {r.json()["items"][0]["stock_total"] for r in respuestas if r.url.path.endswith("stock-by-location")}
+    assert totales == {10}
+
+
+def test_lecturas_async_van_a_la_replica(catalogo, monkeypatch):
+    # La misma base hace de replica: no esta en recuperacion, asi que su retraso es 0
+    monkeypatch.setattr(settings, "async_read_database_url", settings.async_database_url_resuelta)
+    for atributo in ("disponible", "lag_segundos"):
+        monkeypatch.setattr(estado_replica, atributo, getattr(estado_replica, atributo))
+    monkeypatch.setattr(estado_replica, "_verificado_en", None)
+
+    async def sesion_y_respuesta():
+        try:
+            lectura = async_session.get_async_read_db()
+            sesion = await anext(lectura)
+            solo_lectura = (await sesion.execute(text("SHOW transaction_read_only"))).scalar_one()
+            await lectura.aclose()
+            transporte = httpx.ASGITransport(app=_app())
+            async with httpx.AsyncClient(transport=transporte, base_url="http://test") as http:
+                respuesta = await http.get(f"{settings.api_v1_str}/stock/locaciones?include_zero=true")
+            return solo_lectura, respuesta
+        finally:
+            await async_session.cerrar_engines()
+
+    solo_lectura, respuesta = asyncio.run(sesion_y_respuesta())
+
+    assert solo_lectura == "on"
+    assert estado_replica.disponible and estado_replica.lag_segundos == 0
+    assert respuesta.status_code == 200
@@ -0,0 +1,70 @@
+"""Cache del dashboard: invalidacion por version del kardex y conteo de consultas del bundle."""
+
+from __future__ import annotations
+
+from sqlalchemy import text
+
+from app.core.catalog_cache import catalog_cache
+from app.core.instrumentacion import PresupuestoConsultas
+from app.db.session import SessionLocal
+from app.services import dashboard_service
+from app.services.dashboard_service import dashboard_cache, get_dashboard_summary, get_stock_by_location
+from tests.conftest import contar_consultas
+
+INSERTAR_INGRESO = (
+    "INSERT INTO movimientos ({columnas}tipo, producto_id, to_locacion_id, cantidad) "
+    "VALUES ({valores}'ingreso', :producto, :locacion, 5)"
+)
+
+
+def test_movimiento_con_id_menor_de_otro_nodo_invalida_la_cache(db, catalogo):
+    parametros = {"producto": catalogo["producto"], "locacion": catalogo["bodega"]}
+    # Id tomado por una transaccion que confirma tarde (p. ej. en otro nodo)
+    id_reservado = db.execute(text("SELECT nextval(pg_get_serial_sequence('movimientos', 'id'))")).scalar_one()
+    db.execute(text(INSERTAR_INGRESO.format(columnas="", valores="")), parametros)
+    db.commit()
+
+    assert get_dashboard_summary(db).total_movements_last_7d == 1
+    assert get_stock_by_location(db).items[0].stock_total == 5
+    assert get_dashboard_summary(db).total_movements_last_7d == 1
+    aciertos = dashboard_cache.stats()["hits"]
+
+    # Sin dashboard_cache.invalidar(): solo la version del kardex puede delatar el cambio
+    db.execute(text(INSERTAR_INGRESO.format(columnas="id, ", valores=":id, ")), {**parametros, "id": id_reservado})
+    db.commit()
+
+    assert get_dashboard_summary(db).total_movements_last_7d == 2
+    assert get_stock_by_location(db).items[0].stock_total == 10
+    assert dashboard_cache.stats()["hits"] == aciertos
+
+
+def test_bundle_suma_las_consultas_de_cada_widget(db, catalogo):
+    parametros = {"producto": catalogo["producto"], "locacion": catalogo["bodega"]}
+    db.execute(text(INSERTAR_INGRESO.format(columnas="", valores="")), parametros)
+    db.commit()
+    # Catalogos ya en memoria: su recarga no debe caer en un solo widget
+    catalog_cache.precargar(db)
+    presupuesto = PresupuestoConsultas(1000, 1000)
+    params = {"days": 7, "limit": 5, "recent_limit": 5, "top": 5}
+
+    # Por separado, con la cache fria: lo que cada widget consulta
+    esperadas = 0
+    for fn, kwargs in (
+        (dashboard_service.get_dashboard_summary, {}),
+        (dashboard_service.get_recent_movements, {"limit": 5, "offset": 0}),
+        (dashboard_service.get_stock_by_location, {}),
+        (dashboard_service.get_top_used_products, {"days": 7, "limit": 5}),
+        (dashboard_service.get_top_categories, {"days": 7, "limit": 5}),
+        (dashboard_service.get_adjustments_monitor, {"days": 7, "top": 5}),
+    ):
+        dashboard_cache.invalidar()
+        with SessionLocal() as sesion:
+            esperadas += contar_consultas(lambda: fn(sesion, **kwargs), presupuesto)[0].consultas
+
+    for _ in range(5):
+        dashboard_cache.invalidar()
+        estadisticas, _ = contar_consultas(
+            lambda: dashboard_service.get_dashboard_bundle(SessionLocal, **params), presupuesto
+        )
+        assert estadisticas.consultas == esperadas
+        assert sum(estadisticas.formas.values()) == esperadas
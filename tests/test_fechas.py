@@ -0,0 +1,116 @@
+"""Filtros por dia: indexables y cortados en la zona horaria del negocio."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.db.session import _crear_engine
+from app.services.weekly_stock_service import get_weekly_stock
+from tests.conftest import insertar_movimiento
+
+NODOS_CON_INDICE = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+
+
+def _consultas(db: Session, llamada) -> list[tuple[str, dict]]:
+    """Sentencias (con parametros) que ejecuta `llamada` sobre la sesion."""
+    capturadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        capturadas.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capturar)
+    try:
+        llamada()
+    finally:
+        event.remove(engine, "before_cursor_execute", capturar)
+    return [(sql, params) for sql, params in capturadas if "movimientos" in sql]
+
+
+def _accesos_movimientos(db: Session, sql: str, params: dict) -> list[tuple[str, str]]:
+    """(tipo de nodo, condicion de indice) de cada lectura de movimientos (y sus particiones) en el plan.
+
+    Con enable_seqscan apagado el planificador solo recurre a un Seq Scan, o a
+    recorrer un indice entero sin condicion, si el filtro no es indexable.
+    """
+    db.rollback()
+    conexion = db.connection()
+    conexion.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    plan = conexion.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", params).scalar_one()
+    db.rollback()
+
+    accesos = []
+    pendientes = [plan[0]["Plan"]]
+    while pendientes:
+        nodo = pendientes.pop()
+        if nodo.get("Relation Name", "").startswith("movimientos"):
+            condicion = nodo.get("Index Cond") or nodo.get("Recheck Cond") or ""
+            accesos.append((nodo["Node Type"], condicion))
+        pendientes.extend(nodo.get("Plans", []))
+    return accesos
+
+
+@pytest.mark.parametrize(
+    "reporte",
+    [
+        lambda db: crud.movimientos.get_por_dia(db, fecha=date(2026, 1, 9)),
+        lambda db: crud.stock.get_weekly_inventory(db, start_date=date(2026, 1, 5), end_date=date(2026, 1, 11)),
+        lambda db: get_weekly_stock(db, week_start=date(2026, 1, 5)),
+    ],
+    ids=["movimientos-dia", "stock-weekly", "weekly-stock"],
+)
+def test_filtros_por_dia_usan_indice_de_fecha(db, catalogo, reporte):
+    consultas = _consultas(db, lambda: reporte(db))
+    assert consultas
+    for sql, params in consultas:
+        accesos = _accesos_movimientos(db, sql, params)
+        assert accesos, sql
+        for tipo, condicion in accesos:
+            assert tipo in NODOS_CON_INDICE and "fecha" in condicion, (accesos, sql)
+
+
+@pytest.fixture
+def db_santiago(monkeypatch, base_test):
+    """Sesion con BUSINESS_TIMEZONE=America/Santiago, tambien para las funciones SQL."""
+    monkeypatch.setattr(settings, "business_timezone", "America/Santiago")
+    engine = _crear_engine(settings.database_url)
+    sesion = Session(engine)
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+        engine.dispose()
+
+
+def test_dias_se_cortan_a_medianoche_local(db_santiago, catalogo):
+    db = db_santiago
+    viernes = date(2026, 1, 9)
+    sabado = viernes + timedelta(days=1)
+    # Santiago esta en UTC-3 en enero: en UTC ambos movimientos caen el sabado
+    for hora, cantidad in ((datetime(2026, 1, 10, 2, 59, tzinfo=timezone.utc), 5), (datetime(2026, 1, 10, 3, 1, tzinfo=timezone.utc), 3)):
+        insertar_movimiento(
+            db, fecha=hora, tipo="ingreso", producto_id=catalogo["producto"], cantidad=cantidad, hacia=catalogo["bodega"]
+        )
+
+    assert [m.cantidad for m in crud.movimientos.get_por_dia(db, fecha=viernes)] == [5]
+    assert [m.cantidad for m in crud.movimientos.get_por_dia(db, fecha=sabado)] == [3]
+
+    rollup = db.execute(text("SELECT dia, cantidad_sum FROM mov_rollup_diario ORDER BY dia")).all()
+    assert rollup == [(viernes, Decimal(5)), (sabado, Decimal(3))]
+
+    def ingresos_por_dia() -> dict[date, Decimal]:
+        (item,) = crud.stock.get_weekly_inventory(db, start_date=viernes, end_date=sabado)["items"]
+        return {dia["date"]: dia["ingresos"] for dia in item["daily"]}
+
+    assert ingresos_por_dia() == {viernes: 5, sabado: 3}
+    crud.stock.cerrar_stock_diario(db, hasta=sabado)
+    fotos = db.execute(text("SELECT fecha, ingresos, stock_end FROM stock_diario ORDER BY fecha")).all()
+    assert fotos == [(viernes, Decimal(5), Decimal(5)), (sabado, Decimal(3), Decimal(8))]
+    assert ingresos_por_dia() == {viernes: 5, sabado: 3}
@@ -0,0 +1,98 @@
+"""kardex.version crece en orden de commit aunque los ids no lo hagan."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.crud import kardex
+from app.db.session import SessionLocal
+
+INSERTAR_INGRESO = text(
+    "INSERT INTO movimientos (tipo, producto_id, to_locacion_id, cantidad) VALUES ('ingreso', :producto, :locacion, 1)"
+)
+
+
+def _esperar_bloqueo(hilo: threading.Thread, db) -> None:
+    """Espera a que `hilo` termine o quede esperando un lock de otra transaccion."""
+    limite = time.monotonic() + 5
+    while hilo.is_alive() and time.monotonic() < limite:
+        esperando = db.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_stat_activity "
+                "WHERE datname = current_database() AND wait_event_type = 'Lock')"
+            )
+        ).scalar_one()
+        db.rollback()
+        if esperando:
+            return
+        time.sleep(0.01)
+
+
+def test_version_en_orden_de_commit(db, catalogo):
+    # Locaciones distintas: las transacciones no comparten filas de stock_saldos
+    parametros = {"producto": catalogo["producto"], "locacion": catalogo["bodega"]}
+    parametros_segunda = {"producto": catalogo["producto"], "locacion": catalogo["cocina"]}
+    muestras: list[tuple[tuple[int, int], int]] = []
+
+    def muestrear() -> None:
+        with SessionLocal() as lector:
+            conteo = lector.execute(text("SELECT COUNT(*) FROM movimientos")).scalar_one()
+            muestras.append((kardex.version(lector), conteo))
+
+    def segunda_transaccion() -> None:
+        with SessionLocal() as sesion:
+            sesion.execute(INSERTAR_INGRESO, parametros_segunda)
+            sesion.commit()
+
+    muestrear()
+    primera = SessionLocal()
+    try:
+        # La primera transaccion toma el id menor y confirma despues que la segunda
+        primera.execute(INSERTAR_INGRESO, parametros)
+        hilo = threading.Thread(target=segunda_transaccion)
+        hilo.start()
+        _esperar_bloqueo(hilo, db)
+        muestrear()
+        primera.commit()
+    finally:
+        primera.close()
+    hilo.join()
+    muestrear()
+
+    # Una misma version nunca describe dos estados distintos del kardex
+    por_version: dict[tuple[int, int], set[int]] = {}
+    for version, conteo in muestras:
+        por_version.setdefault(version, set()).add(conteo)
+    assert all(len(conteos) == 1 for conteos in por_version.values()), muestras
+    assert [conteo for _, conteo in muestras] == sorted(conteo for _, conteo in muestras)
+    assert muestras[-1][1] == 2
+    assert len(por_version) == len({conteo for _, conteo in muestras})
+
+
+def test_transacciones_abiertas_no_bloquean_la_version(db, catalogo):
+    # El incremento corre al commit: una transaccion abierta no frena a otra de otra locacion
+    version = kardex.version(db)
+    db.rollback()
+    primera = SessionLocal()
+    try:
+        primera.execute(INSERTAR_INGRESO, {"producto": catalogo["producto"], "locacion": catalogo["bodega"]})
+        primera.execute(INSERTAR_INGRESO, {"producto": catalogo["producto"], "locacion": catalogo["bodega"]})
+
+        def segunda_transaccion() -> None:
+            with SessionLocal() as sesion:
+                sesion.execute(INSERTAR_INGRESO, {"producto": catalogo["producto"], "locacion": catalogo["cocina"]})
+                sesion.commit()
+
+        hilo = threading.Thread(target=segunda_transaccion)
+        hilo.start()
+        hilo.join(5)
+        assert not hilo.is_alive(), "la segunda transaccion espero a la primera"
+        primera.commit()
+    finally:
+        primera.close()
+
+    # Una vez por transaccion, no por fila ni por sentencia
+    assert kardex.version(db)[0] == version[0] + 2
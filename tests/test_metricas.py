@@ -0,0 +1,36 @@
+"""Etiquetas de ruta de GET /metrics (app/core/instrumentacion.py)."""
+
+from __future__ import annotations
+
+import re
+
+_REQUESTS = re.compile(r'^http_requests_total\{method="(\w+)",route="([^"]*)",status="(\d+)"\} (\S+)$', re.MULTILINE)
+
+
+def _requests_por_ruta(client) -> dict[tuple[str, str, str], float]:
+    texto = client.get("/metrics").text
+    return {(metodo, ruta, estado): float(valor) for metodo, ruta, estado, valor in _REQUESTS.findall(texto)}
+
+
+def test_metricas_usan_la_plantilla_completa_de_la_ruta(client, catalogo):
+    antes = _requests_por_ruta(client)
+
+    assert client.get("/api/v1/stock/").status_code == 200
+    assert client.get(f"/api/v1/productos/{catalogo['producto']}").status_code == 200
+    assert client.get("/api/v1/productos/999999").status_code == 404
+
+    despues = _requests_por_ruta(client)
+    nuevos = {clave: valor - antes.get(clave, 0) for clave, valor in despues.items() if valor != antes.get(clave, 0)}
+    assert nuevos == {
+        ("GET", "/api/v1/stock/", "200"): 1,
+        ("GET", "/api/v1/productos/{producto_id}", "200"): 1,
+        ("GET", "/api/v1/productos/{producto_id}", "404"): 1,
+    }
+
+
+def test_aciertos_de_la_cache_del_dashboard_son_un_contador(client):
+    texto = client.get("/metrics").text
+
+    assert "# TYPE dashboard_cache_requests_total counter" in texto
+    assert re.search(r'^dashboard_cache_requests_total\{resultado="hit"\} \d+$', texto, re.MULTILINE)
+    assert re.search(r'^dashboard_cache_requests_total\{resultado="miss"\} \d+$', texto, re.MULTILINE)
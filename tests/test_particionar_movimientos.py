@@ -0,0 +1,90 @@
+"""db/particionar_movimientos.sql sobre una base con datos del esquema sin particionar."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from tests.conftest import RAIZ, ejecutar_sql, leer_sql, recrear_base
+
+DATOS = """
+INSERT INTO uoms (nombre, abreviatura) VALUES ('Kilogramo', 'kg');
+INSERT INTO productos (sku, nombre, uom_id) SELECT 'SKU-' || p, 'Producto ' || p, 1 FROM generate_series(1, 3) p;
+INSERT INTO locaciones (nombre) VALUES ('Bodega'), ('Cocina');
+INSERT INTO personas (nombre) VALUES ('Ana');
+
+-- Cuatro meses de kardex: ingresos diarios a bodega, traspasos a cocina y usos en cocina
+INSERT INTO movimientos (fecha, tipo, producto_id, to_locacion_id, cantidad)
+SELECT d, 'ingreso', p, 1, 10
+FROM generate_series(now() - INTERVAL '120 days', now() - INTERVAL '1 day', INTERVAL '1 day') d, generate_series(1, 3) p
+ORDER BY d;
+
+INSERT INTO movimientos (fecha, tipo, producto_id, from_locacion_id, to_locacion_id, persona_id, cantidad)
+SELECT d + INTERVAL '1 hour', 'traspaso', p, 1, 2, 1, 3 + p
+FROM generate_series(now() - INTERVAL '120 days', now() - INTERVAL '1 day', INTERVAL '1 day') d, generate_series(1, 3) p
+ORDER BY d;
+
+INSERT INTO movimientos (fecha, tipo, producto_id, from_locacion_id, persona_id, cantidad)
+SELECT d + INTERVAL '2 hours', 'uso', p, 2, 1, 2
+FROM generate_series(now() - INTERVAL '120 days', now() - INTERVAL '1 day', INTERVAL '2 days') d, generate_series(1, 3) p
+ORDER BY d;
+
+INSERT INTO movimientos (fecha, tipo, producto_id, from_locacion_id, to_locacion_id, cantidad)
+VALUES (now() - INTERVAL '10 days', 'ajuste', 2, 2, NULL, 1.5);
+
+SELECT fn_crear_cierre(date_trunc('month', now() - INTERVAL '1 month'));
+SELECT fn_cerrar_stock_diario((now() - INTERVAL '5 days')::date);
+"""
+
+CONSULTAS = {
+    "saldos": "SELECT producto_id, locacion_id, stock FROM stock_saldos ORDER BY 1, 2",
+    "rollup": "SELECT * FROM mov_rollup_diario ORDER BY 1, 2, 3, 4, 5, 6, 7",
+    "fotos": "SELECT * FROM stock_diario ORDER BY 1, 2, 3",
+    "cierres": "SELECT * FROM cierres_saldos ORDER BY 1, 2, 3",
+    "saldos_antes_de": "SELECT * FROM fn_saldos_antes_de(now() - INTERVAL '45 days') ORDER BY 1, 2",
+}
+
+
+def _estado(engine) -> dict[str, list]:
+    with engine.connect() as conn:
+        return {nombre: [tuple(fila) for fila in conn.execute(text(sql))] for nombre, sql in CONSULTAS.items()}
+
+
+@pytest.fixture
+def base_sin_particionar(base_test):
+    url = recrear_base("inventario_migracion", RAIZ / "tests" / "sql" / "schema_sin_particionar.sql")
+    ejecutar_sql(url, DATOS)
+    engine = create_engine(url)
+    try:
+        yield url, engine
+    finally:
+        engine.dispose()
+
+
+def test_migracion_conserva_saldos_y_agregados(base_sin_particionar):
+    url, engine = base_sin_particionar
+    antes = _estado(engine)
+    assert antes["saldos"] and antes["rollup"] and antes["fotos"] and antes["cierres"]
+
+    ejecutar_sql(url, leer_sql(RAIZ / "db" / "particionar_movimientos.sql"))
+
+    assert _estado(engine) == antes
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT relkind FROM pg_class WHERE relname = 'movimientos'")).scalar_one() == "p"
+        assert conn.execute(text("SELECT count(*) FROM movimientos_default")).scalar_one() == 0
+        assert conn.execute(text("SELECT count(*) FROM fn_verificar_mov_rollup()")).scalar_one() == 0
+        # El kardex copiado vuelve a derivar los mismos saldos y agregados (las fotos se descartan)
+        conn.execute(text("SELECT fn_reconstruir_stock_saldos()"))
+    reconstruido = _estado(engine)
+    assert (reconstruido["saldos"], reconstruido["rollup"]) == (antes["saldos"], antes["rollup"])
+
+    # Los triggers quedaron sobre la tabla nueva
+    with engine.begin() as conn:
+        version = conn.execute(text("SELECT version FROM kardex_version")).scalar_one()
+        conn.execute(
+            text("INSERT INTO movimientos (tipo, producto_id, to_locacion_id, cantidad) VALUES ('ingreso', 1, 1, 5)")
+        )
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version FROM kardex_version")).scalar_one() > version
+        stock = conn.execute(text("SELECT stock FROM stock_saldos WHERE producto_id = 1 AND locacion_id = 1")).scalar_one()
+    assert stock == dict(((p, l), s) for p, l, s in antes["saldos"])[(1, 1)] + 5
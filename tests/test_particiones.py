@@ -0,0 +1,23 @@
+"""Chequeo de particiones de movimientos al arrancar la API (app/db/particiones.py)."""
+
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import text
+
+from app.db.particiones import particiones_faltantes, verificar_particiones
+
+
+def test_arranque_avisa_particiones_faltantes_sin_crearlas(db, caplog, monkeypatch):
+    # db/schema.sql crea el mes actual y los 3 siguientes
+    assert particiones_faltantes(db, meses_adelante=3) == []
+    faltantes = particiones_faltantes(db, meses_adelante=5)
+    assert len(faltantes) == 2 and all(nombre.startswith("movimientos_") for nombre in faltantes)
+
+    monkeypatch.setattr("app.db.particiones.settings.movimientos_particiones_meses", 5)
+    with caplog.at_level(logging.WARNING, logger="app.db.particiones"):
+        verificar_particiones(db)
+
+    assert all(nombre in caplog.text for nombre in faltantes)
+    assert db.execute(text("SELECT to_regclass(:nombre)"), {"nombre": faltantes[-1]}).scalar_one() is None
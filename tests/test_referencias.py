@@ -0,0 +1,33 @@
+"""Resolucion de referencias en lote (ids_existentes)."""
+
+from __future__ import annotations
+
+from app.core.catalog_cache import catalog_cache
+from app.crud.referencias import faltantes, ids_existentes
+from app.models import Locacion, Producto
+from tests.conftest import contar_consultas
+
+
+def _contar(llamada) -> tuple[int, object]:
+    estadisticas, resultado = contar_consultas(llamada)
+    return estadisticas.consultas, resultado
+
+
+def test_sin_ids_no_consulta_la_base(db):
+    catalog_cache.invalidar()
+    consultas, existentes = _contar(lambda: ids_existentes(db, {Producto: set(), Locacion: set()}))
+    assert consultas == 0
+    assert existentes == {Producto: set(), Locacion: set()}
+
+    consultas, resultado = _contar(lambda: faltantes(db, {"producto_id": None, "persona_id": None}))
+    assert consultas == 0
+    assert resultado == []
+
+
+def test_resuelve_cache_y_base_en_una_consulta(db, catalogo):
+    catalog_cache.get(db, forzar=True)
+    consultas, existentes = _contar(
+        lambda: ids_existentes(db, {Producto: {catalogo["producto"], 999}, Locacion: {catalogo["bodega"], 998}})
+    )
+    assert consultas == 1
+    assert existentes == {Producto: {catalogo["producto"]}, Locacion: {catalogo["bodega"]}}
@@ -0,0 +1,63 @@
+"""Ruteo de lecturas con una replica que no responde (app/db/replica.py)."""
+
+from __future__ import annotations
+
+import socket
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+from app.db import replica
+from app.db.replica import EstadoReplica
+from app.db.session import _crear_engine
+
+
+@pytest.fixture
+def replica_colgada(base_test, monkeypatch):
+    # Acepta la conexion TCP (backlog) pero nunca contesta el arranque del protocolo
+    servidor = socket.socket()
+    servidor.bind(("127.0.0.1", 0))
+    servidor.listen(8)
+    url = make_url(base_test).set(host="127.0.0.1", port=servidor.getsockname()[1])
+    engine = _crear_engine(url.render_as_string(hide_password=False), replica=True)
+    monkeypatch.setattr(replica, "read_engine", engine)
+    try:
+        yield
+    finally:
+        engine.dispose()
+        servidor.close()
+
+
+def test_replica_colgada_no_frena_las_demas_lecturas(replica_colgada):
+    estado = EstadoReplica(max_lag_seconds=5, check_seconds=60)
+    resultado: list[bool] = []
+    midiendo = threading.Thread(target=lambda: resultado.append(estado.usar_replica()))
+    midiendo.start()
+    while not estado._lock.locked():
+        time.sleep(0.01)
+
+    # Mientras un hilo espera a la replica, los demas leen de la primaria sin esperarlo
+    inicio = time.monotonic()
+    assert estado.usar_replica() is False
+    assert time.monotonic() - inicio < 0.5
+
+    # La medicion falla por connect_timeout y deja la replica deshabilitada
+    midiendo.join(10)
+    assert not midiendo.is_alive()
+    assert resultado == [False]
+    assert estado.snapshot()["disponible"] is False and estado.lag_segundos is None
+
+
+def test_sesiones_de_la_replica_no_escriben(base_test):
+    # La base de tests hace de replica: aun siendo una primaria, la conexion rechaza escrituras
+    engine = _crear_engine(base_test, replica=True)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(DBAPIError, match="read-only transaction"):
+                conn.execute(text("INSERT INTO locaciones (nombre) VALUES ('Bodega')"))
+    finally:
+        engine.dispose()
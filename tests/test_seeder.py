@@ -0,0 +1,54 @@
+"""SQL generado por db/build_calamenio_seeder.py (sin el Excel: datos armados a mano)."""
+
+from __future__ import annotations
+
+import os
+
+import psycopg2
+import pytest
+from sqlalchemy import text
+
+from db.build_calamenio_seeder import LOCATION_PERSON, build_sql
+from tests.conftest import ejecutar_sql
+
+PRODUCTOS = [
+    {"sku": "CAL-0001", "name": "Harina", "uom": "kg", "brand": "Generica", "category": "Secos"},
+    {"sku": "CAL-0002", "name": "Ron", "uom": "L", "brand": "Generica", "category": "Bar"},
+]
+
+
+def _entrada(sku: str, locacion: str, cantidad: float = 5.0) -> dict:
+    persona = LOCATION_PERSON.get(locacion, "Nadie")
+    return {
+        "sku": sku,
+        "location": locacion,
+        "persona": persona,
+        "supplier": None,
+        "quantity": cantidad,
+        "note": "Inicial",
+    }
+
+
+def _seeds(entradas: list[dict]) -> str:
+    return build_sql(PRODUCTOS, entradas, providers=["Proveedor Calameno"], categories=["Secos", "Bar"])
+
+
+def test_seeds_cargan_todos_los_movimientos(db):
+    entradas = [_entrada("CAL-0001", "Bodega Calameno"), _entrada("CAL-0002", "Bar Calameno")]
+    ejecutar_sql(os.environ["DATABASE_URL"], _seeds(entradas))
+
+    assert db.execute(text("SELECT count(*) FROM movimientos")).scalar_one() == 2
+
+
+@pytest.mark.parametrize(
+    ("entrada", "faltante"),
+    [
+        (_entrada("CAL-9999", "Bodega Calameno"), "producto CAL-9999"),
+        (_entrada("CAL-0001", "Bodega Fantasma"), "locacion Bodega Fantasma"),
+    ],
+)
+def test_seeds_fallan_con_referencias_desconocidas(db, entrada, faltante):
+    with pytest.raises(psycopg2.errors.RaiseException, match=faltante):
+        ejecutar_sql(os.environ["DATABASE_URL"], _seeds([_entrada("CAL-0001", "Bodega Calameno"), entrada]))
+
+    assert db.execute(text("SELECT count(*) FROM movimientos")).scalar_one() == 0
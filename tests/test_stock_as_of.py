@@ -0,0 +1,43 @@
+"""GET /stock/as-of con instantes con y sin offset."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.core.config import settings
+from tests.conftest import insertar_movimiento
+
+
+@pytest.fixture
+def zona_santiago(monkeypatch):
+    monkeypatch.setattr(settings, "business_timezone", "America/Santiago")
+
+
+def _total(client, ts: str) -> tuple[Decimal, str]:
+    respuesta = client.get("/api/v1/stock/as-of", params={"ts": ts})
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    return Decimal(cuerpo["total_stock"]), cuerpo["ts"]
+
+
+def test_ts_sin_offset_se_interpreta_en_la_zona_del_negocio(client, db, catalogo, zona_santiago):
+    # 2026-01-10 02:30 UTC es 2026-01-09 23:30 en Santiago (UTC-3 en enero)
+    insertar_movimiento(
+        db,
+        fecha=datetime(2026, 1, 10, 2, 30, tzinfo=timezone.utc),
+        tipo="ingreso",
+        producto_id=catalogo["producto"],
+        cantidad=7,
+        hacia=catalogo["bodega"],
+    )
+
+    total, ts = _total(client, "2026-01-09T23:45:00")
+    assert total == 7
+    assert datetime.fromisoformat(ts) == datetime(2026, 1, 10, 2, 45, tzinfo=timezone.utc)
+
+    assert _total(client, "2026-01-09T23:45:00-03:00")[0] == 7
+    assert _total(client, "2026-01-09T23:15:00")[0] == 0
+    assert _total(client, "2026-01-10T02:15:00+00:00")[0] == 0
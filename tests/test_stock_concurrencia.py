@@ -0,0 +1,131 @@
+"""Retiros concurrentes y lotes multi-fila contra tg_actualizar_stock_saldos."""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app import crud
+from app.db.session import SessionLocal
+from app.models.movimiento import TipoMovimiento
+from app.schemas.movimiento import MovimientoCreate
+from tests.conftest import saldos, saldos_kardex
+
+
+def _ingreso(catalogo, cantidad) -> MovimientoCreate:
+    return MovimientoCreate(
+        tipo=TipoMovimiento.ingreso,
+        producto_id=catalogo["producto"],
+        to_locacion_id=catalogo["bodega"],
+        cantidad=cantidad,
+    )
+
+
+def _retiro(catalogo, tipo: TipoMovimiento, cantidad) -> MovimientoCreate:
+    return MovimientoCreate(
+        tipo=tipo,
+        producto_id=catalogo["producto"],
+        from_locacion_id=catalogo["bodega"],
+        to_locacion_id=catalogo["cocina"] if tipo is TipoMovimiento.traspaso else None,
+        cantidad=cantidad,
+    )
+
+
+def test_retiros_concurrentes_no_dejan_stock_negativo(db, catalogo):
+    crud.movimientos.create(db, obj_in=_ingreso(catalogo, 10))
+    retiros = [_retiro(catalogo, TipoMovimiento.uso if i % 2 else TipoMovimiento.traspaso, 1) for i in range(30)]
+    barrera = threading.Barrier(len(retiros))
+    terminado = threading.Event()
+    minimos: list[Decimal] = []
+
+    def retirar(obj_in: MovimientoCreate) -> bool:
+        sesion = SessionLocal()
+        try:
+            barrera.wait()
+            crud.movimientos.create(sesion, obj_in=obj_in)
+            return True
+        except IntegrityError as exc:
+            assert "Stock insuficiente" in str(exc.orig)
+            sesion.rollback()
+            return False
+        finally:
+            sesion.close()
+
+    def vigilar() -> None:
+        with SessionLocal() as sesion:
+            while not terminado.is_set():
+                minimos.append(sesion.execute(text("SELECT COALESCE(MIN(stock), 0) FROM stock_saldos")).scalar_one())
+                sesion.rollback()
+
+    vigia = threading.Thread(target=vigilar)
+    vigia.start()
+    try:
+        with ThreadPoolExecutor(max_workers=len(retiros)) as pool:
+            aceptados = sum(pool.map(retirar, retiros))
+    finally:
+        terminado.set()
+        vigia.join()
+
+    assert aceptados == 10
+    assert min(minimos) >= 0
+    db.rollback()
+    assert saldos(db) == saldos_kardex(db)
+    assert saldos(db).get((catalogo["producto"], catalogo["bodega"]), Decimal(0)) == 0
+
+
+def test_lote_multifila_valida_cada_fila_contra_las_anteriores(db, catalogo):
+    # Un solo INSERT multi-fila: el retiro de la tercera fila ve el descuento de la segunda
+    with pytest.raises(IntegrityError, match="Stock insuficiente"):
+        crud.movimientos.create_lote(
+            db,
+            objs_in=[
+                _ingreso(catalogo, 5),
+                _retiro(catalogo, TipoMovimiento.uso, 3),
+                _retiro(catalogo, TipoMovimiento.traspaso, 3),
+            ],
+        )
+    db.rollback()
+    assert saldos(db) == {}
+
+    crud.movimientos.create_lote(
+        db,
+        objs_in=[
+            _ingreso(catalogo, 5),
+            _retiro(catalogo, TipoMovimiento.uso, 3),
+            _retiro(catalogo, TipoMovimiento.traspaso, 2),
+        ],
+    )
+    assert saldos(db) == saldos_kardex(db) == {(catalogo["producto"], catalogo["cocina"]): Decimal("2.000")}
+
+
+def test_lotes_con_pares_nuevos_en_orden_inverso_no_se_interbloquean(db, catalogo):
+    insertar = text("INSERT INTO locaciones (nombre) VALUES (:nombre) RETURNING id")
+    locaciones = [db.execute(insertar, {"nombre": f"Barra {i}"}).scalar_one() for i in range(20)]
+    db.commit()
+    ingresos = [
+        MovimientoCreate(
+            tipo=TipoMovimiento.ingreso, producto_id=catalogo["producto"], to_locacion_id=locacion, cantidad=1
+        )
+        for locacion in locaciones
+    ]
+    # Los mismos pares (aun sin fila en stock_saldos) en orden opuesto
+    lotes = [ingresos, ingresos[::-1]] * 4
+    barrera = threading.Barrier(len(lotes))
+
+    def registrar(lote: list[MovimientoCreate]) -> None:
+        with SessionLocal() as sesion:
+            barrera.wait()
+            assert crud.movimientos.validar_lote(sesion, objs_in=lote) == []
+            crud.movimientos.create_lote(sesion, objs_in=lote)
+
+    with ThreadPoolExecutor(max_workers=len(lotes)) as pool:
+        list(pool.map(registrar, lotes))
+
+    db.rollback()
+    assert saldos(db) == saldos_kardex(db)
+    assert set(saldos(db).values()) == {Decimal(len(lotes))}
@@ -0,0 +1,72 @@
+"""El reporte semanal ejecuta la misma cantidad de consultas sin importar el catalogo."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.core.instrumentacion import PresupuestoConsultas
+from app.crud.fechas import hoy
+from app.services.weekly_stock_service import get_weekly_stock, iter_weekly_stock_rows
+from tests.conftest import contar_consultas, vaciar_base
+
+
+def _catalogo(db, productos: int) -> None:
+    """`productos` productos en dos categorias, con stock de apertura y movimientos en la semana."""
+    db.execute(text("INSERT INTO uoms (nombre, abreviatura) VALUES ('Unidad', 'un')"))
+    db.execute(text("INSERT INTO categorias (nombre) VALUES ('Secos'), ('Frescos')"))
+    db.execute(text("INSERT INTO marcas (nombre) VALUES ('Marca')"))
+    db.execute(text("INSERT INTO locaciones (nombre) VALUES ('Bodega'), ('Cocina')"))
+    db.execute(
+        text(
+            "INSERT INTO productos (sku, nombre, uom_id, marca_id, categoria_id) "
+            "SELECT 'SKU-' || i, 'Producto ' || i, 1, 1, 1 + i % 2 FROM generate_series(1, :n) AS i"
+        ),
+        {"n": productos},
+    )
+    lunes = hoy() - timedelta(days=hoy().weekday() + 7)
+    db.execute(
+        text(
+            "INSERT INTO movimientos (fecha, tipo, producto_id, from_locacion_id, to_locacion_id, cantidad) "
+            "SELECT f.fecha, f.tipo::tipo_movimiento, p.id, f.desde, f.hacia, f.cantidad "
+            "FROM productos p CROSS JOIN (VALUES "
+            "  (CAST(:antes AS timestamptz), 'ingreso', NULL::int, 1, 10),"
+            "  (CAST(:martes AS timestamptz), 'traspaso', 1, 2, 4),"
+            "  (CAST(:jueves AS timestamptz), 'uso', 2, NULL::int, 1)"
+            ") AS f (fecha, tipo, desde, hacia, cantidad) ORDER BY f.fecha, p.id"
+        ),
+        {
+            "antes": f"{lunes - timedelta(days=3)} 12:00+00",
+            "martes": f"{lunes + timedelta(days=1)} 12:00+00",
+            "jueves": f"{lunes + timedelta(days=3)} 12:00+00",
+        },
+    )
+    db.commit()
+
+
+def _consultas(llamada) -> tuple[int, int]:
+    """Consultas que ejecuta `llamada` (contadas como en el presupuesto por request) y su resultado."""
+    estadisticas, resultado = contar_consultas(llamada, PresupuestoConsultas(max_consultas=1000, max_repetidas=1000))
+    return sum(estadisticas.formas.values()), resultado
+
+
+@pytest.mark.parametrize(
+    "reporte",
+    [
+        lambda db, lunes: sum(len(c.products) for c in get_weekly_stock(db, week_start=lunes).categories),
+        lambda db, lunes: sum(len(bloque) for bloque in iter_weekly_stock_rows(db, week_start=lunes, chunk_size=100)),
+    ],
+    ids=["json", "csv"],
+)
+def test_consultas_constantes_con_10_y_1000_productos(db, reporte):
+    lunes = hoy() - timedelta(days=hoy().weekday() + 7)
+    conteos = {}
+    for productos in (10, 1000):
+        vaciar_base()
+        _catalogo(db, productos)
+        conteos[productos], filas = _consultas(lambda: reporte(db, lunes))
+        db.rollback()
+        assert filas == productos
+    assert conteos[10] == conteos[1000]